@@ -0,0 +1,63 @@
+"""
+Microbenchmarks for the cached clock format parsers against the conversions they replaced.
+
+    python -m benchmarks.bench_conversions
+
+Values repeat the way they do in a timecard export: a few hundred distinct dates, times and
+amounts across many rows.
+"""
+import re
+import timeit
+from datetime import datetime, time
+
+import dateutil.parser
+
+from totalpass_p600.conversions import parse_date, parse_time, parse_number
+
+DATES = [f"{month:02d}/{day:02d}/2022" for month in range(1, 4) for day in range(1, 29)]
+TIMES = [f"{hour:02d}:{minute:02d}{half}" for hour in range(1, 13) for minute in range(0, 60, 15) for half in "ap"]
+NUMBERS = [str(minutes) for minutes in range(0, 600, 15)] + [f"{wage / 4:.2f}" for wage in range(40, 100)]
+ROWS = 20000
+
+
+def old_str_to_time(v):
+    time_re = re.compile(r'^([0-1][0-9]|2[0-3]):([0-5][0-9])([pam]+)$')
+    if time_re.match(v):
+        am_pm = time_re.search(v).group(3)
+        h = int(time_re.search(v).group(1))
+        m = int(time_re.search(v).group(2))
+        if am_pm.lower() in ['pm', 'p']:
+            if h != 12:
+                h += 12
+        elif am_pm.lower() in ['a', 'am'] and h == 12:
+            h = 0
+        return time(h, m)
+    raise ValueError(f"{v} is not a valid time")
+
+
+def old_number(s):
+    try:
+        if float(s).is_integer():
+            return int(float(s))
+        return float(s)
+    except (ValueError, TypeError):
+        return s
+
+
+def bench(name, values, old, new):
+    column = [values[i % len(values)] for i in range(ROWS)]
+    old_time = timeit.timeit(lambda: [old(value) for value in column], number=5) / 5
+    new_time = timeit.timeit(lambda: [new(value) for value in column], number=5) / 5
+    print(f"{name}: old {old_time * 1000:.1f} ms, new {new_time * 1000:.1f} ms per {ROWS} values, "
+          f"{old_time / new_time:.1f}x faster")
+
+
+def main():
+    bench("MM/DD/YYYY strptime", DATES, lambda value: datetime.strptime(value, "%m/%d/%Y").date(), parse_date)
+    bench("MM/DD/YYYY dateutil", DATES, lambda value: dateutil.parser.parse(value).date(), parse_date)
+    bench("HH:MMa/p", TIMES, old_str_to_time, parse_time)
+    bench("numbers", NUMBERS, old_number, parse_number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Compare the lxml single-walk employee page parser with the BeautifulSoup reference parser.
+
+    python -m benchmarks.bench_employee_page [page.html ...]
+
+Defaults to tests/test_data/employee_page.html. Pass saved pages from a real clock for
+representative numbers.
+"""
+import sys
+import timeit
+from pathlib import Path
+
+from totalpass_p600.employees import parse_employee_page, parse_employee_page_soup
+
+DEFAULT_PAGE = Path(__file__).parent.parent / "tests" / "test_data" / "employee_page.html"
+
+
+def main(paths):
+    for path in paths or [DEFAULT_PAGE]:
+        page = Path(path).read_text()
+        number = 200
+        soup_time = timeit.timeit(lambda: parse_employee_page_soup(1, page), number=number) / number
+        lxml_time = timeit.timeit(lambda: parse_employee_page(1, page), number=number) / number
+        print(f"{Path(path).name}: soup {soup_time * 1000:.3f} ms, lxml {lxml_time * 1000:.3f} ms, "
+              f"{soup_time / lxml_time:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
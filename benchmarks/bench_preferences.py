@@ -0,0 +1,32 @@
+"""
+Compare parsing preferences.html with lxml into a PreferencesIndex against the html.parser soup path.
+
+    python -m benchmarks.bench_preferences [preferences.html ...]
+
+Defaults to tests/test_data/preferences.html. Pass saved pages from a real clock for
+representative numbers.
+"""
+import sys
+import timeit
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from totalpass_p600.timeclock_preferences import Preferences
+
+DEFAULT_PAGE = Path(__file__).parent.parent / "tests" / "test_data" / "preferences.html"
+
+
+def main(paths):
+    for path in paths or [DEFAULT_PAGE]:
+        page = Path(path).read_text()
+        number = 100
+        soup_time = timeit.timeit(lambda: Preferences.from_soup(BeautifulSoup(page, "html.parser")),
+                                  number=number) / number
+        lxml_time = timeit.timeit(lambda: Preferences.from_html(page), number=number) / number
+        print(f"{Path(path).name}: soup {soup_time * 1000:.3f} ms, lxml {lxml_time * 1000:.3f} ms, "
+              f"{soup_time / lxml_time:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -8,5 +8,8 @@ setup(
     license='',
     author='Allan Barcellos',
     author_email='sonicdm@gmail.com',
-    description='Icontime Totalpass P600 SDK'
+    description='Icontime Totalpass P600 SDK',
+    entry_points={
+        'console_scripts': ['totalpass=totalpass_p600.cli:main'],
+    },
 )
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from totalpass_p600.punches import Punch
+
+
+def make_punch(visible_id="1", in_time=datetime(2022, 1, 3, 9), out_time=datetime(2022, 1, 3, 17),
+               department="GROCERY", wage=15, std=None, ot1=0.0, ot2=0.0, in_punch_id=None, out_punch_id=None,
+               in_punch_type=0, **fields) -> Punch:
+    """
+    Build a Punch without running the timecards.csv validators. Durations are in hours.
+    """
+    if std is None:
+        std = (out_time - in_time).total_seconds() / 3600 if out_time else 0.0
+    if in_punch_id is None:
+        in_punch_id = int(in_time.timestamp() // 60)
+    if out_punch_id is None:
+        out_punch_id = in_punch_id + 1
+    values = dict(employee_id=visible_id, visible_id=visible_id, first_name="First", last_name="Last",
+                  middle_name="", display_as="Last, First", address="", sort_date=0,
+                  in_punch_id=in_punch_id, int_in_date=0, in_date=in_time.date(), in_dow=in_time.strftime("%a"),
+                  in_time=in_time, in_flags="", in_punch_type=in_punch_type, in_note="",
+                  out_punch_id=out_punch_id, int_out_date=0, out_date=out_time.date() if out_time else None,
+                  out_dow=out_time.strftime("%a") if out_time else "", out_time=out_time, out_flags="",
+                  out_punch_type=1, out_note="", department=department, lunch="", std=std, adj=0.0, ot1=ot1,
+                  ot2=ot2, wage=wage, int_calc_flags=0, mot1=0, mot2=0, pin_number=0, inp="")
+    values.update(fields)
+    return Punch.construct(**values)
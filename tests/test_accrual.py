@@ -0,0 +1,48 @@
+from datetime import date, datetime
+from unittest import TestCase
+
+from totalpass_p600.accrual import Accrual, Accruals, project_accruals
+from totalpass_p600.employees import Employee, Employees
+from tests.helpers import make_punch
+
+
+def make_employee(display_id, accruals, reset_date=date(2023, 1, 1)):
+    return Employee(eid=int(display_id), active=True, payroll_id=display_id, display_id=display_id,
+                    first_name="First", middle_initial="", last_name="Last",
+                    departments={"DELI": {"wage": 20.0, "order": "1"}, "BAKERY": {"wage": 10.0, "order": "2"}},
+                    accruals=Accruals(start_date=date(2019, 1, 1), reset_date=reset_date, accruals=accruals))
+
+
+class TestProjectAccruals(TestCase):
+    def setUp(self):
+        last = date(2022, 1, 1)
+        self.employees = Employees()
+        self.employees.add_employees([
+            make_employee("1", [Accrual("Vacation", "10.00", "0.00", last, "73.00", "100.00", "40.00", False),
+                                Accrual("Sick", "5.00", "0.00", last, "0.00", "0.00", "0.00", False)]),
+            make_employee("2", [Accrual("Vacation", "95.00", "0.00", last, "73.00", "100.00", "40.00", False)]),
+        ])
+        self.punches = [
+            make_punch("1", datetime(2022, 2, 1), datetime(2022, 2, 1, 8), in_punch_type=54),
+            make_punch("1", datetime(2022, 2, 2), datetime(2022, 2, 2, 8), in_punch_type=55),
+            make_punch("1", datetime(2021, 12, 1), datetime(2021, 12, 1, 8), in_punch_type=54),  # already counted
+            make_punch("1", datetime(2022, 2, 3, 9), datetime(2022, 2, 3, 17)),  # worked, not leave
+        ]
+
+    def test_accrue_use_and_cap(self):
+        projection = project_accruals(self.employees, self.punches, date(2022, 6, 30))
+        rows = {(row["display_id"], row["accrual"]): row for row in projection.rows()}
+        days = (date(2022, 6, 30) - date(2022, 1, 1)).days
+        self.assertAlmostEqual(rows[("1", "vacation")]["hours_available"], 10 + days * 0.2 - 8)
+        self.assertEqual(rows[("1", "vacation")]["hours_used"], 8)
+        self.assertEqual(rows[("1", "sick")]["hours_available"], 0)  # floored, negatives not allowed
+        self.assertEqual(rows[("2", "vacation")]["hours_available"], 100)  # capped at yearly max
+        self.assertAlmostEqual(rows[("2", "vacation")]["liability"], 100 * 20)
+
+    def test_reset(self):
+        projection = project_accruals(self.employees, self.punches, date(2023, 1, 31))
+        rows = {(row["display_id"], row["accrual"]): row for row in projection.rows()}
+        # carried over balance capped at 40 on 1/1/23, then 30 days of accrual
+        self.assertAlmostEqual(rows[("2", "vacation")]["hours_available"], 40 + 30 * 0.2)
+        self.assertEqual(rows[("1", "vacation")]["hours_used"], 0)
+        self.assertAlmostEqual(projection.total_liability("vacation"), (46 + 46) * 20)
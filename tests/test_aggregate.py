@@ -0,0 +1,44 @@
+import csv
+from datetime import date
+from unittest import TestCase
+
+from totalpass_p600.aggregate import PunchAggregator
+from totalpass_p600.api import _iter_export_lines
+
+EXPORT = (
+    "FirstName,VisibleID,InDate,Department,STD,OT1,OT2,Wage,InNote\r"
+    "Ann,1,01/03/2022,DELI,480,60,0,20,\r"
+    "Ann,1,01/04/2022,DELI,240,0,0,20,\"two\nlines\"\r"
+    "Bob,2,01/03/2022,GROCERY,480,0,30,10,\r"
+    " ,,,,,,,,\r"
+).encode("utf-8")
+
+
+class TestIterExportLines(TestCase):
+    def test_matches_whole_body_parse(self):
+        whole = list(csv.DictReader(EXPORT.decode("utf-8").replace("\n", " ").split("\r")))
+        for chunk_size in (1, 7, len(EXPORT)):
+            chunks = (EXPORT[i:i + chunk_size] for i in range(0, len(EXPORT), chunk_size))
+            self.assertEqual(list(csv.DictReader(_iter_export_lines(chunks))), whole)
+
+
+class TestPunchAggregator(TestCase):
+    def setUp(self):
+        self.rows = list(csv.DictReader(_iter_export_lines([EXPORT])))
+
+    def test_by_employee(self):
+        aggregator = PunchAggregator().add_rows(self.rows)
+        self.assertEqual(len(aggregator), 2)
+        self.assertEqual(aggregator["1"].as_dict(),
+                         {"punches": 2, "std": 12, "ot1": 1, "ot2": 0, "total_hours": 13, "labor": 20 * (12 + 1.5)})
+        self.assertEqual(aggregator["2"].labor, 10 * (8 + 0.5 * 2))
+
+    def test_by_department_and_day(self):
+        aggregator = PunchAggregator(by=("department", "day")).add_rows(self.rows)
+        self.assertEqual(sorted(key for key, _ in aggregator),
+                         [("DELI", date(2022, 1, 3)), ("DELI", date(2022, 1, 4)), ("GROCERY", date(2022, 1, 3))])
+        self.assertEqual(aggregator[("DELI", date(2022, 1, 4))].std, 4)
+
+    def test_invalid_grouping(self):
+        with self.assertRaises(ValueError):
+            PunchAggregator(by="store")
@@ -0,0 +1,51 @@
+import tempfile
+from datetime import datetime, date, timedelta
+from unittest import TestCase
+
+from totalpass_p600.archive import PunchArchive
+from tests.helpers import make_punch
+
+
+def biweekly(day):
+    return day - timedelta(days=(day - date(2022, 1, 2)).days % 14)
+
+
+class TestPunchArchive(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        start = datetime(2022, 1, 2, 9)
+        self.punches = [make_punch(str(day % 3), start + timedelta(days=day), start + timedelta(days=day, hours=8),
+                                   department="DELI" if day % 2 else "GROCERY", wage=15 + day)
+                        for day in range(42)]
+        self.punches.append(make_punch("9", datetime(2022, 2, 1, 9), None, out_punch_id=0))
+        archive = PunchArchive(self.directory.name)
+        archive.write_punches("http://192.168.1.98", self.punches, biweekly)
+
+    def test_manifest_round_trip(self):
+        archive = PunchArchive(self.directory.name)
+        self.assertEqual([info.period_start for info in archive.partitions()],
+                         ["2022-01-02", "2022-01-16", "2022-01-30"])
+        self.assertEqual(archive.partitions()[0].path.replace("\\", "/"), "192.168.1.98/2022-01-02")
+        self.assertEqual(sum(info.rows for info in archive.partitions()), 43)
+
+    def test_partition_pruning(self):
+        archive = PunchArchive(self.directory.name)
+        infos = archive.partitions(start=date(2022, 1, 20), stop=date(2022, 1, 25))
+        self.assertEqual([info.period_start for info in infos], ["2022-01-16"])
+
+    def test_query(self):
+        archive = PunchArchive(self.directory.name)
+        rows = list(archive.query(["in_time", "wage"], start=date(2022, 1, 10), stop=date(2022, 1, 20),
+                                  department="DELI"))
+        expected = [{"in_time": p.in_time, "wage": p.wage} for p in self.punches
+                    if date(2022, 1, 10) <= p.in_date <= date(2022, 1, 20) and p.department == "DELI"]
+        self.assertEqual(rows, expected)
+
+        open_punches = list(archive.query(["visible_id", "out_time"], visible_id="9"))
+        self.assertEqual(open_punches, [{"visible_id": "9", "out_time": None}])
+
+    def test_scan_columns(self):
+        archive = PunchArchive(self.directory.name)
+        total = sum(sum(views["std"]) for _, views in archive.scan(["std"]))
+        self.assertEqual(total, 8 * 42)
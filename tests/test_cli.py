@@ -0,0 +1,198 @@
+import io
+import json
+import os
+import tempfile
+from contextlib import redirect_stderr
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import TestCase, mock, skipUnless
+
+from totalpass_p600 import cli
+from totalpass_p600.timeclock_preferences import Preferences
+
+PREFERENCES_HTML = Path(__file__).parent / "test_data" / "preferences.html"
+
+
+class FakeClock:
+    def __init__(self, address, user, password):
+        if address == "offline":
+            raise ConnectionError("no route to clock")
+        self.address = address
+        self.employee_list = None
+
+    def get_preferences(self):
+        preferences = Preferences.from_html(PREFERENCES_HTML.read_bytes())
+        preferences.email_preferences.password = "hunter2"
+        return preferences
+
+    def get_employee_list(self, minimal=True, active=True):
+        return [SimpleNamespace(eid=1, display_id="7", payroll_id="", first_name="Ann", middle_initial="",
+                                last_name="Lee", display_name="Lee, Ann", active=active, email="",
+                                entry_method="", departments_list=["Kitchen"])]
+
+    def iter_timecard_export(self, from_date, to_date, emp_number=None):
+        if emp_number and self.employee_list is None:
+            raise AssertionError("employee list not loaded")
+        yield {"FirstName": "Ann", "InDate": "01/03/2022", "STD": "480"}
+        yield {"FirstName": " ", "InDate": "", "STD": ""}
+        yield {"FirstName": "Bob", "InDate": "01/04/2022", "STD": "240"}
+
+
+class TestStreamRows(TestCase):
+    def test_rows_from_every_clock(self):
+        errors = {}
+        args = SimpleNamespace(from_date=None, to_date=None, preset=None, employee=None)
+        rows = list(cli.stream_rows([("a", "u", "p"), ("offline", "u", "p"), ("b", "u", "p")],
+                                    lambda api: cli.export_rows(args, api),
+                                    workers=2, errors=errors, connect=FakeClock))
+        self.assertEqual(sorted((row["clock"], row["FirstName"]) for row in rows),
+                         [("a", "Ann"), ("a", "Bob"), ("b", "Ann"), ("b", "Bob")])
+        self.assertEqual(list(errors), ["offline"])
+
+    def test_reader_can_stop_early(self):
+        endless = lambda api: ({"n": n} for n in iter(int, 1))
+        rows = cli.stream_rows([("a", "u", "p"), ("b", "u", "p")], endless, connect=FakeClock)
+        self.assertEqual(next(rows)["n"], 0)
+        rows.close()
+
+
+class TestMain(TestCase):
+    def run_main(self, *argv, connect=FakeClock):
+        with mock.patch.object(cli, "_connect", connect), redirect_stderr(io.StringIO()) as stderr:
+            status = cli.main(list(argv))
+        return status, stderr.getvalue()
+
+    def test_export_jsonl(self):
+        with tempfile.TemporaryDirectory() as folder:
+            output = os.path.join(folder, "punches.jsonl")
+            status, summary = self.run_main("export", "--clock", "a", "--clock", "b", "--user", "u",
+                                            "--password", "p", "--from", "01/01/22", "--to", "01/15/22",
+                                            "-o", output)
+            with open(output) as f:
+                rows = [json.loads(line) for line in f]
+        self.assertEqual(status, 0)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(list(rows[0])[0], "clock")
+        self.assertIn("4 rows from 2 of 2 clocks", summary)
+
+    def test_preferences_csv_masks_passwords(self):
+        with tempfile.TemporaryDirectory() as folder:
+            output = os.path.join(folder, "preferences.csv")
+            status, _ = self.run_main("preferences", "--clock", "a", "--clock", "offline", "--user", "u",
+                                      "--password", "p", "-o", output)
+            with open(output) as f:
+                text = f.read()
+        self.assertEqual(status, 1)
+        self.assertTrue(text.startswith("clock,section,field,value"))
+        self.assertIn("a,payroll_preferences,week_start,", text)
+        self.assertIn("email_preferences,password,********", text)
+        self.assertIn("device_preferences,supervisor_code,********", text)
+        self.assertNotIn("hunter2", text)
+
+    def test_export_loads_employee_list_only_for_employee_filter(self):
+        clocks = []
+        connect = lambda *clock: clocks.append(FakeClock(*clock)) or clocks[-1]
+        argv = ("export", "--clock", "a", "--user", "u", "--password", "p", "--from", "01/01/22", "--to", "01/15/22",
+                "-o", os.devnull)
+        self.run_main(*argv, connect=connect)
+        self.assertIsNone(clocks[-1].employee_list)
+        status, _ = self.run_main(*argv, "--employee", "7", connect=connect)
+        self.assertEqual(status, 0)
+        self.assertIsNotNone(clocks[-1].employee_list)
+
+    def test_export_preset(self):
+        from totalpass_p600.date_range_presets import DateRangePreset
+
+        self.assertEqual(set(cli.PRESETS), {preset.name.lower() for preset in DateRangePreset})
+        calls = []
+
+        class PresetClock(FakeClock):
+            def iter_timecard_export(self, from_date, to_date=None, emp_number=None):
+                calls.append((from_date, to_date))
+                return super().iter_timecard_export(from_date, to_date, emp_number)
+
+        status, _ = self.run_main("export", "--clock", "a", "--user", "u", "--password", "p",
+                                  "--preset", "last_pay_period", "-o", os.devnull, connect=PresetClock)
+        self.assertEqual(status, 0)
+        self.assertEqual(calls, [(DateRangePreset.LAST_PAY_PERIOD, None)])
+        for dates in (("--preset", "today", "--from", "01/01/22"), ("--from", "01/01/22")):
+            with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+                cli.main(["export", "--clock", "a", "--user", "u", "--password", "p", *dates])
+
+    def test_employees_csv(self):
+        with tempfile.TemporaryDirectory() as folder:
+            output = os.path.join(folder, "employees.csv")
+            status, _ = self.run_main("employees", "--clock", "a", "--inactive", "--user", "u", "--password", "p",
+                                      "-o", output)
+            with open(output) as f:
+                lines = f.read().splitlines()
+        self.assertEqual(status, 0)
+        self.assertEqual(lines[0].split(","), ["clock", *cli.EMPLOYEE_COLUMNS, "departments"])
+        self.assertIn(",False,", lines[1])
+        self.assertTrue(lines[1].endswith(",Kitchen"))
+
+    def test_snapshot_dir_is_created(self):
+        saved = []
+
+        class SnapshotClock(FakeClock):
+            def load_employee_snapshot(self, path):
+                return None
+
+            def refresh_employee_snapshot(self, path):
+                with open(path, "wb"):  # fails unless the folder exists
+                    saved.append(path)
+                return SimpleNamespace(employees=self.get_employee_list())
+
+        with tempfile.TemporaryDirectory() as folder:
+            snapshot_dir = os.path.join(folder, "snapshots")
+            status, _ = self.run_main("employees", "--clock", "http://10.0.0.5", "--user", "u", "--password", "p",
+                                      "--snapshot-dir", snapshot_dir, "-o", os.devnull, connect=SnapshotClock)
+        self.assertEqual(status, 0)
+        self.assertEqual(saved, [os.path.join(snapshot_dir, "10.0.0.5.snap")])
+
+    def test_inactive_with_snapshot_dir_is_rejected(self):
+        with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+            cli.main(["employees", "--clock", "a", "--user", "u", "--password", "p", "--inactive",
+                      "--snapshot-dir", "snapshots"])
+
+    def test_connect_skips_eager_loads(self):
+        with mock.patch("totalpass_p600.api.TimeClockApi") as api:
+            cli._connect("a", "u", "p")
+        api.assert_called_once_with("a", "u", "p", load_data=False)
+
+    def test_credentials_from_environment(self):
+        with mock.patch.dict(os.environ, {cli.USER_ENV: "admin", cli.PASSWORD_ENV: "secret"}):
+            args = cli.build_parser().parse_args(["backup", "--clock", "a"])
+        self.assertEqual((args.user, args.password), ("admin", "secret"))
+
+    def test_parquet_needs_output_file(self):
+        with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+            cli.main(["employees", "--clock", "a", "--user", "u", "--password", "p", "--format", "parquet"])
+
+
+class TestWriteRows(TestCase):
+    @skipUnless(__import__("importlib").util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_parquet(self):
+        import pyarrow.parquet
+
+        with tempfile.TemporaryDirectory() as folder:
+            output = os.path.join(folder, "rows.parquet")
+            written = cli.write_rows(({"clock": "a", "n": n} for n in range(5)), output, "parquet")
+            self.assertEqual(written, 5)
+            self.assertEqual(pyarrow.parquet.read_table(output).num_rows, 5)
+
+    def test_columns_stay_aligned(self):
+        rows = [{"clock": "a", "x": 1, "y": 2}, {"clock": "b", "y": 3, "z": 4}]
+        output = io.StringIO()
+        with mock.patch.object(cli.sys, "stdout", output):
+            self.assertEqual(cli.write_rows(iter(rows), "-", "csv"), 2)
+        self.assertEqual(output.getvalue().splitlines(), ["clock,x,y", "a,1,2", "b,,3"])
+
+        output = io.StringIO()
+        with mock.patch.object(cli.sys, "stdout", output):
+            cli.write_rows(iter(rows), "-", "jsonl", columns=("clock", "z"))
+        self.assertEqual([json.loads(line) for line in output.getvalue().splitlines()],
+                         [{"clock": "a", "z": ""}, {"clock": "b", "z": 4}])
+
+    def test_no_rows(self):
+        self.assertEqual(cli.write_rows(iter([]), "-", "csv"), 0)
@@ -0,0 +1,43 @@
+from datetime import date, datetime, time
+from unittest import TestCase
+
+from totalpass_p600.conversions import parse_date, parse_time, parse_datetime, parse_number
+
+
+class TestParseDate(TestCase):
+    def test_formats(self):
+        self.assertEqual(parse_date("01/03/2022"), date(2022, 1, 3))
+        self.assertEqual(parse_date("1/3/22"), date(2022, 1, 3))
+        self.assertEqual(parse_date("12/31/99"), date(1999, 12, 31))
+        self.assertEqual(parse_date("2022-01-03"), date(2022, 1, 3))
+        self.assertEqual(parse_date(datetime(2022, 1, 3, 9)), date(2022, 1, 3))
+
+    def test_invalid(self):
+        for value in ("13/01/2022", "01/32/22", "01/03/022", "01/03", "1/3/22/1", "Jan 3 2022", ""):
+            with self.assertRaises(ValueError, msg=value):
+                parse_date(value)
+
+
+class TestParseTime(TestCase):
+    def test_formats(self):
+        self.assertEqual(parse_time("12:00a"), time(0, 0))
+        self.assertEqual(parse_time("12:30p"), time(12, 30))
+        self.assertEqual(parse_time("09:05a"), time(9, 5))
+        self.assertEqual(parse_time("7:45pm"), time(19, 45))
+        self.assertEqual(parse_datetime("01/03/2022", "05:15P"), datetime(2022, 1, 3, 17, 15))
+
+    def test_invalid(self):
+        for value in ("12:00", "24:00a", "12:00 a", "12:60p", "noon"):
+            with self.assertRaises(ValueError, msg=value):
+                parse_time(value)
+
+
+class TestParseNumber(TestCase):
+    def test_numbers(self):
+        self.assertEqual(parse_number("480"), 480)
+        self.assertIsInstance(parse_number("480.00"), int)
+        self.assertEqual(parse_number("15.25"), 15.25)
+        self.assertEqual(parse_number(" 42 "), 42)
+        self.assertEqual(parse_number(3.0), 3)
+        self.assertEqual(parse_number("DELI"), "DELI")
+        self.assertEqual(parse_number(""), "")
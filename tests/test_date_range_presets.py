@@ -0,0 +1,39 @@
+from datetime import date, datetime
+from unittest import TestCase
+
+from totalpass_p600.date_range_presets import DateRangePreset, resolve_preset
+from totalpass_p600.pay_periods import PayPeriodCalendar
+from totalpass_p600.timeclock_preferences import PayrollPreferences
+
+
+class TestResolvePreset(TestCase):
+    def setUp(self):
+        self.payroll = PayrollPreferences(pay_period_type="Bi-Weekly", last_pay_start="12/19/21",
+                                          this_pay_start="01/02/22", next_pay_start="01/16/22",
+                                          day_start="12:00a", week_start="Mon")
+
+    def test_calendar_presets(self):
+        anchor = date(2022, 1, 5)  # a wednesday
+        self.assertEqual(resolve_preset(DateRangePreset.TODAY, anchor), (anchor, anchor))
+        self.assertEqual(resolve_preset(DateRangePreset.THIS_WEEK, anchor), (date(2022, 1, 2), date(2022, 1, 8)))
+        self.assertEqual(resolve_preset("last week", datetime(2022, 1, 5, 13), week_start="thu"),
+                         (date(2021, 12, 23), date(2021, 12, 29)))
+        self.assertEqual(resolve_preset(DateRangePreset.LAST_MONTH, anchor), (date(2021, 12, 1), date(2021, 12, 31)))
+
+    def test_week_start_from_payroll(self):
+        self.assertEqual(resolve_preset(DateRangePreset.THIS_WEEK, date(2022, 1, 5), payroll=self.payroll),
+                         (date(2022, 1, 3), date(2022, 1, 9)))
+
+    def test_pay_period_presets(self):
+        anchor = date(2022, 1, 20)
+        self.assertEqual(resolve_preset(DateRangePreset.THIS_PAY_PERIOD, anchor, payroll=self.payroll),
+                         (date(2022, 1, 16), date(2022, 1, 29)))
+        self.assertEqual(resolve_preset(DateRangePreset.LAST_PAY_PERIOD, anchor, payroll=self.payroll),
+                         (date(2022, 1, 2), date(2022, 1, 15)))
+        semi_monthly = PayPeriodCalendar("Semi-Monthly", date(2022, 1, 1), (1, 16))
+        self.assertEqual(resolve_preset("next pay period", date(2022, 1, 20), payroll=semi_monthly),
+                         (date(2022, 2, 1), date(2022, 2, 15)))
+
+    def test_pay_period_needs_payroll(self):
+        with self.assertRaises(ValueError):
+            resolve_preset(DateRangePreset.THIS_PAY_PERIOD, date(2022, 1, 20))
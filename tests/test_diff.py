@@ -0,0 +1,23 @@
+from datetime import datetime
+from unittest import TestCase
+
+from totalpass_p600.diff import diff_punches
+from totalpass_p600.punches import Punches
+from tests.helpers import make_punch
+
+
+class TestDiffPunches(TestCase):
+    def test_diff(self):
+        kept = make_punch("1", datetime(2022, 1, 3, 9), datetime(2022, 1, 3, 17))
+        edited = make_punch("1", datetime(2022, 1, 4, 9), datetime(2022, 1, 4, 17))
+        deleted = make_punch("2", datetime(2022, 1, 4, 9), datetime(2022, 1, 4, 17))
+        added = make_punch("2", datetime(2022, 1, 5, 9), datetime(2022, 1, 5, 17))
+        old = Punches()
+        old.add_punches([kept, edited, deleted])
+        edit = edited.copy(update={"out_time": datetime(2022, 1, 4, 16), "out_flags": "E"})
+
+        diff = diff_punches(old, [kept.copy(), edit, added])
+        self.assertEqual(diff.added, [added])
+        self.assertEqual(diff.removed, [deleted])
+        self.assertEqual(diff.changed, [(edited, edit)])
+        self.assertFalse(diff_punches(old, old))
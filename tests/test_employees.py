@@ -0,0 +1,149 @@
+from unittest import TestCase
+
+from totalpass_p600.employees import Employee, Employees
+
+
+def make_employee(eid, display_id, departments=()):
+    return Employee(eid=eid, active=True, payroll_id=f"P{display_id}", display_id=display_id, first_name="First",
+                    middle_initial="", last_name="Last",
+                    departments={name: {"wage": 15.0, "order": str(order)} for order, name in enumerate(departments)})
+
+
+class TestEmployeesIndexes(TestCase):
+    def setUp(self):
+        self.employees = Employees()
+        self.employees.add_employees([make_employee(1, "10", ["DELI"]),
+                                      make_employee(2, "20", ["DELI", "BAKERY"]),
+                                      make_employee(3, "30")])
+
+    def test_lookups(self):
+        self.assertEqual(self.employees.by_eid(2).display_id, "20")
+        self.assertEqual(self.employees.by_payroll_id("P30").eid, 3)
+        self.assertEqual(self.employees.by_display_id("10").eid, 1)
+        self.assertIn("30", self.employees)
+        with self.assertRaises(KeyError):
+            self.employees.by_eid(99)
+
+    def test_departments(self):
+        self.assertEqual(self.employees.departments(), {"DELI", "BAKERY"})
+        self.assertEqual([e.eid for e in self.employees.by_department("DELI")], [1, 2])
+        self.assertEqual(len(self.employees.by_department("PRODUCE")), 0)
+
+    def test_departments_cached_until_changed(self):
+        departments = self.employees.departments()
+        self.assertIs(self.employees.departments(), departments)
+        self.employees.add_employee(make_employee(5, "50", ["DELI"]))
+        self.assertIs(self.employees.departments(), departments)
+        self.employees.add_employee(make_employee(6, "60", ["FLORAL"]))
+        self.assertEqual(self.employees.departments(), {"DELI", "BAKERY", "FLORAL"})
+
+    def test_replace_employee_updates_indexes(self):
+        self.employees.add_employee(make_employee(4, "20", ["PRODUCE"]))
+        self.assertEqual(self.employees.departments(), {"DELI", "PRODUCE"})
+        self.assertEqual(self.employees.by_eid(4).display_id, "20")
+        with self.assertRaises(KeyError):
+            self.employees.by_eid(2)
+
+    def test_reindex_after_edit(self):
+        self.employees["30"].departments["GROCERY"] = {"wage": 16.0, "order": "0"}
+        self.employees.reindex()
+        self.assertEqual([e.eid for e in self.employees.by_department("GROCERY")], [3])
+
+    def test_construct_from_dict(self):
+        employees = Employees(employees={"10": make_employee(1, "10", ["DELI"])})
+        self.assertEqual(employees.by_eid(1).display_id, "10")
+
+
+class TestParseEmployeePage(TestCase):
+    def test_matches_soup_parser(self):
+        from pathlib import Path
+        from totalpass_p600.employees import parse_employee_page, parse_employee_page_soup
+        page = (Path(__file__).parent / "test_data" / "employee_page.html").read_text()
+        fast = parse_employee_page(42, page)
+        reference = parse_employee_page_soup(42, page)
+        for name in ("eid", "active", "payroll_id", "display_id", "first_name", "middle_initial", "last_name",
+                     "display_name", "pin", "email", "address", "note", "entry_method", "automatic_lunch_deduction",
+                     "web_punch_settings", "departments"):
+            self.assertEqual(getattr(fast, name), getattr(reference, name), name)
+        self.assertEqual(fast.accruals.accruals, reference.accruals.accruals)
+        self.assertEqual((fast.accruals.start_date, fast.accruals.reset_date),
+                         (reference.accruals.start_date, reference.accruals.reset_date))
+        self.assertEqual(fast.departments, {"DELI": {"wage": 17.5, "order": "1"},
+                                            "BAKERY": {"wage": 16.25, "order": "2"}})
+
+
+class TestParseEmployeeList(TestCase):
+    def setUp(self):
+        from pathlib import Path
+        self.page = (Path(__file__).parent / "test_data" / "employeelist.html").read_bytes()
+
+    def test_parse_employee_list(self):
+        from totalpass_p600.employees import parse_employee_list
+        employees = parse_employee_list(self.page)
+        self.assertEqual(len(employees), 3)
+        self.assertEqual([(e.eid, e.active, e.payroll_id, e.display_id, e.last_name, e.first_name, e.middle_initial)
+                          for e in employees],
+                         [(5, True, "1001", "10", "Smith", "Ann", "B"), (6, True, "1002", "20", "Jones", "Bob", ""),
+                          (9, False, "1003", "30", "Lee", "Cy", "D")])
+
+    def test_iter_employee_list(self):
+        from totalpass_p600.employees import iter_employee_list
+        employees = iter_employee_list(self.page.decode("utf-8"))
+        self.assertEqual(next(employees).display_id, "10")
+        self.assertEqual([e.display_id for e in employees], ["20", "30"])
+
+
+    def test_fingerprints_only_change_with_their_row(self):
+        from totalpass_p600.employees import iter_employee_list_fingerprints
+        head, rest = self.page.split(b"<tbody>", 1)
+        row = b"<tr>" + rest.split(b"<tr>")[1].split(b"</tr>")[0] + b"</tr>\n    "
+        # enough rows that the parser is fed the page in several chunks
+        rows = [row.replace(b"eid=5&", b"eid=%d&" % n).replace(b">10<", b">%d<" % n) for n in range(3000)]
+        page = head + b"<tbody>\n    " + b"".join(rows) + b"</tbody>\n</table>\n</body>\n</html>\n"
+        before = [fingerprint for fingerprint, _ in iter_employee_list_fingerprints(page)]
+        edited = page.replace(b">Smith<", b">Smith-Jones<", 1)
+        after = [fingerprint for fingerprint, _ in iter_employee_list_fingerprints(edited)]
+        self.assertEqual(len(after), 3000)
+        self.assertEqual([n for n in range(3000) if before[n] != after[n]], [0])
+
+
+class TestRefreshEmployees(TestCase):
+    def setUp(self):
+        from pathlib import Path
+        from types import SimpleNamespace
+        from totalpass_p600.api import TimeClockApi
+        data = Path(__file__).parent / "test_data"
+        self.pages = {"employeelist.html": (data / "employeelist.html").read_bytes()}
+        detail = (data / "employee_page.html").read_text()
+        for eid, display_id in ((5, "10"), (6, "20"), (9, "30")):
+            self.pages[eid] = detail.replace('value="42"', f'value="{display_id}"').encode("utf-8")
+        self.requests = []
+
+        def make_request(endpoint, method="GET", params=None, **kwargs):
+            self.requests.append(endpoint)
+            key = params["eid"] if endpoint == TimeClockApi.EMPLOYEE_PAGE_ENDPOINT else endpoint
+            return SimpleNamespace(content=self.pages[key])
+
+        self.api = TimeClockApi.__new__(TimeClockApi)
+        self.api.make_request = make_request
+
+    def test_only_changed_rows_are_fetched(self):
+        first = self.api.refresh_employees()
+        self.assertEqual((first.pages_fetched, first.pages_parsed), (3, 3))
+        self.assertEqual(sorted(e.display_id for e in first.employees), ["10", "20", "30"])
+
+        unchanged = self.api.refresh_employees(first)
+        self.assertEqual((unchanged.pages_fetched, unchanged.pages_parsed), (0, 0))
+        self.assertIs(unchanged.employees["20"], first.employees["20"])
+
+        # Bob's row changes (new last name) but his detail page does not
+        self.pages["employeelist.html"] = self.pages["employeelist.html"].replace(b">Jones<", b">Jones-Lee<")
+        row_changed = self.api.refresh_employees(unchanged)
+        self.assertEqual((row_changed.pages_fetched, row_changed.pages_parsed), (1, 0))
+        self.assertIs(row_changed.employees["20"], first.employees["20"])
+
+        self.pages["employeelist.html"] = self.pages["employeelist.html"].replace(b">Lee<", b">Li<")
+        self.pages[9] = self.pages[9].replace(b'value="Public"', b'value="Li"')
+        page_changed = self.api.refresh_employees(row_changed)
+        self.assertEqual((page_changed.pages_fetched, page_changed.pages_parsed), (1, 1))
+        self.assertEqual(page_changed.employees["30"].last_name, "Li")
@@ -0,0 +1,52 @@
+import io
+import json
+from datetime import datetime
+from unittest import TestCase
+
+from totalpass_p600.aggregate import PunchAggregator
+from totalpass_p600.export import CsvPayrollWriter, JsonLinesPayrollWriter, PayrollWriter
+from totalpass_p600.punches import Punches
+from tests.helpers import make_punch
+
+
+class TestPayrollWriters(TestCase):
+    def setUp(self):
+        self.punches = Punches()
+        self.punches.add_punches([
+            make_punch("1", datetime(2022, 1, 3, 9), datetime(2022, 1, 3, 17), department="DELI", wage=20),
+            make_punch("2", datetime(2022, 1, 3, 9), datetime(2022, 1, 3, 13), department="DELI", wage=10),
+        ])
+
+    def test_csv_punch_lines(self):
+        stream = io.StringIO()
+        writer = CsvPayrollWriter(stream, lineterminator="\n")
+        self.assertEqual(writer.write_punches(self.punches), 2)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(lines[0], "employee_id,last_name,first_name,department,date,regular_hours,ot1_hours,"
+                                   "ot2_hours,wage,labor")
+        self.assertEqual(lines[1], "1,Last,First,DELI,2022-01-03,8.0,0.0,0.0,20,160.0")
+
+    def test_custom_columns(self):
+        stream = io.StringIO()
+        writer = JsonLinesPayrollWriter(stream, columns={"EmpNo": "visible_id",
+                                                         "Hours": lambda punch: round(punch.total_hours, 2)})
+        writer.write_punches(self.punches)
+        self.assertEqual([json.loads(line) for line in stream.getvalue().splitlines()],
+                         [{"EmpNo": "1", "Hours": 8.0}, {"EmpNo": "2", "Hours": 4.0}])
+
+    def test_group_totals(self):
+        stream = io.StringIO()
+        JsonLinesPayrollWriter(stream).write_totals(self.punches.by_employee(), key_names=["employee_id"])
+        rows = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(rows[0], {"employee_id": "1", "punches": 1, "regular_hours": 8.0, "ot1_hours": 0.0,
+                                   "ot2_hours": 0.0, "total_hours": 8.0, "labor": 160.0})
+
+        rows = [{"VisibleID": "1", "Department": "DELI", "InDate": "01/03/2022", "STD": "480", "Wage": "20"}]
+        stream = io.StringIO()
+        CsvPayrollWriter(stream, lineterminator="\n").write_totals(
+            PunchAggregator(by=("department", "day")).add_rows(rows), key_names=["department", "date"])
+        self.assertEqual(stream.getvalue().splitlines()[1], "DELI,2022-01-03,1,8.0,0.0,0.0,8.0,160.0")
+
+    def test_base_writer_is_abstract(self):
+        with self.assertRaises(TypeError):
+            PayrollWriter(io.StringIO())
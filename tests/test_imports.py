@@ -0,0 +1,39 @@
+import subprocess
+import sys
+from pathlib import Path
+from unittest import TestCase
+
+ROOT = Path(__file__).parent.parent
+HEAVY_MODULES = ("requests", "bs4", "dateutil", "pydantic", "lxml", "asyncio")
+# generous, so slow CI machines pass; a regression to eager imports costs several times this
+IMPORT_BUDGET_SECONDS = 0.1
+
+
+def run_python(code: str) -> str:
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                          check=True).stdout.strip()
+
+
+class TestLazyImports(TestCase):
+    def test_package_import_skips_heavy_modules(self):
+        loaded = run_python("import sys, totalpass_p600, totalpass_p600.util, totalpass_p600.backup; "
+                            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+        self.assertEqual(loaded, "")
+
+    def test_api_import_defers_requests(self):
+        loaded = run_python("import sys, totalpass_p600.api; "
+                            "print(','.join(m for m in ('requests', 'bs4', 'dateutil', 'asyncio') if m in sys.modules))")
+        self.assertEqual(loaded, "")
+
+    def test_import_time_budget(self):
+        seconds = float(run_python("import time; start = time.perf_counter(); import totalpass_p600.util; "
+                                   "print(time.perf_counter() - start)"))
+        self.assertLess(seconds, IMPORT_BUDGET_SECONDS)
+
+    def test_lazy_attributes(self):
+        import totalpass_p600
+        from totalpass_p600.api import TimeClockApi
+        self.assertIs(totalpass_p600.TimeClockApi, TimeClockApi)
+        self.assertIn("Punches", dir(totalpass_p600))
+        with self.assertRaises(AttributeError):
+            totalpass_p600.NotAThing
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, time, date
+from unittest import TestCase
+
+from totalpass_p600.overtime import OvertimeCalculator
+from totalpass_p600.timeclock_preferences import OvertimePreferences, PayrollPreferences
+from tests.helpers import make_punch
+
+
+def overtime_preferences(**overrides):
+    values = dict(day_ot1_after_hours=99, day_ot2_after_hours=99, week_ot1_after_hours=40,
+                  week_ot2_after_hours=99, consecutive_day_ot="No", ot1_multiplier=1.5, ot2_multiplier=2)
+    values.update(overrides)
+    return OvertimePreferences(**values)
+
+
+payroll_preferences = PayrollPreferences(pay_period_type="Bi-Weekly", last_pay_start=date(2021, 12, 19),
+                                         this_pay_start=date(2022, 1, 2), next_pay_start=date(2022, 1, 16),
+                                         day_start=time(0, 0), week_start="Sun")
+
+
+def shifts(days, hours, start=datetime(2022, 1, 2, 8)):
+    return [make_punch("1", start + timedelta(days=d), start + timedelta(days=d, hours=hours)) for d in range(days)]
+
+
+class TestOvertimeCalculator(TestCase):
+    def test_weekly_overtime(self):
+        calculator = OvertimeCalculator(overtime_preferences(), payroll_preferences)
+        punches = calculator.recalculate(shifts(5, 9))
+        self.assertEqual(punches.hours_by_category["std"], 40)
+        self.assertEqual(punches.hours_by_category["ot1"], 5)
+        self.assertEqual([p.ot1 for p in punches], [0, 0, 0, 0, 5])
+
+    def test_what_if_threshold(self):
+        calculator = OvertimeCalculator(overtime_preferences(week_ot1_after_hours=38), payroll_preferences)
+        punches = calculator.recalculate(shifts(5, 9))
+        self.assertEqual(punches.hours_by_category["ot1"], 7)
+        self.assertEqual(calculator.total_labor(punches), 15 * (38 + 7 * 1.5))
+
+    def test_week_boundary_resets(self):
+        calculator = OvertimeCalculator(overtime_preferences(), payroll_preferences)
+        # Thursday to the following Tuesday crosses the Sunday week start
+        punches = calculator.recalculate(shifts(6, 10, start=datetime(2022, 1, 6, 8)))
+        self.assertEqual(punches.hours_by_category["ot1"], 0)
+
+    def test_daily_overtime(self):
+        calculator = OvertimeCalculator(overtime_preferences(day_ot1_after_hours=8, day_ot2_after_hours=12),
+                                        payroll_preferences)
+        punches = calculator.recalculate(shifts(1, 13))
+        self.assertEqual(punches.hours_by_category, {"std": 8, "ot1": 4, "ot2": 1, "adj": 0})
+
+    def test_seventh_consecutive_day(self):
+        calculator = OvertimeCalculator(overtime_preferences(day_ot1_after_hours=8, week_ot1_after_hours=99,
+                                                             consecutive_day_ot="Yes"), payroll_preferences)
+        punches = list(calculator.recalculate(shifts(7, 9)))
+        self.assertEqual((punches[-1].std, punches[-1].ot1, punches[-1].ot2), (0, 8, 1))
+        self.assertEqual((punches[0].std, punches[0].ot1, punches[0].ot2), (8, 1, 0))
@@ -0,0 +1,94 @@
+from datetime import time, date
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import TestCase, mock
+
+from totalpass_p600.api import TimeClockApi
+from totalpass_p600.preference_updates import update_preferences
+from totalpass_p600.timeclock_preferences import Preferences, CustomField
+
+PREFERENCES_PAGE = (Path(__file__).parent / "test_data" / "preferences.html").read_text()
+
+
+class TestChangedFields(TestCase):
+    def setUp(self):
+        self.preferences = Preferences.from_html(PREFERENCES_PAGE)
+
+    def test_unchanged_values_are_skipped(self):
+        changes = {"overtime_preferences": {"week_ot1_after_hours": 40, "consecutive_day_ot": "no"},
+                   "payroll_preferences": {"this_pay_start": date(2021, 12, 19), "day_start": "12:00a"},
+                   "punch_preferences": self.preferences.punch_preferences}
+        self.assertEqual(self.preferences.changed_fields(changes), {})
+        self.assertEqual(self.preferences.form_payload(changes), {})
+
+    def test_changed_values_are_serialized(self):
+        changes = {"overtime_preferences": {"week_ot1_after_hours": 45, "consecutive_day_ot": True},
+                   "payroll_preferences": {"day_start": time(6, 30), "next_pay_start": date(2022, 1, 9)},
+                   "punch_preferences": {"rounding_type": "15 minute", "flag_edits_on_reports": False},
+                   "employee_input_preferences": {"enabled": False},
+                   "custom_field_preferences": {"field_2": CustomField(name="Tips", assign="Employee")}}
+        self.assertEqual(self.preferences.changed_fields(changes),
+                         {"prefs19": "45", "prefs21": "1", "prefs13": "06:30a", "prefs11": "01/09/22", "prefs30": "1",
+                          "prefs32": "", "prefs103": "Tips", "prefs104": "2"})
+
+    def test_form_payload(self):
+        payload = self.preferences.form_payload({"alert_preferences": {"check_alerts_interval": 30}})
+        self.assertEqual(payload, {"buttonClicked": "Submit", "prefsTab": "0", "sessionToken": "4f1c9a2e",
+                                   "prefsChanged": "0", "prefs92": "30"})
+
+    def test_invalid_changes(self):
+        with self.assertRaises(ValueError):
+            self.preferences.changed_fields({"device_information": {"serial_number": "x"}})
+        with self.assertRaises(ValueError):
+            self.preferences.changed_fields({"payroll_preferences": {"week_start": "Someday"}})
+        with self.assertRaises(ValueError):
+            self.preferences.changed_fields({"payroll_preferences": {"not_a_field": 1}})
+
+
+class TestUpdatePreferences(TestCase):
+    def make_clock(self, address, fail=False):
+        clock = TimeClockApi.__new__(TimeClockApi)
+        clock.address = address
+        clock.posts = []
+
+        def make_request(endpoint, method="GET", data=None, **kwargs):
+            if fail:
+                raise ConnectionError("clock offline")
+            if method == "POST":
+                clock.posts.append((endpoint, data))
+            return SimpleNamespace(content=PREFERENCES_PAGE)
+
+        clock.make_request = make_request
+        return clock
+
+    def test_fan_out(self):
+        clocks = [self.make_clock("http://store1"), self.make_clock("http://store2", fail=True),
+                  self.make_clock("http://store3")]
+        results = update_preferences(clocks, {"overtime_preferences": {"week_ot1_after_hours": 45,
+                                                                       "ot1_multiplier": 1.5}})
+        self.assertEqual([result.address for result in results], ["http://store1", "http://store2", "http://store3"])
+        self.assertEqual([result.ok for result in results], [True, False, True])
+        self.assertEqual(results[0].changed, {"prefs19": "45"})
+        endpoint, data = clocks[0].posts[0]
+        self.assertEqual(endpoint, "preferences.html")
+        self.assertEqual(data["prefs19"], "45")
+        self.assertNotIn("prefs25", data)
+
+    def test_no_post_without_changes(self):
+        clock = self.make_clock("http://store1")
+        result = clock.update_preferences({"overtime_preferences": {"week_ot1_after_hours": 40}})
+        self.assertEqual((result.ok, result.changed, clock.posts), (True, {}, []))
+
+    def test_credentials_log_in_without_eager_loads(self):
+        clock = self.make_clock("http://store1")
+        clock.session = mock.Mock()
+
+        def log_in(api, address, user, password, load_data=True):
+            self.assertFalse(load_data)
+            api.__dict__.update(clock.__dict__)
+
+        with mock.patch.object(TimeClockApi, "__init__", autospec=True, side_effect=log_in):
+            results = update_preferences([("store1", "admin", "pw")],
+                                         {"overtime_preferences": {"week_ot1_after_hours": 45}})
+        self.assertEqual(results[0].changed, {"prefs19": "45"})
+        clock.session.close.assert_called_once_with()
@@ -0,0 +1,36 @@
+from datetime import datetime
+from unittest import TestCase
+
+from totalpass_p600.punch_audit import (find_punch_exceptions, exceptions_table, EXCEPTION_TABLE_HEADER, DUPLICATE,
+                                        OVERLAP, MISSING_OUT, LONG_SHIFT)
+from totalpass_p600.timeclock_preferences import PunchPreferences
+from tests.helpers import make_punch
+
+
+class TestFindPunchExceptions(TestCase):
+    def test_clean_punches(self):
+        punches = [make_punch("1", datetime(2022, 1, 3, 9), datetime(2022, 1, 3, 12)),
+                   make_punch("1", datetime(2022, 1, 3, 12, 30), datetime(2022, 1, 3, 17)),
+                   make_punch("2", datetime(2022, 1, 3, 9), datetime(2022, 1, 3, 17))]
+        self.assertEqual(find_punch_exceptions(punches), [])
+
+    def test_exceptions(self):
+        first = make_punch("1", datetime(2022, 1, 3, 9), datetime(2022, 1, 3, 17))
+        repull = make_punch("1", datetime(2022, 1, 3, 9), datetime(2022, 1, 3, 17), in_punch_id=first.in_punch_id)
+        like = make_punch("1", datetime(2022, 1, 3, 9, 1), datetime(2022, 1, 3, 17))
+        overlap = make_punch("1", datetime(2022, 1, 3, 16), datetime(2022, 1, 3, 18))
+        open_punch = make_punch("2", datetime(2022, 1, 3, 9), None, out_punch_id=0)
+        marathon = make_punch("3", datetime(2022, 1, 3, 9), datetime(2022, 1, 4, 12))
+        preferences = PunchPreferences(rounding_type="None", auto_punch_in_after_hours=15, flag_edits_on_reports=True,
+                                       reject_like_punches_range=2,
+                                       global_authorized_web_punch_addresses="192.168.1.1")
+
+        exceptions = find_punch_exceptions([overlap, marathon, like, open_punch, repull, first],
+                                           punch_preferences=preferences)
+        self.assertEqual([(e.visible_id, e.kind) for e in exceptions],
+                         [("1", DUPLICATE), ("1", DUPLICATE), ("1", OVERLAP), ("2", MISSING_OUT), ("3", LONG_SHIFT)])
+        self.assertEqual(exceptions[2].other.in_time, first.in_time)
+
+        table = exceptions_table(exceptions)
+        self.assertEqual(table[0], EXCEPTION_TABLE_HEADER)
+        self.assertEqual(table[3][:4], ["1", OVERLAP, overlap.in_time, overlap.out_time])
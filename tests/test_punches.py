@@ -0,0 +1,147 @@
+from datetime import datetime
+from unittest import TestCase
+
+from totalpass_p600.punches import Punches, Punch, punch_key
+from tests.helpers import make_punch
+
+
+class TestPunchesRunningTotals(TestCase):
+    def setUp(self):
+        self.first = make_punch("1", datetime(2022, 1, 3, 9), datetime(2022, 1, 3, 17), wage=10)
+        self.second = make_punch("1", datetime(2022, 1, 4, 9), datetime(2022, 1, 4, 19), wage=10, std=8, ot1=2)
+        self.third = make_punch("2", datetime(2022, 1, 4, 12), datetime(2022, 1, 4, 16), wage=20)
+        self.punches = Punches()
+        self.punches.add_punches([self.first, self.second, self.third])
+
+    def test_totals_track_add_punch(self):
+        self.assertEqual(self.punches.total_labor, 80 + (80 + 30) + 80)
+        self.assertEqual(self.punches.total_employees, 2)
+        self.assertEqual(self.punches.total_hours, 8 + 10 + 4)
+        self.assertEqual(self.punches.hours_by_category["ot1"], 2)
+        self.assertEqual(self.punches.employee_punch_counts, {"1": 2, "2": 1})
+        self.assertEqual(list(self.punches.days()), [self.first.in_date, self.second.in_date])
+
+    def test_remove_punch(self):
+        self.punches.remove_punch(self.third)
+        self.assertEqual(self.punches.total_employees, 1)
+        self.assertEqual(self.punches.total_labor, 190)
+        self.punches.remove_punch(self.first)
+        self.assertEqual(list(self.punches.days()), [self.second.in_date])
+        self.punches.remove_punch(self.second)
+        self.assertEqual(self.punches.total_labor, 0)
+        self.assertEqual(self.punches.total_hours, 0)
+        with self.assertRaises(ValueError):
+            self.punches.remove_punch(self.second)
+
+    def test_replace_punch(self):
+        edited = make_punch("3", datetime(2022, 1, 4, 12), datetime(2022, 1, 4, 14), wage=20)
+        self.punches.replace_punch(self.third, edited)
+        self.assertIs(self.punches.punches[2], edited)
+        self.assertEqual(self.punches.total_labor, 80 + 110 + 40)
+        self.assertEqual(self.punches.employee_punch_counts, {"1": 2, "3": 1})
+
+
+class TestPunchesKeyedMerge(TestCase):
+    def setUp(self):
+        self.monday = make_punch("1", datetime(2022, 1, 3, 9), datetime(2022, 1, 3, 17))
+        self.tuesday = make_punch("1", datetime(2022, 1, 4, 9), datetime(2022, 1, 4, 17))
+
+    def test_overlapping_exports_do_not_double_count(self):
+        punches = Punches()
+        punches.add_punches([self.monday, self.tuesday])
+        repull = [self.monday.copy(), self.tuesday.copy()]
+        punches.add_punches(repull)
+        self.assertEqual(len(punches), 2)
+        self.assertEqual(punches.total_hours, 16)
+        self.assertIn(repull[0], punches)
+
+    def test_edited_punch_replaces_older(self):
+        punches = Punches()
+        punches.add_punches([self.monday, self.tuesday])
+        edited = self.monday.copy(update={"std": 7.5, "out_flags": "E"})
+        punches.add_punch(edited)
+        self.assertEqual(len(punches), 2)
+        self.assertIs(punches.punches[0], edited)
+        self.assertIs(punches.get(("1", edited.in_punch_id, edited.out_punch_id)), edited)
+        self.assertEqual(punches.total_hours, 15.5)
+
+    def test_merge_is_last_writer_wins(self):
+        punches = Punches()
+        punches.add_punches([self.monday, self.tuesday])
+        edited = self.monday.copy(update={"std": 7.5, "out_flags": "E"})
+        punches.add_punch(edited)
+        # an older export merged afterwards reverts the edit; exports carry no edit time to compare
+        punches.add_punches([self.monday.copy(), self.tuesday.copy()])
+        self.assertEqual(punches.punches[0], self.monday)
+        self.assertEqual(punches.total_hours, 16)
+
+    def test_replace_after_remove_keeps_positions(self):
+        wednesday = make_punch("1", datetime(2022, 1, 5, 9), datetime(2022, 1, 5, 17))
+        punches = Punches()
+        punches.add_punches([self.monday, self.tuesday, wednesday])
+        punches.remove_punch(self.monday.copy())
+        self.assertIsNone(punches.get(punch_key(self.monday)))
+        edited = wednesday.copy(update={"std": 6})
+        punches.add_punch(edited)
+        self.assertEqual(punches.punches, [self.tuesday, edited])
+        self.assertEqual(punches.total_hours, 14)
+
+    def test_unkeyed_punches_append(self):
+        punches = Punches()
+        leave = make_punch("1", datetime(2022, 1, 5, 0), datetime(2022, 1, 5, 8), in_punch_id=0, out_punch_id=0)
+        punches.add_punches([leave, leave.copy()])
+        self.assertEqual(len(punches), 2)
+
+    def test_bloom_mode(self):
+        punches = Punches(bloom_capacity=1000)
+        punches.add_punches([self.monday, self.tuesday, self.monday.copy(update={"std": 1})])
+        self.assertEqual(len(punches), 2)
+        self.assertIn(self.tuesday, punches)
+
+    def test_bloom_mode_readds_removed_punch(self):
+        punches = Punches(bloom_capacity=1000)
+        punches.add_punches([self.monday, self.tuesday])
+        punches.remove_punch(self.monday)
+        self.assertNotIn(self.monday, punches)
+        punches.add_punches([self.monday, self.monday.copy()])
+        self.assertEqual(len(punches), 2)
+        self.assertIn(self.monday, punches)
+
+
+EXPORT_ROW = {
+    "EmployeeID": "17", "LastName": "Smith", "FirstName": "Ann", "MiddleName": "", "DisplayAs": "Smith, Ann",
+    "Address": "", "VisibleID": "10", "SortDate": "7890", "InPunchID": "7891000", "intInDate": "5481",
+    "InDate": "01/03/2022", "InDow": "Mon", "InTime": "09:00a", "InFlags": "", "InPunchType": "0", "InNote": "",
+    "OutPunchID": "7891001", "intOutDate": "5481", "OutDate": "01/03/2022", "OutDow": "Mon", "OutTime": "05:30p",
+    "OutFlags": "", "OutPunchType": "1", "OutNote": "", "Department": "DELI", "Lunch": "", "ADJ": "0",
+    "STD": "480", "OT1": "30", "OT2": "", "Wage": "17.50", "intCalcFlags": "0", "MOT1": "", "MOT2": "",
+    "PinNumber": "1234", "Input": "",
+}
+
+
+class TestPunchFromExport(TestCase):
+    def test_export_row(self):
+        punch = Punch(**EXPORT_ROW)
+        self.assertEqual(punch.in_time, datetime(2022, 1, 3, 9))
+        self.assertEqual(punch.out_time, datetime(2022, 1, 3, 17, 30))
+        self.assertEqual((punch.std, punch.ot1, punch.ot2), (8, 0.5, 0))
+        self.assertEqual(punch.wage, 17.5)
+
+    def test_open_punch(self):
+        punch = Punch(**dict(EXPORT_ROW, OutDate="", OutTime="", OutPunchID="0"))
+        self.assertIsNone(punch.out_time)
+        self.assertIn("Out: --", repr(punch))
+        self.assertEqual(punch.labor_by_hour(10), 0)
+        self.assertEqual(punch.labor_dollars_by_hour(10), 0)
+
+        punches = Punches()
+        punches.add_punches([punch, Punch(**dict(EXPORT_ROW, InPunchID="7892000", OutPunchID="7892001"))])
+        self.assertEqual(len(punches.punches_by_hour(10)), 1)
+        self.assertEqual(len(punches.punches_by_hour(10, day="01/03/2022")), 1)
+
+    def test_add_row(self):
+        punches = Punches()
+        punches.add_punch(EXPORT_ROW)
+        punches.add_punch(dict(EXPORT_ROW, FirstName=" "))
+        self.assertEqual(len(punches), 1)
+        self.assertEqual(len(punches.punches_by_date("01/03/22")), 1)
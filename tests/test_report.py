@@ -0,0 +1,36 @@
+from datetime import date, datetime
+from types import SimpleNamespace
+from unittest import TestCase
+
+from totalpass_p600.employees import Employee, Employees
+from totalpass_p600.report import TimeClockReport
+from tests.helpers import make_punch
+from tests.test_punches import EXPORT_ROW
+
+
+class TestTimeClockReport(TestCase):
+    def test_assign_punches_to_employees(self):
+        employees = Employees()
+        for eid, display_id in enumerate(["1", "2", "3"]):
+            employees.add_employee(Employee(eid=eid, active=True, payroll_id=display_id, display_id=display_id,
+                                            first_name="First", middle_initial="", last_name="Last"))
+        report = TimeClockReport([], SimpleNamespace(employee_list=employees))
+        punches = [make_punch("1", datetime(2022, 1, 3, 9), datetime(2022, 1, 3, 17)),
+                   make_punch("2", datetime(2022, 1, 3, 9), datetime(2022, 1, 3, 17)),
+                   make_punch("1", datetime(2022, 1, 4, 9), datetime(2022, 1, 4, 17))]
+        report.punches.add_punches(punches)
+        report._assign_punches_to_employees()
+
+        self.assertEqual(len(employees["1"].punches), 2)
+        self.assertIs(employees["1"].punches.punches[1], punches[2])
+        self.assertEqual(len(employees["2"].punches), 1)
+        self.assertEqual(len(employees["3"].punches), 0)
+
+    def test_from_export_rows(self):
+        blank = dict.fromkeys(EXPORT_ROW, "")
+        blank["FirstName"] = " "  # the row the clock appends to every export
+        second = dict(EXPORT_ROW, InPunchID="7891002", OutPunchID="7891003", InDate="01/04/2022", intInDate="5482",
+                      OutDate="01/04/2022", intOutDate="5482")
+        report = TimeClockReport([EXPORT_ROW, second, blank], None)
+        self.assertEqual([punch.in_date for punch in report.punches],
+                         [date(2022, 1, 3), date(2022, 1, 4)])
@@ -0,0 +1,139 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+import pickle
+import zlib
+from unittest import TestCase, mock
+
+from totalpass_p600.api import TimeClockApi
+from totalpass_p600.employees import parse_employee_page, EmployeeRefresh
+from totalpass_p600.snapshot import EMPLOYEE_LAYOUT, EmployeeSnapshot, read_snapshot_header
+from tests.helpers import make_punch
+
+DATA = Path(__file__).parent / "test_data"
+
+
+class TestEmployeeSnapshot(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "employees.snap")
+        employee = parse_employee_page(5, (DATA / "employee_page.html").read_bytes())
+        employee.add_punch(make_punch(employee.display_id, datetime(2022, 1, 3, 9), datetime(2022, 1, 3, 17)))
+        refresh = EmployeeRefresh()
+        refresh.add(employee, "row", "page")
+        self.employee = employee
+        self.snapshot = EmployeeSnapshot.from_refresh("http://clock", refresh, created=datetime(2022, 1, 4))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        self.snapshot.save(self.path)
+        loaded = EmployeeSnapshot.load(self.path)
+        self.assertEqual((loaded.clock, loaded.created), ("http://clock", datetime(2022, 1, 4)))
+        employee = loaded.employees.by_eid(5)
+        self.assertEqual(employee.departments, self.employee.departments)
+        self.assertEqual(employee.accruals.accruals, self.employee.accruals.accruals)
+        self.assertEqual(employee.web_punch_settings, self.employee.web_punch_settings)
+        self.assertEqual(len(employee.punches), 0)
+        self.assertEqual(loaded.as_refresh().cached(5), (employee, "row", "page"))
+
+    def test_header(self):
+        self.snapshot.save(self.path)
+        self.assertEqual(read_snapshot_header(self.path),
+                         {"clock": "http://clock", "created": "2022-01-04T00:00:00", "employees": 1,
+                          "layout": EMPLOYEE_LAYOUT})
+        self.assertTrue(self.snapshot.is_fresh(timedelta(days=1), now=datetime(2022, 1, 4, 12)))
+        self.assertFalse(self.snapshot.is_fresh(timedelta(days=1), now=datetime(2022, 1, 6)))
+
+    def test_rejects_other_files(self):
+        with self.assertRaises(ValueError):
+            EmployeeSnapshot.from_bytes(b"not a snapshot at all")
+
+    def test_corrupt_snapshots_raise_value_error(self):
+        data = self.snapshot.to_bytes()
+        preamble_and_header = data[:data.index(b"}") + 1]
+        truncated = data[:-20]  # zlib.error
+        not_a_pickle = preamble_and_header + zlib.compress(b"garbage")  # UnpicklingError
+        wrong_shape = preamble_and_header + zlib.compress(pickle.dumps(["not", "employees"]))
+        for corrupt in (truncated, not_a_pickle, wrong_shape):
+            with self.assertRaises(ValueError):
+                EmployeeSnapshot.from_bytes(corrupt)
+
+    def test_rejects_other_employee_layouts(self):
+        with mock.patch("totalpass_p600.snapshot.EMPLOYEE_LAYOUT", "older"):
+            data = self.snapshot.to_bytes()
+        with self.assertRaises(ValueError):
+            EmployeeSnapshot.from_bytes(data)
+
+
+class TestApiWarmStart(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "employees.snap")
+        self.pages = {"employeelist.html": (DATA / "employeelist.html").read_bytes()}
+        detail = (DATA / "employee_page.html").read_text()
+        for eid, display_id in ((5, "10"), (6, "20"), (9, "30")):
+            self.pages[eid] = detail.replace('value="42"', f'value="{display_id}"').encode("utf-8")
+        self.fetched = 0
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_api(self):
+        def make_request(endpoint, method="GET", params=None, **kwargs):
+            if endpoint == TimeClockApi.EMPLOYEE_PAGE_ENDPOINT:
+                self.fetched += 1
+                return SimpleNamespace(content=self.pages[params["eid"]])
+            page = self.pages[endpoint]
+            return page if isinstance(page, SimpleNamespace) else SimpleNamespace(content=page)
+
+        self.pages["login.html"] = SimpleNamespace(content=b"", raise_for_status=lambda: None)
+
+        api = TimeClockApi.__new__(TimeClockApi)
+        api.session = mock.Mock()
+        api.address = "http://clock"
+        api.username, api.password = "admin", "secret"
+        api.employee_list = None
+        api._employee_refresh = None
+        api.make_request = make_request
+        return api
+
+    def test_warm_start_and_background_refresh(self):
+        cold = self.make_api()
+        self.assertIsNone(cold.load_employee_snapshot(self.path))
+        cold.refresh_employee_snapshot(self.path)
+        self.assertEqual(self.fetched, 3)
+
+        warm = self.make_api()
+        self.assertIsNotNone(warm.load_employee_snapshot(self.path))
+        self.assertEqual(sorted(e.display_id for e in warm.employee_list), ["10", "20", "30"])
+        warm.start_employee_snapshot_refresh(self.path).join()
+        self.assertEqual(self.fetched, 3)  # nothing changed, so no detail pages were fetched
+
+        other_clock = self.make_api()
+        other_clock.address = "http://other"
+        self.assertIsNone(other_clock.load_employee_snapshot(self.path))
+        self.assertIsNone(self.make_api().load_employee_snapshot(self.path, max_age=timedelta(0)))
+
+    def test_corrupt_snapshot_means_cold_start(self):
+        with open(self.path, "wb") as f:
+            f.write(b"TPES\0\x02\0\0\0\x02{}" + b"truncated")
+        self.assertIsNone(self.make_api().load_employee_snapshot(self.path))
+
+    def test_background_refresh_uses_its_own_session(self):
+        api = self.make_api()
+        sessions = []
+        refresh_employees = TimeClockApi.refresh_employees
+
+        def record_session(client, previous=None, active=True):
+            sessions.append(client.session)
+            return refresh_employees(client, previous, active)
+
+        with mock.patch.object(TimeClockApi, "refresh_employees", record_session):
+            api.start_employee_snapshot_refresh(self.path).join()
+        self.assertEqual(len(sessions), 1)
+        self.assertIsNot(sessions[0], api.session)
+        self.assertEqual(len(api.employee_list), 3)
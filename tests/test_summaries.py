@@ -0,0 +1,106 @@
+from datetime import datetime, date, time
+from types import SimpleNamespace
+from unittest import TestCase
+
+from totalpass_p600.pay_periods import PayPeriodCalendar
+from totalpass_p600.summaries import PayPeriodSummaries
+from tests.helpers import make_punch
+
+
+class TestPayPeriodCalendar(TestCase):
+    def test_bi_weekly(self):
+        calendar = PayPeriodCalendar("Bi-Weekly", date(2021, 12, 19))
+        self.assertEqual(calendar.period_start(date(2022, 1, 1)), date(2021, 12, 19))
+        self.assertEqual(calendar.period_start(date(2022, 1, 2)), date(2022, 1, 2))
+        self.assertEqual(calendar.period_start(date(2021, 12, 18)), date(2021, 12, 5))
+        self.assertEqual(calendar.period_end(date(2022, 1, 2)), date(2022, 1, 15))
+
+    def test_monthly_clamps_short_months(self):
+        calendar = PayPeriodCalendar("Monthly", date(2022, 1, 31))
+        self.assertEqual(calendar.period_start(date(2022, 2, 27)), date(2022, 1, 31))
+        self.assertEqual(calendar.period_start(date(2022, 2, 28)), date(2022, 2, 28))
+        self.assertEqual(calendar.period_end(date(2022, 2, 28)), date(2022, 3, 30))
+
+    def test_semi_monthly(self):
+        calendar = PayPeriodCalendar("Semi-Monthly", date(2022, 1, 1), (1, 16))
+        self.assertEqual(calendar.period_start(date(2022, 1, 15)), date(2022, 1, 1))
+        self.assertEqual(calendar.period_end(date(2022, 1, 16)), date(2022, 1, 31))
+        self.assertEqual(calendar.period_end(date(2022, 2, 1)), date(2022, 2, 15))
+
+    def test_from_preferences_unclamps_month_end(self):
+        payroll = SimpleNamespace(pay_period_type="Semi-Monthly", last_pay_start=date(2022, 2, 15),
+                                  this_pay_start=date(2022, 2, 28), next_pay_start=date(2022, 3, 15),
+                                  day_start=time(), week_start="Sun")
+        calendar = PayPeriodCalendar.from_preferences(payroll)
+        self.assertEqual(calendar.semi_monthly_days, (15, 31))
+        self.assertEqual(calendar.period_start(date(2022, 3, 31)), date(2022, 3, 31))
+        self.assertEqual(calendar.period_id(date(2022, 3, 31)), 2)
+
+        payroll.last_pay_start, payroll.this_pay_start, payroll.next_pay_start = (
+            date(2022, 1, 30), date(2022, 2, 14), date(2022, 2, 28))
+        self.assertEqual(PayPeriodCalendar.from_preferences(payroll).semi_monthly_days, (14, 30))
+
+        payroll.pay_period_type = "Monthly"
+        payroll.last_pay_start, payroll.this_pay_start, payroll.next_pay_start = (
+            date(2022, 1, 31), date(2022, 2, 28), date(2022, 3, 31))
+        calendar = PayPeriodCalendar.from_preferences(payroll)
+        self.assertEqual(calendar.period_start(date(2022, 5, 31)), date(2022, 5, 31))
+
+    def test_period_ids(self):
+        calendar = PayPeriodCalendar("Semi-Monthly", date(2022, 1, 1), (1, 16))
+        self.assertEqual(calendar.period_id(date(2022, 1, 10)), 0)
+        self.assertEqual(calendar.period_id(date(2021, 12, 31)), -1)
+        self.assertEqual(calendar.period_id(date(2023, 1, 16)), 25)
+        self.assertEqual(calendar.period_bounds(25), (date(2023, 1, 16), date(2023, 1, 31)))
+        self.assertEqual(calendar.period_bounds(-1), (date(2021, 12, 16), date(2021, 12, 31)))
+
+    def test_payroll_day_and_week(self):
+        calendar = PayPeriodCalendar("Weekly", date(2022, 1, 2), day_start=time(4), week_start="Mon")
+        self.assertEqual(calendar.payroll_date(datetime(2022, 1, 3, 3, 59)), date(2022, 1, 2))
+        self.assertEqual(calendar.payroll_date(datetime(2022, 1, 3, 4)), date(2022, 1, 3))
+        self.assertEqual(calendar.week_start_date(date(2022, 1, 2)), date(2021, 12, 27))
+
+    def test_bucket(self):
+        calendar = PayPeriodCalendar("Monthly", date(2022, 1, 31), day_start=time(4), week_start="Mon")
+        times = [datetime(2022, 1, 31, 3), datetime(2022, 1, 31, 5), datetime(2022, 3, 1, 12)]
+        period_ids, week_starts = calendar.bucket(times)
+        self.assertEqual(period_ids.tolist(), [-1, 0, 1])
+        self.assertEqual(week_starts.tolist(), [date(2022, 1, 24), date(2022, 1, 31), date(2022, 2, 28)])
+
+
+class TestPayPeriodSummaries(TestCase):
+    def setUp(self):
+        self.summaries = PayPeriodSummaries(PayPeriodCalendar("Weekly", date(2022, 1, 2)))
+        self.punches = [make_punch("1", datetime(2022, 1, 3, 9), datetime(2022, 1, 3, 17), department="DELI"),
+                        make_punch("2", datetime(2022, 1, 4, 9), datetime(2022, 1, 4, 13), department="DELI"),
+                        make_punch("1", datetime(2022, 1, 10, 9), datetime(2022, 1, 10, 17), department="BAKERY")]
+        self.summaries.sync(self.punches)
+
+    def test_summary(self):
+        summary = self.summaries.summary(date(2022, 1, 5))
+        self.assertEqual((summary.period_start, summary.period_end), (date(2022, 1, 2), date(2022, 1, 8)))
+        self.assertEqual(summary.employees["1"].total_hours, 8)
+        self.assertEqual(summary.departments["DELI"].total_hours, 12)
+        self.assertEqual(summary.total.labor, 12 * 15)
+        self.assertEqual(self.summaries.periods(), [date(2022, 1, 2), date(2022, 1, 9)])
+
+    def test_only_changed_periods_rebuild(self):
+        first = self.summaries.summary(date(2022, 1, 2))
+        second = self.summaries.summary(date(2022, 1, 9))
+        self.assertEqual(self.summaries.sync([p.copy() for p in self.punches]), set())
+        edit = self.punches[2].copy(update={"std": 10})
+        self.assertEqual(self.summaries.sync([edit]), {date(2022, 1, 9)})
+        self.assertIs(self.summaries.summary(date(2022, 1, 2)), first)
+        rebuilt = self.summaries.summary(date(2022, 1, 9))
+        self.assertIsNot(rebuilt, second)
+        self.assertEqual(rebuilt.total.std, 10)
+
+    def test_punch_edited_into_another_period(self):
+        first = self.summaries.summary(date(2022, 1, 2))
+        moved = self.punches[1].copy(update={"in_date": date(2022, 1, 11), "in_time": datetime(2022, 1, 11, 9),
+                                             "out_time": datetime(2022, 1, 11, 13)})
+        self.assertEqual(self.summaries.sync([moved]), {date(2022, 1, 2), date(2022, 1, 9)})
+        self.assertIsNot(self.summaries.summary(date(2022, 1, 2)), first)
+        self.assertEqual(self.summaries.summary(date(2022, 1, 2)).total.total_hours, 8)
+        self.assertEqual(self.summaries.summary(date(2022, 1, 9)).total.total_hours, 12)
+        self.assertEqual(len(self.summaries.punches(date(2022, 1, 2))), 1)
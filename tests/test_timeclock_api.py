@@ -1,8 +1,13 @@
+import io
 import os
-from unittest import TestCase
+from datetime import date
+from pathlib import Path
+from unittest import TestCase, mock
 
 from totalpass_p600.api import TimeClockApi
+from totalpass_p600.date_range_presets import DateRangePreset, resolve_preset
 from totalpass_p600.employees import Employees
+from totalpass_p600.timeclock_preferences import Preferences
 
 
 class TestTimeClockApi(TestCase):
@@ -27,3 +32,45 @@ class TestTimeClockApi(TestCase):
         employees = api.get_employee_list()
         self.assertTrue(len(employees) > 0)
         self.assertIsInstance(employees, Employees)
+
+
+class TestTimecardExportStream(TestCase):
+    def setUp(self):
+        import requests
+
+        self.response = requests.models.Response()
+        self.response.status_code = 200
+        self.response.raw = io.BytesIO(b"FirstName,InDate\rAnn,01/03/2022\rBob,01/04/2022\r")
+        self.response.close = mock.Mock(wraps=self.response.close)
+        self.api = object.__new__(TimeClockApi)
+        self.api.address = "10.0.0.5"
+        self.api.make_request = mock.Mock(side_effect=lambda endpoint, *args, **kwargs:
+                                          self.response if kwargs.get("stream") else mock.Mock())
+
+    def test_response_closed_when_reader_stops_early(self):
+        rows = self.api.iter_timecard_export("01/01/22", "01/15/22")
+        self.assertEqual(next(rows)["FirstName"], "Ann")
+        self.response.close.assert_not_called()
+        rows.close()
+        self.response.close.assert_called_once()
+        self.assertTrue(self.response.raw.closed)
+
+    def test_response_closed_after_last_row(self):
+        self.assertEqual(len(list(self.api.iter_timecard_export("01/01/22", "01/15/22"))), 2)
+        self.response.close.assert_called_once()
+
+    def test_preset_dates(self):
+        preferences = Preferences.from_html((Path(__file__).parent / "test_data" / "preferences.html").read_bytes())
+        self.api.preferences = None
+        self.api.get_preferences = mock.Mock(return_value=preferences)
+        self.assertEqual(len(list(self.api.iter_timecard_export(DateRangePreset.THIS_PAY_PERIOD))), 2)
+        self.api.get_preferences.assert_called_once_with()
+        start, end = resolve_preset(DateRangePreset.THIS_PAY_PERIOD, payroll=preferences.payroll_preferences)
+        endpoint = self.api.make_request.call_args_list[-1].args[0]
+        self.assertIn(f"from={start:%m/%d/%y}&to={end:%m/%d/%y}", endpoint)
+
+        self.assertEqual(self.api.resolve_dates("01/01/22", date(2022, 1, 15)), (date(2022, 1, 1), date(2022, 1, 15)))
+        with self.assertRaises(ValueError):
+            self.api.resolve_dates(DateRangePreset.TODAY, "01/15/22")
+        with self.assertRaises(ValueError):
+            self.api.resolve_dates("01/01/22")
@@ -8,11 +8,10 @@ from totalpass_p600.timeclock_preferences import (Preferences, PreferenceForm, P
                                                   EmployeeInputPreferences, MultiClockPreferences, CustomField,
                                                   CustomFieldPreferences, DevicePreferences,
                                                   PunchPreferences, AlertPreferences, EmailPreferences,
-                                                  CompanyInformation, DeviceInformation, HiddenInputs, str_to_time)
+                                                  CompanyInformation, DeviceInformation, HiddenInputs, str_to_time,
+                                                  PreferencesIndex, PREFERENCE_SECTIONS, read_preferences_page)
 
-html_file = r"./test_data/preferences.html"
-
-pref_file = Path(html_file)
+pref_file = Path(__file__).parent / "test_data" / "preferences.html"
 pref_html = pref_file.read_text()
 pref_soup = BeautifulSoup(pref_html, 'html.parser')
 form_soup = pref_soup.find('form', {'id': 'formMain'})
@@ -483,6 +482,62 @@ class TestPreferences(TestCase):
         self.assertIsInstance(preferences.preferences_form, PreferenceForm)
 
 
+class TestPreferencesIndex(TestCase):
+    SECTIONS = ["company_information", "payroll_preferences", "overtime_preferences", "punch_preferences",
+                "employee_input_preferences", "device_information", "device_preferences", "multi_clock_preferences",
+                "custom_field_preferences", "email_preferences", "alert_preferences"]
+
+    def test_lxml_index_matches_soup_index(self):
+        self.assertEqual(PreferencesIndex.from_html(pref_html), PreferencesIndex.from_soup(form_soup))
+
+    def test_from_html_matches_from_soup(self):
+        fast = Preferences.from_html(pref_html)
+        reference = Preferences.from_soup(pref_soup)
+        for section in self.SECTIONS:
+            self.assertEqual(getattr(fast, section), getattr(reference, section), section)
+        self.assertEqual(fast.preferences_form.hidden_inputs.hidden_inputs,
+                         reference.preferences_form.hidden_inputs.hidden_inputs)
+        self.assertEqual(fast.preferences_form.hidden_inputs.hidden_inputs["sessionToken"], "4f1c9a2e")
+
+    def test_missing_value(self):
+        index = PreferencesIndex.from_html(pref_html)
+        self.assertEqual(index.selected("prefs5"), "Bi-Weekly")
+        with self.assertRaises(KeyError):
+            index.value("prefsDiv42")
+
+
+class TestLazyPreferences(TestCase):
+    def test_sections_load_on_first_access(self):
+        preferences = Preferences.from_html(pref_html)
+        self.assertEqual(preferences.loaded_sections, [])
+        self.assertEqual(preferences.payroll_preferences.week_start, "Sun")
+        self.assertEqual(preferences.loaded_sections, ["payroll_preferences"])
+        self.assertIs(preferences.payroll_preferences, preferences.payroll_preferences)
+
+    def test_index_released_when_all_sections_loaded(self):
+        preferences = Preferences.from_html(pref_html)
+        for section in PREFERENCE_SECTIONS:
+            getattr(preferences, section)
+        self.assertIsNone(preferences._index)
+        self.assertEqual(preferences, Preferences.from_soup(pref_soup))
+
+    def test_release(self):
+        preferences = Preferences.from_html(pref_html)
+        overtime = preferences.overtime_preferences
+        preferences.release()
+        self.assertIs(preferences.overtime_preferences, overtime)
+        with self.assertRaises(AttributeError):
+            preferences.email_preferences
+
+    def test_constructor(self):
+        preferences = read_preferences_page(pref_soup)
+        self.assertIsNone(preferences._index)
+        self.assertEqual(preferences.company_information.company_name, "Capella Market")
+        self.assertFalse(hasattr(preferences.preferences_form, "form"))
+        with self.assertRaises(TypeError):
+            Preferences(company_information=preferences.company_information)
+
+
 class TestCompanyInformation(TestCase):
     def test_from_soup(self):
         company_info = CompanyInformation.from_soup(form_soup)
@@ -82,6 +82,46 @@ class TestGetTimeRange(TestCase):
                           datetime(2019, 1, 5), datetime(2019, 1, 6), datetime(2019, 1, 7)])
 
 
+class TestIterTimeRange(TestCase):
+    def test_is_lazy(self):
+        from totalpass_p600.util import iter_time_range
+        from datetime import datetime
+        times = iter_time_range(datetime(2019, 1, 1), datetime(2119, 1, 1), span_unit="seconds")
+        self.assertEqual(next(times), datetime(2019, 1, 1))
+        self.assertEqual(next(times), datetime(2019, 1, 1, 0, 0, 1))
+
+    def test_months_follow_calendar(self):
+        from totalpass_p600.util import get_time_range
+        from datetime import datetime
+        self.assertEqual(get_time_range(datetime(2020, 1, 31), datetime(2020, 5, 1), span_unit="months"),
+                         [datetime(2020, 1, 31), datetime(2020, 2, 29), datetime(2020, 3, 31), datetime(2020, 4, 30)])
+        self.assertEqual(get_time_range(datetime(2020, 2, 29), datetime(2022, 3, 1), span_unit="years"),
+                         [datetime(2020, 2, 29), datetime(2021, 2, 28), datetime(2022, 2, 28)])
+
+    def test_keeps_time_of_day(self):
+        from totalpass_p600.util import get_time_range
+        from datetime import date, datetime
+        self.assertEqual(get_time_range(datetime(2019, 1, 1, 9, 30), datetime(2019, 1, 1, 11), span_unit="hours"),
+                         [datetime(2019, 1, 1, 9, 30), datetime(2019, 1, 1, 10, 30)])
+        self.assertEqual(get_time_range(date(2019, 1, 2), date(2019, 1, 1)),
+                         [datetime(2019, 1, 1), datetime(2019, 1, 2)])
+
+    def test_invalid_span_unit(self):
+        from totalpass_p600.util import get_time_range
+        from datetime import datetime
+        with self.assertRaises(ValueError):
+            get_time_range(datetime(2019, 1, 1), span_unit="fortnights")
+
+    def test_time_range_array(self):
+        import numpy as np
+        from totalpass_p600.util import get_time_range, time_range_array
+        from datetime import datetime
+        for unit, stop in (("hours", datetime(2019, 1, 2, 5)), ("months", datetime(2019, 12, 31))):
+            times = time_range_array(datetime(2019, 1, 31), stop, span_unit=unit)
+            self.assertEqual(times.dtype, np.dtype("datetime64[us]"))
+            self.assertEqual(times.tolist(), get_time_range(datetime(2019, 1, 31), stop, span_unit=unit))
+
+
 class TestDateToDatetime(TestCase):
     def test_date_to_datetime(self):
         self.fail()
@@ -133,3 +173,14 @@ class TestTimeSpan(TestCase):
 
         month_span = get_date_time_frame_span(time_span="month", start_date=date(2022, 4, 1))
         self.assertEqual(month_span, (date(2022, 3, 1), date(2022, 4, 1)))
+
+
+class TestBloomFilter(TestCase):
+    def test_membership(self):
+        from totalpass_p600.util import BloomFilter
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(("emp", i, i + 1))
+        self.assertTrue(all(("emp", i, i + 1) in bloom for i in range(1000)))
+        false_positives = sum(("other", i, i) in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
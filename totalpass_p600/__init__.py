@@ -1,9 +1,41 @@
 """
 SDK for IconTime TotalPass P600 Timeclocks
+
+Names below are imported on first use (PEP 562), so scripts that only need e.g. util or backup
+do not pay for requests, bs4, lxml and pydantic at startup.
 """
-from .api import TimeClockApi
-# from .report import TimeClockReport
-# from .punches import Punches, Punch
-# from .employees import Employee, Employees
-#
-# __all__ = [TimeClockApi, TimeClockReport, Punches, Punch, Employees, Employee]
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .api import TimeClockApi
+    from .employees import Employee, Employees
+    from .punches import Punch, Punches
+    from .report import TimeClockReport
+
+# public name -> submodule defining it
+_LAZY_ATTRIBUTES = {
+    "TimeClockApi": "api",
+    "TimeClockReport": "report",
+    "Punches": "punches",
+    "Punch": "punches",
+    "Employees": "employees",
+    "Employee": "employees",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
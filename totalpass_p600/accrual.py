@@ -24,3 +24,157 @@ class Accruals:
         self.personal: Accrual = None
         for accrual in accruals:
             setattr(self, accrual.name.lower(), accrual)
+
+
+# punch types that draw down an accrual, by accrual name
+LEAVE_PUNCH_ACCRUALS = {
+    54: "vacation",
+    55: "sick",
+}
+
+
+@dataclass
+class AccrualProjection:
+    """
+    Projected accrual balances, one entry per employee accrual.
+    Arrays are numpy arrays aligned with display_ids and names.
+    """
+    as_of: date
+    display_ids: list[str]
+    names: list[str]
+    hours_available: "numpy.ndarray"
+    hours_used: "numpy.ndarray"
+    wages: "numpy.ndarray"
+
+    @property
+    def liability(self) -> "numpy.ndarray":
+        """
+        Dollar value of each projected balance at the employee's primary department wage
+        """
+        return self.hours_available * self.wages
+
+    def total_liability(self, name: str = None) -> float:
+        if name is None:
+            return float(self.liability.sum())
+        mask = [accrual_name == name.lower() for accrual_name in self.names]
+        return float(self.liability[mask].sum())
+
+    def rows(self):
+        for i, display_id in enumerate(self.display_ids):
+            yield {"display_id": display_id, "accrual": self.names[i], "hours_available": float(self.hours_available[i]),
+                   "hours_used": float(self.hours_used[i]), "liability": float(self.hours_available[i] * self.wages[i])}
+
+
+def project_accruals(employees, punches, as_of: date) -> AccrualProjection:
+    """
+    Project every employee's accrual balances to as_of in one set of array operations.
+
+    Starting from each accrual's balance on its last calculated date, hours accrue daily at
+    yearly_hours / 365, vacation (54) and sick (55) punches after that date are deducted, the balance is
+    capped at yearly_max_hours (when set) and floored at zero unless negatives are allowed. On each
+    anniversary of the employee's reset date the balance carried over is capped at reset_amount and
+    hours used start again from zero.
+    :param employees: Employees with accrual details loaded
+    :param punches: Punches or any iterable of Punch
+    :param as_of: date to project to
+    :rtype: AccrualProjection
+    """
+    import numpy as np
+
+    display_ids, names, numbers, last_calculated, reset_dates, wages = [], [], [], [], [], []
+    for employee in employees:
+        accruals = employee.accruals
+        if not isinstance(accruals, Accruals):
+            continue
+        wage = _primary_wage(employee.departments)
+        for accrual in accruals.accruals:
+            display_ids.append(employee.display_id)
+            names.append(accrual.name.lower())
+            numbers.append((float(accrual.hours_available or 0), float(accrual.hours_used or 0),
+                            float(accrual.yearly_hours or 0), float(accrual.yearly_max_hours or 0),
+                            float(accrual.reset_amount or 0), bool(accrual.allow_negative)))
+            last_calculated.append(accrual.last_calculated_date)
+            reset_dates.append(accruals.reset_date)
+            wages.append(wage)
+
+    count = len(display_ids)
+    values = np.array(numbers, dtype=float).reshape(count, 6)
+    available, used, yearly, yearly_max, reset_amount = (values[:, i].copy() for i in range(5))
+    allow_negative = values[:, 5].astype(bool)
+    start = np.array([day.toordinal() for day in last_calculated], dtype=np.int64)
+    end = as_of.toordinal()
+
+    # reset anniversaries after each last calculated date, padded past as_of
+    schedules = [_resets_between(reset_date, last, as_of) for reset_date, last in zip(reset_dates, last_calculated)]
+    reset_count = max((len(schedule) for schedule in schedules), default=0)
+    resets = np.full((count, reset_count), end + 1, dtype=np.int64)
+    for i, schedule in enumerate(schedules):
+        resets[i, :len(schedule)] = schedule
+
+    # leave hours used after each accrual's last calculated date, bucketed by reset segment
+    row_index = {(display_id, name): i for i, (display_id, name) in enumerate(zip(display_ids, names))}
+    usage_rows, usage_days, usage_hours = [], [], []
+    for punch in punches:
+        name = LEAVE_PUNCH_ACCRUALS.get(punch.in_punch_type)
+        i = row_index.get((punch.visible_id, name)) if name else None
+        if i is not None:
+            usage_rows.append(i)
+            usage_days.append(punch.in_date.toordinal())
+            usage_hours.append(punch.total_hours)
+    usage = np.zeros((count, reset_count + 1))
+    if usage_rows:
+        usage_rows = np.array(usage_rows, dtype=np.int64)
+        usage_days = np.array(usage_days, dtype=np.int64)
+        in_window = (usage_days > start[usage_rows]) & (usage_days <= end)
+        segments = (resets[usage_rows] <= usage_days[:, None]).sum(axis=1)
+        np.add.at(usage, (usage_rows[in_window], segments[in_window]), np.array(usage_hours)[in_window])
+
+    daily = yearly / 365
+    boundaries = np.column_stack([start, np.minimum(resets, end), np.full(count, end)])
+    for segment in range(reset_count + 1):
+        days = np.clip(boundaries[:, segment + 1] - boundaries[:, segment], 0, None)
+        available += daily * days - usage[:, segment]
+        used += usage[:, segment]
+        available = np.where(yearly_max > 0, np.minimum(available, yearly_max), available)
+        available = np.where(allow_negative, available, np.maximum(available, 0))
+        if segment < reset_count:
+            resetting = resets[:, segment] <= end
+            available = np.where(resetting, np.minimum(available, reset_amount), available)
+            used = np.where(resetting, 0.0, used)
+
+    return AccrualProjection(as_of=as_of, display_ids=display_ids, names=names, hours_available=available,
+                             hours_used=used, wages=np.array(wages, dtype=float))
+
+
+def _resets_between(reset_date: date, after: date, until: date) -> list[int]:
+    """
+    Ordinals of the anniversaries of reset_date in (after, until]
+    """
+    if reset_date is None:
+        return []
+    resets = []
+    year = after.year
+    while True:
+        anniversary = _anniversary(reset_date, year)
+        if anniversary > until:
+            return resets
+        if anniversary > after:
+            resets.append(anniversary.toordinal())
+        year += 1
+
+
+def _anniversary(day: date, year: int) -> date:
+    try:
+        return day.replace(year=year)
+    except ValueError:  # Feb 29 in a non leap year
+        return day.replace(year=year, day=28)
+
+
+def _primary_wage(departments: dict) -> float:
+    """
+    Wage of the department with the lowest order, or 0 if the employee has none
+    """
+    if not departments:
+        return 0.0
+    primary = min(departments.values(), key=lambda department: float(department.get("order") or 0))
+    return float(primary.get("wage") or 0)
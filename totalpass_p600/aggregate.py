@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from typing import Iterable, Sequence, TYPE_CHECKING
+
+from .conversions import parse_date, parse_number
+
+if TYPE_CHECKING:
+    from .punches import Punch
+
+# timecards.csv column each grouping is keyed on
+GROUPINGS = {
+    "employee": "VisibleID",
+    "department": "Department",
+    "day": "InDate",
+}
+
+
+class PunchTotals:
+    """Running totals for one aggregation group. Hours are converted from the export's minutes."""
+
+    __slots__ = ("punches", "std", "ot1", "ot2", "labor")
+
+    def __init__(self):
+        self.punches = 0
+        self.std = 0.0
+        self.ot1 = 0.0
+        self.ot2 = 0.0
+        self.labor = 0.0
+
+    @property
+    def total_hours(self) -> float:
+        return self.std + self.ot1 + self.ot2
+
+    def add_punch(self, punch: Punch) -> None:
+        self.punches += 1
+        self.std += punch.std
+        self.ot1 += punch.ot1
+        self.ot2 += punch.ot2
+        self.labor += punch.labor
+
+    def as_dict(self) -> dict[str, float]:
+        return {"punches": self.punches, "std": self.std, "ot1": self.ot1, "ot2": self.ot2,
+                "total_hours": self.total_hours, "labor": self.labor}
+
+    def __repr__(self):
+        return f"PunchTotals(punches={self.punches}, hours={self.total_hours:.2f}, labor={self.labor:.2f})"
+
+
+class PunchAggregator:
+    """
+    Fold raw timecards.csv rows into per-group hour and labor totals as they are read.
+    Rows are never turned into Punch objects, so memory depends on the number of groups, not the
+    number of punches.
+
+    aggregator = PunchAggregator(by=("department", "day"))
+    aggregator.add_rows(api.iter_timecard_export("01/01/22", "12/31/22"))
+    aggregator[("DELI", date(2022, 1, 3))].labor
+    """
+
+    def __init__(self, by: Sequence[str] = ("employee",), ot1_factor: float = 1.5, ot2_factor: float = 2):
+        """
+        :param by: one or more of employee, department, day
+        :param ot1_factor: labor multiplier for ot1 hours
+        :param ot2_factor: labor multiplier for ot2 hours
+        """
+        if isinstance(by, str):
+            by = (by,)
+        for grouping in by:
+            if grouping not in GROUPINGS:
+                raise ValueError(f"Invalid grouping: {grouping}")
+        self.by = tuple(by)
+        self.ot1_factor = ot1_factor
+        self.ot2_factor = ot2_factor
+        self.totals: dict[tuple, PunchTotals] = {}
+        self._columns = [GROUPINGS[grouping] for grouping in self.by]
+
+    def add_row(self, row: dict[str, str]) -> None:
+        """
+        Fold one export row into its group. Blank rows are skipped the same way Punches.add_punch does.
+        """
+        if row.get("FirstName") == " " or not row.get("InDate"):
+            return
+        key = tuple(self._key_value(column, row[column]) for column in self._columns)
+        totals = self.totals.get(key)
+        if totals is None:
+            totals = self.totals[key] = PunchTotals()
+        std = _minutes_to_hours(row.get("STD"))
+        ot1 = _minutes_to_hours(row.get("OT1"))
+        ot2 = _minutes_to_hours(row.get("OT2"))
+        wage = parse_number(row.get("Wage") or 0)
+        totals.punches += 1
+        totals.std += std
+        totals.ot1 += ot1
+        totals.ot2 += ot2
+        totals.labor += wage * (std + ot1 * self.ot1_factor + ot2 * self.ot2_factor)
+
+    def add_rows(self, rows: Iterable[dict[str, str]]) -> PunchAggregator:
+        for row in rows:
+            self.add_row(row)
+        return self
+
+    @staticmethod
+    def _key_value(column, value):
+        if column == "InDate":
+            return parse_date(value)
+        return value
+
+    def __getitem__(self, key) -> PunchTotals:
+        if not isinstance(key, tuple):
+            key = (key,)
+        return self.totals[key]
+
+    def __iter__(self):
+        return iter(self.totals.items())
+
+    def __len__(self):
+        return len(self.totals)
+
+
+def _minutes_to_hours(value) -> float:
+    if not value:
+        return 0.0
+    return parse_number(value) / 60
@@ -1,22 +1,44 @@
-import asyncio
+from __future__ import annotations
+
+import codecs
+import copy
 import csv
 import re
+import threading
+from datetime import date, datetime, timedelta
+from typing import Iterator, Sequence, TYPE_CHECKING
 
-import dateutil.parser
-import requests
-
+from .aggregate import PunchAggregator
 from .backup import Backup
-from .employees import Employee, parse_employee_list, Employees
+from .conversions import parse_date
+from .date_range_presets import DateRangePreset, resolve_preset
+from .employees import (Employee, parse_employee_list, Employees, EmployeeRefresh, iter_employee_list_fingerprints,
+                        parse_employee_page, content_fingerprint)
 from .report import TimeClockReport
-from .timeclock_preferences import Preferences
+from .snapshot import EmployeeSnapshot
+from .timeclock_preferences import Preferences, PreferenceUpdate
+
+if TYPE_CHECKING:
+    import requests
 
 
 class TimeClockApi:
-    TIMECLOCK_TIMESTAMP_EPOCH_DATE = dateutil.parser.parse("01/01/07")
+    TIMECLOCK_TIMESTAMP_EPOCH_DATE = datetime(2007, 1, 1)
     OT1_FACTOR = 1.5
     OT2_FACTOR = 2
+    EXPORT_CHUNK_SIZE = 64 * 1024
+    EMPLOYEE_PAGE_ENDPOINT = "employee.html"
 
-    def __init__(self, timeclock_address, user, password):
+    def __init__(self, timeclock_address, user, password, employee_snapshot: str = None,
+                 snapshot_max_age: timedelta = None, load_data: bool = True):
+        """
+        :param employee_snapshot: path of an EmployeeSnapshot to warm start employee_list from. when a
+                                  snapshot for this clock exists it is loaded instead of fetching the
+                                  employee list, then refreshed and rewritten in a background thread
+        :param snapshot_max_age: ignore snapshots older than this
+        :param load_data: if false, only log in. employee_list and preferences stay None (or the snapshot's
+                          employees) until fetched, for clients that only need exports or backups
+        """
         if timeclock_address.startswith("http"):
             self.address = timeclock_address
         else:
@@ -25,13 +47,28 @@ class TimeClockApi:
         self.username = user
         self.logged_in = False
         self._user_agent = "TimePass Python Client"
+        # requests and asyncio are only imported once a client is created, so importing the module stays cheap
+        import asyncio
+        import requests
+
         self.session = requests.session()
         self._connect()
         self.employee_list: Employees = None
         self.preferences: Preferences = None
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(self.__load_time_clock_data())
-        loop.close()
+        self.employee_snapshot = employee_snapshot
+        self.employee_refresh_thread: threading.Thread = None
+        self._employee_refresh: EmployeeRefresh = None
+        if employee_snapshot:
+            self.load_employee_snapshot(employee_snapshot, snapshot_max_age)
+        if load_data:
+            # a private loop, so clients can be created from worker threads and more than once per thread
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(self.__load_time_clock_data())
+            finally:
+                loop.close()
+        if employee_snapshot:
+            self.start_employee_snapshot_refresh(employee_snapshot)
 
     def _connect(self) -> None:
         endpoint = "login.html"
@@ -50,6 +87,25 @@ class TimeClockApi:
         res = self.make_request(endpoint=endpoint)
         return Preferences.from_html(res.content)
 
+    def update_preferences(self, changes: dict) -> PreferenceUpdate:
+        """
+        write preference changes to the clock. the current preferences are fetched and diffed against
+        changes, and one form POST is sent containing the hidden inputs and only the fields that differ.
+        nothing is posted when no value would change.
+        :param changes: section name -> {field: value}, see Preferences.changed_fields
+        :rtype: PreferenceUpdate
+        """
+        current = self.get_preferences()
+        changed = current.changed_fields(changes)
+        if not changed:
+            self.preferences = current
+            return PreferenceUpdate(self.address)
+        form = current.preferences_form
+        self.make_request(form.action or "preferences.html", (form.method or "POST").upper(),
+                          data=form.payload(changed))
+        self.preferences = self.get_preferences()
+        return PreferenceUpdate(self.address, changed=changed)
+
     def make_request(
             self,
             endpoint,
@@ -86,17 +142,27 @@ class TimeClockApi:
         res.raise_for_status()
         return res
 
-    def get_timecard_export(self, from_date, to_date, emp_number=None) -> list[dict[str, str]]:
+    def get_timecard_export(self, from_date, to_date=None, emp_number=None) -> list[dict[str, str]]:
         """
         download a csv timecard report for the given dates and return a csv parsed list
-        :param from_date:
-        :param to_date:
+        :param from_date: first day, or a DateRangePreset, see resolve_dates
+        :param to_date: last day. None with a preset
         :param emp_number:
         :rtype: list of OrderedDict
         """
+        return list(self.iter_timecard_export(from_date, to_date, emp_number))
 
-        from_date = dateutil.parser.parse(from_date)
-        to_date = dateutil.parser.parse(to_date)
+    def iter_timecard_export(self, from_date, to_date=None, emp_number=None) -> Iterator[dict[str, str]]:
+        """
+        stream a csv timecard report for the given dates, yielding each row as it is downloaded
+        :param from_date: first day, or a DateRangePreset, see resolve_dates
+        :param to_date: last day. None with a preset
+        :param emp_number:
+        :rtype: iterator of dict
+        """
+        from_date, to_date = self.resolve_dates(from_date, to_date)
+        from_date = datetime.combine(from_date, datetime.min.time())
+        to_date = datetime.combine(to_date, datetime.min.time())
         from_timestamp = int(
             (from_date - self.TIMECLOCK_TIMESTAMP_EPOCH_DATE).total_seconds() / 60
         )
@@ -105,8 +171,7 @@ class TimeClockApi:
         )
 
         if emp_number:
-            emp_number = int(emp_number)
-            emp_id = self.employee_list[emp_number].eid
+            emp_id = self.employee_list.by_display_id(str(emp_number).strip()).eid
         else:
             emp_id = 0
         default_report_page = "report.html?rt=2"
@@ -180,15 +245,41 @@ class TimeClockApi:
             "Accept-Language": "en-US,en;q=0.9",
         }
 
-        res = self.make_request(export_endpoint, headers=headers)
-        report_data = res.content.decode("utf-8")
-        reader = csv.DictReader(report_data.replace("\n", " ").split("\r"))
-        report = [x for x in reader]
-        return report
+        # closing the response returns its connection to the pool even when the reader stops early
+        with self.make_request(export_endpoint, headers=headers, stream=True) as res:
+            yield from csv.DictReader(_iter_export_lines(res.iter_content(chunk_size=self.EXPORT_CHUNK_SIZE)))
+
+    def aggregate_timecard_export(self, from_date, to_date, by: Sequence[str] = ("employee",),
+                                  emp_number=None) -> PunchAggregator:
+        """
+        total hours and labor from a timecard report as it streams in, without building punches
+        :param by: one or more of employee, department, day
+        :rtype: PunchAggregator
+        """
+        aggregator = PunchAggregator(by, ot1_factor=self.OT1_FACTOR, ot2_factor=self.OT2_FACTOR)
+        return aggregator.add_rows(self.iter_timecard_export(from_date, to_date, emp_number))
 
-    def timeclock_report(self, from_date, to_date, emp_number=None):
+    def resolve_dates(self, from_date, to_date=None) -> tuple[date, date]:
+        """
+        first and last day of a report. a DateRangePreset is resolved around today with the clock's
+        week start and pay periods, fetching the preferences if the client has not loaded them
+        :param from_date: a date, a date string (see parse_date) or a DateRangePreset
+        :param to_date: last day. must be None with a preset
+        :raises ValueError: for a preset with a to_date, or a missing to_date
+        """
+        if not isinstance(from_date, DateRangePreset):
+            if to_date is None:
+                raise ValueError("to_date is required unless from_date is a DateRangePreset")
+            return parse_date(from_date), parse_date(to_date)
+        if to_date is not None:
+            raise ValueError(f"{from_date.name} sets both days, to_date must be None")
+        if self.preferences is None:
+            self.preferences = self.get_preferences()
+        return resolve_preset(from_date, payroll=self.preferences.payroll_preferences)
+
+    def timeclock_report(self, from_date, to_date=None, emp_number=None):
         report_csv = self.get_timecard_export(from_date, to_date, emp_number)
-        return TimeClockReport(report_csv)
+        return TimeClockReport(report_csv, self)
 
     def get_employee_list(self, minimal: bool = True, active: bool = True) -> Employees:
         """
@@ -201,12 +292,103 @@ class TimeClockApi:
         res = self.make_request(endpoint=endpoint, params={"active": int(active)})
         employees = parse_employee_list(res.content)
         if not minimal:
-            for employee in employees:
-                employee.get_details(self)
+            detailed = Employees()
+            detailed.add_employees(self.get_employee(employee.eid) for employee in employees)
+            return detailed
         return employees
 
+    def get_employee_page(self, eid) -> bytes:
+        res = self.make_request(endpoint=self.EMPLOYEE_PAGE_ENDPOINT, params={"eid": eid})
+        return res.content
+
     def get_employee(self, eid) -> Employee:
-        ...
+        """
+        fetch and parse the detail page for one employee
+        """
+        return parse_employee_page(eid, self.get_employee_page(eid))
+
+    def refresh_employees(self, previous: EmployeeRefresh = None, active: bool = True) -> EmployeeRefresh:
+        """
+        get full employee details, only fetching what changed since a previous refresh.
+        detail pages are fetched for employees whose employee list row is new or changed, and only
+        re-parsed when the page itself changed; everyone else keeps their previous Employee object.
+        :param previous: the result of the last refresh, or None to fetch everything
+        :param active: if true, refresh active employees, else inactive employees
+        :rtype: EmployeeRefresh
+        """
+        previous = previous or EmployeeRefresh()
+        refresh = EmployeeRefresh()
+        res = self.make_request(endpoint="employeelist.html", params={"active": int(active)})
+        for row_fingerprint, listed in iter_employee_list_fingerprints(res.content):
+            cached, cached_row_fingerprint, cached_page_fingerprint = previous.cached(listed.eid)
+            if cached is not None and cached_row_fingerprint == row_fingerprint:
+                refresh.add(cached, row_fingerprint, cached_page_fingerprint)
+                continue
+            page = self.get_employee_page(listed.eid)
+            refresh.pages_fetched += 1
+            page_fingerprint = content_fingerprint(page)
+            if cached is not None and cached_page_fingerprint == page_fingerprint:
+                employee = cached
+            else:
+                employee = parse_employee_page(listed.eid, page)
+                refresh.pages_parsed += 1
+            refresh.add(employee, row_fingerprint, page_fingerprint)
+        return refresh
+
+    def load_employee_snapshot(self, path: str, max_age: timedelta = None) -> EmployeeSnapshot:
+        """
+        set employee_list from a snapshot of this clock.
+        :return: the snapshot, or None if it is missing, unreadable, for another clock or too old
+        """
+        try:
+            snapshot = EmployeeSnapshot.load(path)
+        except (OSError, ValueError):
+            return None
+        if snapshot.clock != self.address or (max_age is not None and not snapshot.is_fresh(max_age)):
+            return None
+        self._employee_refresh = snapshot.as_refresh()
+        self.employee_list = snapshot.employees
+        return snapshot
+
+    def refresh_employee_snapshot(self, path: str, client: TimeClockApi = None) -> EmployeeSnapshot:
+        """
+        incrementally refresh full employee details, swap them into employee_list and rewrite the snapshot
+        :param client: fetch through this client instead, e.g. one with its own session
+        """
+        refresh = (client or self).refresh_employees(self._employee_refresh)
+        self._employee_refresh = refresh
+        self.employee_list = refresh.employees
+        snapshot = EmployeeSnapshot.from_refresh(self.address, refresh)
+        snapshot.save(path)
+        return snapshot
+
+    def start_employee_snapshot_refresh(self, path: str) -> threading.Thread:
+        """
+        run refresh_employee_snapshot in a daemon thread. join employee_refresh_thread to wait for it.
+        the thread logs in with its own session, since requests sessions are not safe to share between threads
+        """
+        self.employee_refresh_thread = threading.Thread(target=self._refresh_snapshot_in_background, args=(path,),
+                                                        name="employee-snapshot-refresh", daemon=True)
+        self.employee_refresh_thread.start()
+        return self.employee_refresh_thread
+
+    def _refresh_snapshot_in_background(self, path: str) -> None:
+        client = self.detached_client()
+        try:
+            self.refresh_employee_snapshot(path, client)
+        finally:
+            client.session.close()
+
+    def detached_client(self) -> TimeClockApi:
+        """
+        a copy of this client logged in on a new session, for use from another thread
+        """
+        import requests
+
+        client = copy.copy(self)
+        client.session = requests.session()
+        client._connect()
+        return client
 
     def fetch_backup(self):
         """
@@ -244,7 +426,27 @@ class TimeClockApi:
         pull company configuration and employee list from the timeclock
         :return:
         """
+        if self.employee_list is not None:  # warm started from a snapshot
+            await self.__as_get_preferences()
+            return
+        import asyncio
+
         await asyncio.gather(self.__as_get_employee_list(), self.__as_get_preferences())
 
     async def __as_get_timecard_export(self, from_date, to_date, emp_number=None):
         return self.get_timecard_export(from_date, to_date, emp_number)
+
+
+def _iter_export_lines(chunks: Iterator[bytes]) -> Iterator[str]:
+    """
+    split a streamed timecard export into csv lines. records end with \r; a bare \n can appear
+    inside a field, so it is flattened to a space just like the old whole-body parse did.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    for chunk in chunks:
+        pending += decoder.decode(chunk).replace("\n", " ")
+        *lines, pending = pending.split("\r")
+        yield from lines
+    pending += decoder.decode(b"", final=True).replace("\n", " ")
+    yield pending
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import sys
+from array import array
+from collections import defaultdict
+from dataclasses import dataclass, field, asdict
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterable, Iterator, Sequence, Union
+
+from .punches import Punch
+from .util import clock_slug
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+COLUMN_SUFFIX = ".col"
+
+# column name -> array typecode. "s" columns are fixed width utf-8, padded with NUL bytes
+COLUMNS = {
+    "visible_id": "s",
+    "employee_id": "s",
+    "department": "s",
+    "in_punch_id": "q",
+    "out_punch_id": "q",
+    "in_punch_type": "i",
+    "in_date": "i",  # date ordinal
+    "in_time": "q",  # seconds since EPOCH, naive clock time
+    "out_time": "q",
+    "std": "d",
+    "ot1": "d",
+    "ot2": "d",
+    "adj": "d",
+    "wage": "d",
+}
+DATE_COLUMNS = ("in_date",)
+TIME_COLUMNS = ("in_time", "out_time")
+EPOCH = datetime(1970, 1, 1)
+MISSING_TIME = -2 ** 63  # stored for punches without an out time
+
+
+@dataclass
+class PartitionInfo:
+    """Manifest entry for one clock / pay period partition"""
+
+    clock: str
+    period_start: str  # ISO date
+    path: str  # relative to the archive root
+    rows: int
+    min_date: str
+    max_date: str
+    string_widths: dict[str, int] = field(default_factory=dict)
+
+    def overlaps(self, start: date = None, stop: date = None) -> bool:
+        if start and date.fromisoformat(self.max_date) < start:
+            return False
+        if stop and date.fromisoformat(self.min_date) > stop:
+            return False
+        return True
+
+
+class ArchivePartition:
+    """
+    Read access to one partition. Columns are memory mapped on first use and returned as
+    memoryviews over the mapping, so nothing is copied until a value is read.
+    """
+
+    def __init__(self, root: str, info: PartitionInfo):
+        self.info = info
+        self._directory = os.path.join(root, info.path)
+        self._maps = {}
+        self._views = []
+
+    def column(self, name: str) -> Union[memoryview, StringColumn]:
+        """
+        :return: a typed memoryview for numeric columns, a StringColumn for text columns
+        """
+        typecode = COLUMNS[name]
+        if name not in self._maps:
+            path = os.path.join(self._directory, name + COLUMN_SUFFIX)
+            with open(path, "rb") as f:
+                self._maps[name] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.info.rows else None
+        mapped = self._maps[name]
+        raw = memoryview(mapped) if mapped is not None else memoryview(b"")
+        self._views.append(raw)
+        if typecode == "s":
+            return StringColumn(raw, self.info.string_widths[name])
+        view = raw.cast(typecode)
+        self._views.append(view)
+        return view
+
+    def close(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        for mapped in self._maps.values():
+            if mapped is not None:
+                try:
+                    mapped.close()
+                except BufferError:
+                    # a caller still holds a buffer (e.g. numpy.frombuffer); the map closes when it is collected
+                    pass
+        self._maps = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.info.rows
+
+
+class StringColumn:
+    """Fixed width text column over a memory mapped buffer"""
+
+    def __init__(self, buffer: memoryview, width: int):
+        self._buffer = buffer
+        self.width = width
+
+    def __getitem__(self, index: int) -> str:
+        start = index * self.width
+        return bytes(self._buffer[start:start + self.width]).rstrip(b"\0").decode("utf-8")
+
+    def __len__(self):
+        return len(self._buffer) // self.width if self.width else 0
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class PunchArchive:
+    """
+    On-disk punch history partitioned by clock and pay period.
+
+    Each partition directory holds one fixed width file per column plus an entry in the
+    archive manifest recording its row count and in date range, so queries can skip whole
+    partitions by date and open only the columns they ask for.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._manifest_path = os.path.join(root, MANIFEST_NAME)
+        self.partition_infos: dict[tuple[str, str], PartitionInfo] = self._read_manifest()
+
+    def _read_manifest(self) -> dict[tuple[str, str], PartitionInfo]:
+        if not os.path.exists(self._manifest_path):
+            return {}
+        with open(self._manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest["version"] != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported archive version: {manifest['version']}")
+        if manifest["byteorder"] != sys.byteorder:
+            raise ValueError(f"Archive was written on a {manifest['byteorder']} endian machine")
+        infos = (PartitionInfo(**entry) for entry in manifest["partitions"])
+        return {(info.clock, info.period_start): info for info in infos}
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "byteorder": sys.byteorder,
+            "partitions": [asdict(info) for info in self.partition_infos.values()],
+        }
+        temp_path = self._manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(temp_path, self._manifest_path)
+
+    def write_partition(self, clock: str, period_start: date, punches: Iterable[Punch]) -> PartitionInfo:
+        """
+        Write (or replace) the partition for a clock's pay period.
+        :param clock: clock address or any label for the clock
+        :param period_start: first day of the pay period the punches belong to
+        """
+        punches = list(punches)
+        if not punches:
+            raise ValueError("Cannot archive an empty partition")
+        relative_path = os.path.join(clock_slug(clock), period_start.isoformat())
+        directory = os.path.join(self.root, relative_path)
+        os.makedirs(directory, exist_ok=True)
+
+        string_widths = {}
+        for name, typecode in COLUMNS.items():
+            values = [_to_column_value(name, getattr(punch, name)) for punch in punches]
+            with open(os.path.join(directory, name + COLUMN_SUFFIX), "wb") as f:
+                if typecode == "s":
+                    encoded = [value.encode("utf-8") for value in values]
+                    width = string_widths[name] = max(1, max(len(value) for value in encoded))
+                    f.write(b"".join(value.ljust(width, b"\0") for value in encoded))
+                else:
+                    array(typecode, values).tofile(f)
+
+        in_dates = [punch.in_date for punch in punches]
+        info = PartitionInfo(clock=clock, period_start=period_start.isoformat(), path=relative_path,
+                             rows=len(punches), min_date=min(in_dates).isoformat(),
+                             max_date=max(in_dates).isoformat(), string_widths=string_widths)
+        self.partition_infos[(clock, info.period_start)] = info
+        self._write_manifest()
+        return info
+
+    def write_punches(self, clock: str, punches: Iterable[Punch],
+                      period_start_for: Callable[[date], date]) -> list[PartitionInfo]:
+        """
+        Split punches into pay periods and write a partition for each period.
+        :param period_start_for: maps a punch's in date to the start of its pay period
+        """
+        periods = defaultdict(list)
+        for punch in punches:
+            periods[period_start_for(punch.in_date)].append(punch)
+        return [self.write_partition(clock, period_start, period_punches)
+                for period_start, period_punches in sorted(periods.items())]
+
+    def partitions(self, clock: str = None, start: date = None, stop: date = None) -> list[PartitionInfo]:
+        """
+        Partitions for a clock (or all clocks) whose in dates overlap start..stop
+        """
+        return [info for info in self.partition_infos.values()
+                if (clock is None or info.clock == clock) and info.overlaps(start, stop)]
+
+    def open(self, info: PartitionInfo) -> ArchivePartition:
+        return ArchivePartition(self.root, info)
+
+    def scan(self, columns: Sequence[str], clock: str = None, start: date = None,
+             stop: date = None) -> Iterator[tuple[PartitionInfo, dict]]:
+        """
+        Yield (partition, {column: view}) for every partition that survives date pruning.
+        Views are only valid until the next partition is yielded.
+        """
+        for info in self.partitions(clock, start, stop):
+            with self.open(info) as partition:
+                yield info, {name: partition.column(name) for name in columns}
+
+    def query(self, columns: Sequence[str] = tuple(COLUMNS), clock: str = None, start: date = None,
+              stop: date = None, **equals) -> Iterator[dict]:
+        """
+        Yield matching rows as dicts holding only the requested columns.
+        :param start: first in date to include
+        :param stop: last in date to include
+        :param equals: column=value filters, e.g. visible_id="12", department="DELI"
+        """
+        for name in list(columns) + list(equals):
+            if name not in COLUMNS:
+                raise ValueError(f"Unknown column: {name}")
+        needed = set(columns) | set(equals) | ({"in_date"} if start or stop else set())
+        low = start.toordinal() if start else None
+        high = stop.toordinal() if stop else None
+        for info, views in self.scan(sorted(needed), clock, start, stop):
+            in_dates = views.get("in_date")
+            for row in range(info.rows):
+                if low is not None and in_dates[row] < low:
+                    continue
+                if high is not None and in_dates[row] > high:
+                    continue
+                if any(_from_column_value(name, views[name][row]) != value for name, value in equals.items()):
+                    continue
+                yield {name: _from_column_value(name, views[name][row]) for name in columns}
+
+
+def _to_column_value(name: str, value):
+    if name in DATE_COLUMNS:
+        return value.toordinal()
+    if name in TIME_COLUMNS:
+        if value is None:
+            return MISSING_TIME
+        return int((value - EPOCH).total_seconds())
+    if COLUMNS[name] == "s":
+        return "" if value is None else str(value)
+    return value or 0
+
+
+def _from_column_value(name: str, value):
+    if name in DATE_COLUMNS:
+        return date.fromordinal(value)
+    if name in TIME_COLUMNS:
+        if value == MISSING_TIME:
+            return None
+        return EPOCH + timedelta(seconds=value)
+    return value
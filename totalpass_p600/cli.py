@@ -0,0 +1,296 @@
+"""
+totalpass command line: pull timecard exports, backups, employees and preferences from one or many
+clocks at once.
+
+totalpass export --clock 10.0.0.5 --clock 10.0.0.6 --from 01/01/22 --to 01/15/22 -o punches.csv
+totalpass export --clock 10.0.0.5 --preset last_pay_period -o punches.csv
+totalpass employees --clock 10.0.0.5 --detailed --format jsonl
+TIMECLOCK_USER=admin TIMECLOCK_PASS=pw totalpass backup --clock 10.0.0.5 --backup-dir backups
+
+Clocks are handled by a pool of --workers threads. Each client only logs in and fetches what its
+command needs. Rows are written as they arrive from any clock, each prefixed with the clock's
+address, and a summary goes to stderr. The exit status is 1 when any clock failed.
+"""
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time
+from typing import Callable, Iterable, Iterator, Sequence
+
+USER_ENV = "TIMECLOCK_USER"
+PASSWORD_ENV = "TIMECLOCK_PASS"
+FORMATS = ("csv", "jsonl", "parquet")
+DEFAULT_WORKERS = 4
+# rows buffered between the download workers and the writer
+ROW_QUEUE_SIZE = 10_000
+
+# output column -> Employee attribute
+EMPLOYEE_COLUMNS = {
+    "eid": "eid",
+    "display_id": "display_id",
+    "payroll_id": "payroll_id",
+    "first_name": "first_name",
+    "middle_initial": "middle_initial",
+    "last_name": "last_name",
+    "display_name": "display_name",
+    "active": "active",
+    "email": "email",
+    "entry_method": "entry_method",
+}
+# DateRangePreset names, lowercase
+PRESETS = ("today", "yesterday", "this_week", "last_week", "next_week", "week_to_date", "this_month", "last_month",
+           "next_month", "month_to_date", "this_year", "last_year", "next_year", "year_to_date", "this_pay_period",
+           "last_pay_period", "next_pay_period")
+# preference fields whose values are masked unless --include-secrets is given
+SECRET_FIELDS = ("password", "supervisor_code")
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.user or args.password is None:
+        parser.error(f"--user and --password are required, or set {USER_ENV} and {PASSWORD_ENV}")
+    output_format = args.format or _format_for(args.output)
+    if output_format == "parquet" and args.output == "-":
+        parser.error("parquet output needs --output")
+    if args.command == "export" and args.preset and (args.from_date or args.to_date):
+        parser.error("--preset cannot be combined with --from and --to")
+    if args.command == "export" and not args.preset and not (args.from_date and args.to_date):
+        parser.error("export needs --from and --to, or --preset")
+    if getattr(args, "snapshot_dir", None) and args.inactive:
+        parser.error("--snapshot-dir only syncs active employees, it cannot be combined with --inactive")
+
+    clocks = [(address, args.user, args.password) for address in args.clock]
+    errors = {}
+    rows = stream_rows(clocks, lambda api: args.job(args, api), args.workers, errors)
+    columns = ("clock", *args.columns) if args.columns else None
+    written = write_rows(rows, args.output, output_format, columns)
+    for address, error in errors.items():
+        print(f"{address}: {error}", file=sys.stderr)
+    print(f"{written} rows from {len(clocks) - len(errors)} of {len(clocks)} clocks", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    clock_options = argparse.ArgumentParser(add_help=False)
+    clock_options.add_argument("--clock", action="append", required=True,
+                               help="clock address. repeat for several clocks")
+    clock_options.add_argument("--user", default=os.environ.get(USER_ENV),
+                               help=f"login user, default ${USER_ENV}")
+    clock_options.add_argument("--password", default=os.environ.get(PASSWORD_ENV),
+                               help=f"login password, default ${PASSWORD_ENV}")
+    clock_options.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                               help=f"clocks handled at once, default {DEFAULT_WORKERS}")
+    clock_options.add_argument("-o", "--output", default="-", help="output file, default stdout")
+    clock_options.add_argument("--format", choices=FORMATS,
+                               help="output format, default from the output file's suffix, else csv")
+
+    parser = argparse.ArgumentParser(prog="totalpass", description="TotalPass P600 timeclock tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", parents=[clock_options], help="timecard export rows")
+    export.add_argument("--from", dest="from_date", help="first day, MM/DD/YYYY or YYYY-MM-DD")
+    export.add_argument("--to", dest="to_date", help="last day")
+    export.add_argument("--preset", choices=PRESETS,
+                        help="a date range around today instead of --from and --to, e.g. last_pay_period")
+    export.add_argument("--employee", help="only this employee number")
+    # columns come from the clock's export header
+    export.set_defaults(job=export_rows, columns=None)
+
+    backup = commands.add_parser("backup", parents=[clock_options],
+                                 help="download clock backups. the output lists the files written")
+    backup.add_argument("--backup-dir", default=".", help="folder for the backups, one subfolder per clock")
+    backup.add_argument("--compress", action="store_true", help="zip each backup")
+    backup.set_defaults(job=backup_rows, columns=("path", "bytes"))
+
+    employees = commands.add_parser("employees", parents=[clock_options], help="employee list")
+    employees.add_argument("--detailed", action="store_true", help="fetch every employee's detail page")
+    employees.add_argument("--inactive", action="store_true", help="inactive instead of active employees")
+    employees.add_argument("--snapshot-dir",
+                           help="sync full details incrementally against an employee snapshot per clock "
+                                "kept in this folder")
+    employees.set_defaults(job=employee_rows, columns=(*EMPLOYEE_COLUMNS, "departments"))
+
+    preferences = commands.add_parser("preferences", parents=[clock_options],
+                                      help="preferences as section, field, value rows")
+    preferences.add_argument("--include-secrets", action="store_true",
+                             help="do not mask passwords and the supervisor code")
+    preferences.set_defaults(job=preference_rows, columns=("section", "field", "value"))
+    return parser
+
+
+def export_rows(args: argparse.Namespace, api) -> Iterator[dict]:
+    from .date_range_presets import DateRangePreset
+
+    if args.preset:
+        from_date, to_date = DateRangePreset[args.preset.upper()], None
+    else:
+        from_date, to_date = args.from_date, args.to_date
+    if args.employee and api.employee_list is None:
+        # employee numbers are looked up in the employee list
+        api.employee_list = api.get_employee_list()
+    for row in api.iter_timecard_export(from_date, to_date, args.employee):
+        # blank rows are skipped the same way Punches.add_punch does
+        if row.get("FirstName") == " " or not row.get("InDate"):
+            continue
+        yield row
+
+
+def backup_rows(args: argparse.Namespace, api) -> Iterator[dict]:
+    from .util import clock_slug
+
+    backup = api.fetch_backup()
+    folder = os.path.join(args.backup_dir, clock_slug(api.address))
+    os.makedirs(folder, exist_ok=True)
+    backup.save(folder, compress=args.compress)
+    filename = os.path.splitext(backup.filename)[0] + ".zip" if args.compress else backup.filename
+    yield {"path": os.path.join(folder, filename), "bytes": len(backup.data)}
+
+
+def employee_rows(args: argparse.Namespace, api) -> Iterator[dict]:
+    from .util import clock_slug
+
+    if args.snapshot_dir:
+        os.makedirs(args.snapshot_dir, exist_ok=True)
+        path = os.path.join(args.snapshot_dir, clock_slug(api.address) + ".snap")
+        api.load_employee_snapshot(path)
+        employees = api.refresh_employee_snapshot(path).employees
+    elif args.detailed:
+        employees = api.refresh_employees(active=not args.inactive).employees
+    else:
+        employees = api.get_employee_list(active=not args.inactive)
+    for employee in employees:
+        row = {name: getattr(employee, attribute) for name, attribute in EMPLOYEE_COLUMNS.items()}
+        row["departments"] = ";".join(employee.departments_list)
+        yield row
+
+
+def preference_rows(args: argparse.Namespace, api) -> Iterator[dict]:
+    from .timeclock_preferences import PREFERENCE_SECTIONS
+    from .util import normalize_dict
+
+    preferences = api.get_preferences()
+    for section in PREFERENCE_SECTIONS:
+        if section == "preferences_form":
+            continue
+        values = getattr(preferences, section)
+        values = dataclasses.asdict(values) if dataclasses.is_dataclass(values) else values.dict()
+        for field, value in normalize_dict(values, sep=".").items():
+            if field.rsplit(".", 1)[-1] in SECRET_FIELDS and value and not args.include_secrets:
+                value = "********"
+            yield {"section": section, "field": field, "value": _text(value)}
+
+
+def stream_rows(clocks: Sequence[tuple], job: Callable[[object], Iterable[dict]], workers: int = DEFAULT_WORKERS,
+                errors: dict = None, connect: Callable = None) -> Iterator[dict]:
+    """
+    Run job against every clock in a pool of workers and yield rows as they are produced, so output
+    is written while other clocks are still downloading. Each row gets its clock's address as a
+    leading "clock" column. A clock that fails is recorded in errors; rows it already produced are kept.
+    :param clocks: (address, user, password) tuples
+    :param job: callable(api) yielding row dicts
+    :param errors: filled with address -> exception
+    :param connect: callable(address, user, password) returning a client. defaults to TimeClockApi
+    """
+    connect = connect or _connect
+    errors = {} if errors is None else errors
+    if not clocks:
+        return
+    rows = queue.Queue(maxsize=ROW_QUEUE_SIZE)
+    stopped = threading.Event()
+    done = object()
+
+    def run(clock: tuple) -> None:
+        address = clock[0]
+        try:
+            api = connect(*clock)
+            for row in job(api):
+                if stopped.is_set():
+                    break
+                rows.put({"clock": address, **row})
+        except Exception as error:
+            errors[address] = error
+        finally:
+            rows.put(done)
+
+    remaining = len(clocks)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(clocks)))) as executor:
+        for clock in clocks:
+            executor.submit(run, clock)
+        try:
+            while remaining:
+                row = rows.get()
+                if row is done:
+                    remaining -= 1
+                    continue
+                yield row
+        finally:
+            # the reader stopped early: let blocked workers finish so the pool can shut down
+            stopped.set()
+            while remaining:
+                if rows.get() is done:
+                    remaining -= 1
+
+
+def write_rows(rows: Iterable[dict], output: str, output_format: str, columns: Sequence[str] = None) -> int:
+    """
+    Stream rows to output ("-" for stdout) as csv, jsonl or parquet, and nothing when there are no rows.
+    Every row is written with the same columns: keys missing from a row are written empty and keys
+    outside the columns are dropped, so rows from clocks with different layouts stay aligned.
+    :param columns: output columns, default the first row's keys
+    :return: number of rows written
+    """
+    from .export import CsvPayrollWriter, JsonLinesPayrollWriter, ParquetPayrollWriter
+
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return 0
+    if output_format == "parquet":
+        stream = open(output, "wb")
+        writer = ParquetPayrollWriter(stream)
+    else:
+        stream = sys.stdout if output == "-" else open(output, "w", newline="", encoding="utf-8")
+        writer = CsvPayrollWriter(stream) if output_format == "csv" else JsonLinesPayrollWriter(stream)
+    try:
+        columns = list(columns or first)
+        writer.columns = {name: _field(name) for name in columns}
+        writer.write_row(first)
+        writer.write_rows(rows)
+        writer.close()
+        return writer.rows_written
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+
+def _connect(address: str, user: str, password: str):
+    from .api import TimeClockApi
+
+    # jobs fetch the employee list and preferences themselves, only when they need them
+    return TimeClockApi(address, user, password, load_data=False)
+
+
+def _field(name: str) -> Callable[[dict], object]:
+    return lambda row: row.get(name, "")
+
+
+def _format_for(output: str) -> str:
+    suffix = os.path.splitext(output)[1].lstrip(".").lower()
+    return suffix if suffix in FORMATS else "csv"
+
+
+def _text(value) -> str:
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return "" if value is None else str(value)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
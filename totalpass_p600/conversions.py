@@ -0,0 +1,98 @@
+"""
+Parsers for the fixed formats the clock uses in its exports and pages.
+
+Exports repeat the same few hundred dates, times and amounts over and over, so each string
+parser is memoized. Values that are already converted pass straight through.
+"""
+from __future__ import annotations
+
+import re
+from datetime import date, datetime, time
+from functools import lru_cache
+from typing import Union
+
+CACHE_SIZE = 8192
+
+# HH:MM followed by a or p, optionally with m: 09:30a, 12:00pm, 7:05p
+TIME_RE = re.compile(r'^([01]?[0-9]|2[0-3]):([0-5][0-9])([ap])m?$', re.IGNORECASE)
+
+
+def parse_date(value: Union[str, date, datetime]) -> date:
+    """
+    Parse MM/DD/YYYY, MM/DD/YY or YYYY-MM-DD. Two digit years follow strptime's %y: 69-99 are 19xx.
+    :raises ValueError: if value is not in one of those formats
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return _parse_date(value)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_date(value: str) -> date:
+    value = value.strip()
+    if "-" in value:
+        return date.fromisoformat(value)
+    month, day, year = value.split("/")
+    if not (month.isdigit() and day.isdigit() and year.isdigit()) or len(year) not in (2, 4):
+        raise ValueError(f"{value} is not a MM/DD/YYYY or MM/DD/YY date")
+    year_number = int(year)
+    if len(year) == 2:
+        year_number += 1900 if year_number >= 69 else 2000
+    return date(year_number, int(month), int(day))
+
+
+def parse_time(value: Union[str, time]) -> time:
+    """
+    Parse the clock's HH:MMa/p times, e.g. 09:30a or 12:00p. 12:00a is midnight.
+    :raises ValueError: if value is not in that format
+    """
+    if isinstance(value, time):
+        return value
+    return _parse_time(value)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_time(value: str) -> time:
+    match = TIME_RE.match(value)
+    if not match:
+        raise ValueError(f"{value} is not a valid time")
+    hour, minute, am_pm = int(match.group(1)), int(match.group(2)), match.group(3).lower()
+    if am_pm == "p" and hour != 12:
+        hour += 12
+    elif am_pm == "a" and hour == 12:
+        hour = 0
+    return time(hour, minute)
+
+
+def parse_datetime(day: Union[str, date], moment: Union[str, time]) -> datetime:
+    """
+    Combine a clock date and time string into a datetime
+    """
+    return datetime.combine(parse_date(day), parse_time(moment))
+
+
+def parse_number(value):
+    """
+    Convert a numeric string to int when it is a whole number, else float. Anything that is not
+    a number, including blanks, is returned unchanged.
+    """
+    if isinstance(value, str):
+        return _parse_number(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_number(value: str):
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return int(number) if number.is_integer() else number
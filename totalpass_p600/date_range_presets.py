@@ -1,5 +1,15 @@
-from datetime import date
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
 from enum import Enum
+from functools import lru_cache
+from typing import Union, TYPE_CHECKING
+
+from .pay_periods import PayPeriodCalendar
+from .util import TIME_SPANS, weekday_index
+
+if TYPE_CHECKING:
+    from .timeclock_preferences import PayrollPreferences
 
 
 def today() -> tuple[date, date]:
@@ -16,3 +26,64 @@ class DateRangePreset(Enum):
     LAST_WEEK = 3
     LAST_PAY_PERIOD = 4
     THIS_PAY_PERIOD = 5
+    NEXT_PAY_PERIOD = 6
+    YESTERDAY = 7
+    NEXT_WEEK = 8
+    THIS_MONTH = 9
+    LAST_MONTH = 10
+    NEXT_MONTH = 11
+    THIS_YEAR = 12
+    LAST_YEAR = 13
+    NEXT_YEAR = 14
+    YEAR_TO_DATE = 15
+    MONTH_TO_DATE = 16
+    WEEK_TO_DATE = 17
+
+
+PAY_PERIOD_PRESETS = {
+    DateRangePreset.LAST_PAY_PERIOD: -1,
+    DateRangePreset.THIS_PAY_PERIOD: 0,
+    DateRangePreset.NEXT_PAY_PERIOD: 1,
+}
+
+
+def resolve_preset(preset: Union[DateRangePreset, str], anchor: Union[date, datetime] = None,
+                   week_start: str = None,
+                   payroll: Union[PayrollPreferences, PayPeriodCalendar] = None) -> tuple[date, date]:
+    """
+    First and last day of a preset range around anchor. Results are memoized by preset, anchor,
+    week start and pay period calendar.
+    :param preset: a DateRangePreset or its name, e.g. "last pay period"
+    :param anchor: the day the range is relative to. defaults to today
+    :param week_start: any day of the week. defaults to the payroll preferences' week start, or sunday
+    :param payroll: the clock's payroll preferences or a PayPeriodCalendar. required for pay period presets
+    :raises ValueError: for a pay period preset without payroll
+    """
+    if isinstance(preset, str):
+        preset = DateRangePreset[preset.strip().replace(" ", "_").upper()]
+    if not anchor:
+        anchor = date.today()
+    elif isinstance(anchor, datetime):
+        anchor = anchor.date()
+    if week_start is None:
+        week_start = getattr(payroll, "week_start", None) or "sunday"
+    calendar = None
+    if preset in PAY_PERIOD_PRESETS:
+        if payroll is None:
+            raise ValueError(f"{preset.name} needs the clock's payroll preferences")
+        calendar = payroll if isinstance(payroll, PayPeriodCalendar) else PayPeriodCalendar.from_preferences(payroll)
+    return _resolve_preset(preset, anchor, weekday_index(week_start), calendar)
+
+
+@lru_cache(maxsize=4096)
+def _resolve_preset(preset: DateRangePreset, anchor: date, week_start: int,
+                    calendar: PayPeriodCalendar = None) -> tuple[date, date]:
+    if calendar is None:
+        return TIME_SPANS[preset.name.lower()](anchor, week_start)
+    offset = PAY_PERIOD_PRESETS[preset]
+    start = calendar.period_start(anchor)
+    if offset < 0:
+        start = calendar.period_start(start - timedelta(days=1))
+    elif offset > 0:
+        start = calendar.next_period_start(start)
+    return start, calendar.period_end(start)
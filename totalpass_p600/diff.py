@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Iterable, Union, TYPE_CHECKING
+
+from .punches import Punch, Punches, punch_key
+
+if TYPE_CHECKING:
+    from .report import TimeClockReport
+
+
+@dataclass
+class PunchDiff:
+    """Differences between two snapshots of the same clock's punches"""
+
+    added: list[Punch] = field(default_factory=list)
+    removed: list[Punch] = field(default_factory=list)
+    changed: list[tuple[Punch, Punch]] = field(default_factory=list)  # (old, new)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self):
+        return f"PunchDiff(added={len(self.added)}, removed={len(self.removed)}, changed={len(self.changed)})"
+
+
+def diff_punches(old: Union[TimeClockReport, Punches, Iterable[Punch]],
+                 new: Union[TimeClockReport, Punches, Iterable[Punch]]) -> PunchDiff:
+    """
+    Compare two pulls of a clock's punches in linear time.
+
+    Punches are matched on punch_key; matched punches whose fingerprints differ were edited on the clock.
+    Punches without punch ids are matched on their fingerprint, so an edit to one of those shows up
+    as a removal plus an addition.
+    :param old: the earlier snapshot, a TimeClockReport, Punches or iterable of Punch
+    :param new: the later snapshot
+    :rtype: PunchDiff
+    """
+    old_index = _index(old)
+    new_index = _index(new)
+    diff = PunchDiff()
+    for key, new_punch in new_index.items():
+        old_punch = old_index.get(key)
+        if old_punch is None:
+            diff.added.append(new_punch)
+        elif old_punch.fingerprint != new_punch.fingerprint:
+            diff.changed.append((old_punch, new_punch))
+    diff.removed = [punch for key, punch in old_index.items() if key not in new_index]
+    return diff
+
+
+def _index(snapshot) -> dict[tuple, Punch]:
+    punches = getattr(snapshot, "punches", snapshot)
+    if isinstance(punches, Punches):
+        punches = punches.punches
+    index = {}
+    for punch in punches:
+        if punch.in_punch_id or punch.out_punch_id:
+            index[punch_key(punch)] = punch
+        else:
+            index[("unkeyed", punch.fingerprint)] = punch
+    return index
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
+import hashlib
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Union
+from io import BytesIO
+from typing import TYPE_CHECKING, Iterator, Union
+from urllib.parse import parse_qs, urlsplit
 
-from bs4 import BeautifulSoup
-from dateutil.parser import parse as date_parser
+import lxml.html
+from lxml import etree
 
 from totalpass_p600.accrual import Accrual, Accruals
 from totalpass_p600.web_punch import WebPunchSettings
+from .conversions import parse_date
 from .punches import Punches
 
 if TYPE_CHECKING:
@@ -62,33 +66,91 @@ class Employee:
 
 @dataclass
 class Employees:
-    """A collection of employees"""
+    """
+    A collection of employees keyed by display id, with indexes by eid, payroll id and department.
+    Indexes are maintained by add_employee; call reindex() after changing an employee's ids or
+    departments in place.
+    """
 
     employees: dict[str, Employee] = field(default_factory=dict)
+    _by_eid: dict[int, Employee] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _by_payroll_id: dict[str, Employee] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _by_department: dict[str, dict[str, Employee]] = field(default_factory=dict, init=False, repr=False,
+                                                           compare=False)
+    # what each employee was indexed under, so a replaced or edited employee can be unindexed
+    _indexed_keys: dict[str, tuple] = field(default_factory=dict, init=False, repr=False, compare=False)
+    # departments() result, dropped whenever a department gains its first or loses its last employee
+    _departments: frozenset = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.reindex()
 
     def add_employee(self, employee: Employee) -> None:
+        self._unindex(employee.display_id)
         self.employees[employee.display_id] = employee
+        self._index(employee)
 
     def add_employees(self, employees) -> None:
         for employee in employees:
             self.add_employee(employee)
 
-    def departments(self):
-        departments = []
+    def reindex(self) -> None:
+        self._by_eid = {}
+        self._by_payroll_id = {}
+        self._by_department = {}
+        self._indexed_keys = {}
+        self._departments = None
         for employee in self.employees.values():
-            departments.extend(employee.departments_list)
-        return set(departments)
+            self._index(employee)
+
+    def _index(self, employee: Employee) -> None:
+        departments = tuple(employee.departments_list)
+        self._indexed_keys[employee.display_id] = (employee.eid, employee.payroll_id, departments)
+        self._by_eid[employee.eid] = employee
+        self._by_payroll_id[employee.payroll_id] = employee
+        for department in departments:
+            members = self._by_department.get(department)
+            if members is None:
+                members = self._by_department[department] = {}
+                self._departments = None
+            members[employee.display_id] = employee
+
+    def _unindex(self, display_id: str) -> None:
+        keys = self._indexed_keys.pop(display_id, None)
+        if keys is None:
+            return
+        eid, payroll_id, departments = keys
+        employee = self.employees[display_id]
+        if self._by_eid.get(eid) is employee:
+            del self._by_eid[eid]
+        if self._by_payroll_id.get(payroll_id) is employee:
+            del self._by_payroll_id[payroll_id]
+        for department in departments:
+            members = self._by_department[department]
+            members.pop(display_id, None)
+            if not members:
+                del self._by_department[department]
+                self._departments = None
+
+    def by_eid(self, eid: int) -> Employee:
+        return self._by_eid[eid]
+
+    def by_payroll_id(self, payroll_id: str) -> Employee:
+        return self._by_payroll_id[payroll_id]
+
+    def by_display_id(self, display_id: str) -> Employee:
+        return self.employees[display_id]
+
+    def get(self, display_id: str, default=None) -> Employee:
+        return self.employees.get(display_id, default)
+
+    def departments(self) -> frozenset[str]:
+        if self._departments is None:
+            self._departments = frozenset(self._by_department)
+        return self._departments
 
     def by_department(self, department) -> Employees:
-        emps = Employees()
-        emps.add_employees(
-            [
-                employee
-                for employee in self.employees.values()
-                if department in employee.departments_list
-            ]
-        )
-        return emps
+        return Employees(employees=dict(self._by_department.get(department, {})))
 
     def __iter__(self):
         return iter(self.employees.values())
@@ -96,6 +158,9 @@ class Employees:
     def __getitem__(self, key):
         return self.employees[key]
 
+    def __contains__(self, display_id):
+        return display_id in self.employees
+
     def __len__(self):
         return len(self.employees)
 
@@ -115,8 +180,122 @@ class EmployeeInformation:
     email: str
 
 
+# ids read from the employee detail page
+EMPLOYEE_PAGE_IDS = frozenset([
+    "payrollID", "strVisibleID", "pinb0", "nameFirst", "initNameMiddle", "nameLast", "nameDisplay", "strAddress",
+    "strNote", "nameEmail", "blnActive", "entryMethod", "lunchEnabFld", "wpAssignFld", "wpPasswordFld",
+    "authorizedAddrFld", "wpAllowUnauthIP", "wpUseGlobalIP", "dteStartDate", "dteResetDate",
+])
+
+
 def parse_employee_page(eid: int, page_html: str) -> Employee:
-    """Parse the employee page and return an Employee object"""
+    """
+    Parse the employee page and return an Employee object.
+    The lxml tree is walked once to collect every element the page is read from, instead of running a
+    CSS query per field. Produces the same Employee as parse_employee_page_soup.
+    """
+    root = lxml.html.fromstring(page_html)
+    fields = {}
+    department_rows = []
+    accrual_table = None
+    for element in root.iter():
+        element_id = element.get("id")
+        if element_id in EMPLOYEE_PAGE_IDS and element_id not in fields:
+            fields[element_id] = element
+        classes = element.get("class")
+        if classes:
+            classes = classes.split()
+            if "deptsRow" in classes:
+                department_rows.append(element)
+            elif accrual_table is None and "accrual" in classes and element.tag == "table":
+                accrual_table = element
+
+    def value(element_id):
+        return fields[element_id].attrib["value"]
+
+    def checked(element_id):
+        return fields[element_id].get("checked") == "checked"
+
+    web_punch_settings = WebPunchSettings(
+        allowed=checked("wpAssignFld"),
+        password=fields["wpPasswordFld"].get("value", ""),
+        authorized_ip_addresses=fields["authorizedAddrFld"].get("value", ""),
+        allow_punch_from_unauthorized_ip=checked("wpAllowUnauthIP"),
+        use_global_authorized_ip_addresses=checked("wpUseGlobalIP"),
+    )
+
+    # Get departments and wages
+    depts = {}
+    for dep_row in department_rows:
+        key = wage_cell = order = None
+        for element in dep_row.iter():
+            classes = (element.get("class") or "").split()
+            if key is None and "deptsKey" in classes:
+                key = element
+            elif wage_cell is None and "deptsVal" in classes:
+                wage_cell = element
+            elif order is None and "deptsOrder" in classes:
+                order = element
+        selected_dep = _selected_option(key)
+        dep_id = int(selected_dep.attrib["value"])
+        if dep_id < 1:
+            continue
+        wage = float(next(wage_cell.iter("input")).attrib["value"])
+        depts[selected_dep.text_content()] = {"wage": wage, "order": order.attrib["value"]}
+
+    # get accruals
+    accrual_trs = list(accrual_table.iter("tr"))
+    accrual_header = [th.text_content() for th in accrual_trs[0].iter("th")]
+    accrual_list = []
+    for accrual_tr in accrual_trs[1:]:
+        accrual = {}
+        for idx, td in enumerate(accrual_tr.iter("td")):
+            text = td.text_content()
+            td_input = next(td.iter("input"), None)
+            if text:
+                accrual[accrual_header[idx]] = text
+            elif td_input is not None:
+                if td_input.get("type") == "text":
+                    accrual[accrual_header[idx]] = td_input.attrib["value"]
+                if td_input.get("type") == "checkbox":
+                    accrual[accrual_header[idx]] = td_input.get("checked") == "checked"
+        accrual["LAST CALCULATED"] = parse_date(accrual["LAST CALCULATED"])
+        accrual_list.append(Accrual(*accrual.values()))
+    accruals = Accruals(start_date=parse_date(value("dteStartDate")),
+                        reset_date=parse_date(value("dteResetDate")), accruals=accrual_list)
+
+    return Employee(
+        eid=eid,
+        payroll_id=value("payrollID"),
+        display_id=value("strVisibleID"),
+        pin=value("pinb0"),
+        first_name=value("nameFirst"),
+        middle_initial=value("initNameMiddle"),
+        last_name=value("nameLast"),
+        display_name=value("nameDisplay"),
+        address=fields["strAddress"].text_content(),
+        note=fields["strNote"].text_content(),
+        email=value("nameEmail"),
+        active=checked("blnActive"),
+        entry_method=_selected_option(fields["entryMethod"]).text_content(),
+        automatic_lunch_deduction=_selected_option(fields["lunchEnabFld"]).text_content() == "Enabled",
+        web_punch_settings=web_punch_settings,
+        departments=depts,
+        accruals=accruals,
+    )
+
+
+def _selected_option(select):
+    return next(option for option in select.iter("option") if option.get("selected") is not None)
+
+
+def parse_employee_page_soup(eid: int, page_html: str) -> Employee:
+    """
+    Parse the employee page with BeautifulSoup CSS selectors. Slower reference implementation of
+    parse_employee_page, kept for comparison.
+    """
+    from bs4 import BeautifulSoup
+
     emp_soup = BeautifulSoup(page_html, "lxml")
     # get employee information
     payroll_id = emp_soup.select_one("#payrollID")["value"]
@@ -190,11 +369,11 @@ def parse_employee_page(eid: int, page_html: str) -> Employee:
                     accrual[accrual_header[idx]] = td.input['value']
                 if td.input['type'] == "checkbox":
                     accrual[accrual_header[idx]] = td.input.get('checked') == 'checked'
-        accrual["LAST CALCULATED"] = date_parser(accrual["LAST CALCULATED"]).date()
+        accrual["LAST CALCULATED"] = parse_date(accrual["LAST CALCULATED"])
         acc = Accrual(*accrual.values())
         accrual_list.append(acc)
-    accrual_start_date = date_parser(emp_soup.select_one("#dteStartDate")['value']).date()
-    accrual_reset_date = date_parser(emp_soup.select_one("#dteResetDate")['value']).date()
+    accrual_start_date = parse_date(emp_soup.select_one("#dteStartDate")['value'])
+    accrual_reset_date = parse_date(emp_soup.select_one("#dteResetDate")['value'])
     accruals = Accruals(start_date=accrual_start_date, reset_date=accrual_reset_date, accruals=accrual_list)
 
     return Employee(
@@ -218,35 +397,120 @@ def parse_employee_page(eid: int, page_html: str) -> Employee:
     )
 
 
+# class of each employee list cell -> Employee field
+EMPLOYEE_LIST_CELLS = {
+    "cls_active": "active",
+    "cls_payrollid": "payroll_id",
+    "cls_visid": "display_id",
+    "cls_lname": "last_name",
+    "cls_fname": "first_name",
+    "cls_mi": "middle_initial",
+}
+
+
 def parse_employee_list(page_html) -> Employees:
-    employee_soup = BeautifulSoup(page_html, "lxml")
-    # get human readable values for item classes
     employees = Employees()
-    # find the list of employees
-    employee_table = employee_soup.select_one(".cls_main_table")
-    table_body = employee_table.select_one('tbody')
-    for employee_row in employee_table.find_all("tr", {"class": None}):
-        active = employee_row.select_one(".cls_active").get("checked") is not None
-        payroll_id = employee_row.select_one(".cls_payrollid").text
-        visid = employee_row.select_one(".cls_visid").text
-        last_name = employee_row.select_one(".cls_lname").text
-        first_name = employee_row.select_one(".cls_fname").text
-        middle_initial = employee_row.select_one(".cls_mi").text
-        # web_punch = employee_row.select_one(".cls_wp").img is not None
-        # daily_before_overtime = employee_row.select_one(".cls_daily").text
-        # weekly_before_overtime = employee_row.select_one(".cls_weekly").text
-        href = employee_row.select_one(".cls_payrollid").a.get("href")
-        params = href.split("?")[1]
-        params = {k: v for k, v in [param.split("=") for param in params.split("&")]}
-        eid = int(params['eid'])
-        employee = Employee(
-            eid=eid,
-            active=active,
-            payroll_id=payroll_id,
-            display_id=visid,
-            first_name=first_name,
-            middle_initial=middle_initial,
-            last_name=last_name,
-        )
-        employees.add_employee(employee)
+    employees.add_employees(iter_employee_list(page_html))
     return employees
+
+
+def iter_employee_list(page_html) -> Iterator[Employee]:
+    """
+    Yield an Employee for each row of the employee list as it is parsed
+    """
+    for _, employee in _iter_employee_rows(page_html):
+        yield employee
+
+
+def iter_employee_list_fingerprints(page_html) -> Iterator[tuple[str, Employee]]:
+    """
+    Yield (row fingerprint, Employee) for each row of the employee list.
+    The fingerprint changes whenever anything in the row's markup does.
+    """
+    for row, employee in _iter_employee_rows(page_html):
+        yield content_fingerprint(etree.tostring(row, with_tail=False)), employee
+
+
+def content_fingerprint(content: Union[bytes, str]) -> str:
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+@dataclass
+class EmployeeRefresh:
+    """
+    Result of an incremental employee refresh, and the state to pass to the next one.
+    Fingerprints are keyed by eid.
+    """
+
+    employees: Employees = field(default_factory=Employees)
+    row_fingerprints: dict[int, str] = field(default_factory=dict)
+    page_fingerprints: dict[int, str] = field(default_factory=dict)
+    pages_fetched: int = 0
+    pages_parsed: int = 0
+
+    def cached(self, eid: int):
+        """
+        (employee, row fingerprint, page fingerprint) from this refresh, or Nones if eid was not seen
+        """
+        try:
+            employee = self.employees.by_eid(eid)
+        except KeyError:
+            return None, None, None
+        return employee, self.row_fingerprints.get(eid), self.page_fingerprints.get(eid)
+
+    def add(self, employee: Employee, row_fingerprint: str, page_fingerprint: str) -> None:
+        self.employees.add_employee(employee)
+        self.row_fingerprints[employee.eid] = row_fingerprint
+        self.page_fingerprints[employee.eid] = page_fingerprint
+
+
+def _iter_employee_rows(page_html) -> Iterator[tuple[etree.ElementBase, Employee]]:
+    """
+    Incrementally parse employeelist.html, yielding (row element, Employee) for each unclassed row of
+    the first .cls_main_table. Rows are discarded once handled and parsing stops at the end of the table,
+    so the rest of the page is never built.
+    """
+    if isinstance(page_html, str):
+        page_html = page_html.encode("utf-8")
+    main_table = None
+    for event, element in etree.iterparse(BytesIO(page_html), events=("start", "end"), html=True):
+        if main_table is None:
+            if event == "start" and element.tag == "table" and "cls_main_table" in (element.get("class") or "").split():
+                main_table = element
+            continue
+        if event != "end":
+            continue
+        if element is main_table:
+            return
+        if element.tag == "tr" and element.get("class") is None:
+            yield element, _parse_employee_row(element)
+            element.clear()
+            # drop handled rows so memory stays flat on long lists
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+
+def _parse_employee_row(employee_row) -> Employee:
+    cells = {}
+    for element in employee_row.iter():
+        for class_name in (element.get("class") or "").split():
+            if class_name in EMPLOYEE_LIST_CELLS and class_name not in cells:
+                cells[class_name] = element
+    # web punch, daily and weekly before overtime (.cls_wp, .cls_daily, .cls_weekly) are not read
+    href = next(cells["cls_payrollid"].iter("a")).get("href")
+    params = parse_qs(urlsplit(href).query)
+    return Employee(
+        eid=int(params["eid"][0]),
+        active=cells["cls_active"].get("checked") is not None,
+        payroll_id=_text(cells["cls_payrollid"]),
+        display_id=_text(cells["cls_visid"]),
+        first_name=_text(cells["cls_fname"]),
+        middle_initial=_text(cells["cls_mi"]),
+        last_name=_text(cells["cls_lname"]),
+    )
+
+
+def _text(element) -> str:
+    return "".join(element.itertext())
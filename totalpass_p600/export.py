@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import csv
+import json
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, Mapping, Sequence, TextIO, Union
+
+from .aggregate import PunchTotals
+from .punches import Punch, Punches
+
+ColumnSource = Union[str, Callable]
+
+# output column -> Punch attribute or callable(punch)
+PUNCH_COLUMNS: dict[str, ColumnSource] = {
+    "employee_id": "visible_id",
+    "last_name": "last_name",
+    "first_name": "first_name",
+    "department": "department",
+    "date": "in_date",
+    "regular_hours": "std",
+    "ot1_hours": "ot1",
+    "ot2_hours": "ot2",
+    "wage": "wage",
+    "labor": "labor",
+}
+
+# output column -> PunchTotals attribute or callable(totals); group key columns are added in front
+TOTALS_COLUMNS: dict[str, ColumnSource] = {
+    "punches": "punches",
+    "regular_hours": "std",
+    "ot1_hours": "ot1",
+    "ot2_hours": "ot2",
+    "total_hours": "total_hours",
+    "labor": "labor",
+}
+
+
+class PayrollWriter(ABC):
+    """
+    Write payroll lines to an open text stream one record at a time.
+    Columns map an output name to an attribute/key of the record or to a callable taking the record,
+    so provider layouts can rename, drop or compute columns.
+    """
+
+    def __init__(self, stream: TextIO, columns: Mapping[str, ColumnSource] = None):
+        self.stream = stream
+        self.columns = dict(columns) if columns is not None else None
+        self.rows_written = 0
+
+    def write_row(self, record) -> None:
+        if self.columns is None:
+            raise ValueError("columns must be set before writing rows")
+        self._write({name: _resolve(record, source) for name, source in self.columns.items()})
+        self.rows_written += 1
+
+    def write_rows(self, records: Iterable) -> int:
+        """
+        :return: number of rows written
+        """
+        start = self.rows_written
+        for record in records:
+            self.write_row(record)
+        return self.rows_written - start
+
+    def write_punches(self, punches: Iterable[Punch]) -> int:
+        """
+        Write one line per punch, using PUNCH_COLUMNS unless columns were given
+        """
+        if self.columns is None:
+            self.columns = dict(PUNCH_COLUMNS)
+        return self.write_rows(punches)
+
+    def write_totals(self, groups: Union[Mapping, Iterable[tuple]], key_names: Sequence[str] = ("key",)) -> int:
+        """
+        Write one line per group of a group-by result, e.g. Punches.by_employee(), PunchAggregator
+        or PayPeriodSummary.departments. Group values may be PunchTotals or Punches.
+        :param groups: mapping or iterable of (key, totals). tuple keys are split across key_names
+        :param key_names: output column names for the parts of the group key
+        """
+        if self.columns is None:
+            self.columns = {name: _key_part(index) for index, name in enumerate(key_names)}
+            self.columns.update(TOTALS_COLUMNS)
+        if isinstance(groups, Mapping):
+            groups = groups.items()
+        return self.write_rows(_GroupRow(key, _as_totals(value)) for key, value in groups)
+
+    def close(self) -> None:
+        """
+        Finish the output. The stream itself is left open
+        """
+
+    @abstractmethod
+    def _write(self, row: dict) -> None:
+        """
+        Write one resolved row, a dict of output column -> value
+        """
+
+
+class CsvPayrollWriter(PayrollWriter):
+    """Payroll lines as CSV with a header row"""
+
+    def __init__(self, stream: TextIO, columns: Mapping[str, ColumnSource] = None, **csv_options):
+        super().__init__(stream, columns)
+        self._csv_options = csv_options
+        self._writer = None
+
+    def _write(self, row: dict) -> None:
+        if self._writer is None:
+            self._writer = csv.DictWriter(self.stream, fieldnames=list(self.columns), **self._csv_options)
+            self._writer.writeheader()
+        self._writer.writerow(row)
+
+
+class JsonLinesPayrollWriter(PayrollWriter):
+    """Payroll lines as one JSON object per line. Dates are written in ISO format."""
+
+    def _write(self, row: dict) -> None:
+        self.stream.write(json.dumps(row, default=_json_default))
+        self.stream.write("\n")
+
+
+class ParquetPayrollWriter(PayrollWriter):
+    """
+    Payroll lines as Parquet, written one row group per batch_size rows so memory stays bounded.
+    The schema is inferred from the first batch. Requires pyarrow, and close() must be called to
+    finish the file.
+    """
+
+    def __init__(self, stream, columns: Mapping[str, ColumnSource] = None, batch_size: int = 10_000):
+        """
+        :param stream: a path or binary stream
+        """
+        super().__init__(stream, columns)
+        self.batch_size = batch_size
+        self._rows = []
+        self._writer = None
+
+    def _write(self, row: dict) -> None:
+        self._rows.append(row)
+        if len(self._rows) >= self.batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._rows:
+            return
+        import pyarrow
+        import pyarrow.parquet
+
+        table = pyarrow.Table.from_pylist(self._rows, schema=self._writer.schema if self._writer else None)
+        if self._writer is None:
+            self._writer = pyarrow.parquet.ParquetWriter(self.stream, table.schema)
+        self._writer.write_table(table)
+        self._rows = []
+
+    def close(self) -> None:
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+
+
+class _GroupRow:
+    __slots__ = ("key", "totals")
+
+    def __init__(self, key, totals: PunchTotals):
+        self.key = key if isinstance(key, tuple) else (key,)
+        self.totals = totals
+
+    def __getattr__(self, item):
+        return getattr(self.totals, item)
+
+
+def _key_part(index: int) -> Callable:
+    return lambda row: row.key[index]
+
+
+def _as_totals(value) -> PunchTotals:
+    if isinstance(value, PunchTotals):
+        return value
+    if isinstance(value, Punches):
+        totals = PunchTotals()
+        hours = value.hours_by_category
+        totals.punches = len(value)
+        totals.std, totals.ot1, totals.ot2 = hours["std"], hours["ot1"], hours["ot2"]
+        totals.labor = value.total_labor
+        return totals
+    raise TypeError(f"Cannot export totals from {type(value).__name__}")
+
+
+def _resolve(record, source: ColumnSource):
+    if callable(source):
+        return source(record)
+    if isinstance(record, Mapping):
+        return record[source]
+    return getattr(record, source)
+
+
+def _json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
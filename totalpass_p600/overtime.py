@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, date
+from typing import Iterable, TYPE_CHECKING
+
+from .pay_periods import PayPeriodCalendar
+from .punches import Punches, Punch, LEAVE_PUNCH_TYPES
+
+if TYPE_CHECKING:
+    from .timeclock_preferences import OvertimePreferences, PayrollPreferences
+
+# hours below this are treated as zero to stop float residue from creating empty ot slices
+_EPSILON = 1e-9
+
+
+class OvertimeCalculator:
+    """
+    Recompute the std/ot1/ot2 split of punches locally from the clock's overtime rules.
+
+    Worked hours per punch are taken from the clock (std + ot1 + ot2) so rounding and lunch
+    deductions are respected; only the split between std and overtime is recalculated.
+    Each punch is assigned to the payroll day its in time falls on, shifted by the payroll day start.
+
+    Consecutive day OT follows the seventh-day rule: on the seventh consecutive day worked in a
+    payroll week every hour is at least OT1, and hours past the Day OT1 threshold are OT2.
+    """
+
+    def __init__(self, overtime_preferences: OvertimePreferences, payroll_preferences: PayrollPreferences):
+        self.overtime_preferences = overtime_preferences
+        self.payroll_preferences = payroll_preferences
+        self.calendar = PayPeriodCalendar.from_preferences(payroll_preferences)
+        self._consecutive_day_ot = overtime_preferences.consecutive_day_ot == "Yes"
+
+    def payroll_day(self, moment: datetime) -> date:
+        """
+        The payroll day a moment belongs to, honoring the payroll day start time
+        """
+        return self.calendar.payroll_date(moment)
+
+    def payroll_week_start(self, day: date) -> date:
+        """
+        First day of the payroll week containing day
+        """
+        return self.calendar.week_start_date(day)
+
+    def recalculate(self, punches: Iterable[Punch]) -> Punches:
+        """
+        Return a new Punches with std/ot1/ot2 recomputed for every employee.
+        Punches are grouped by employee and walked once in time order; day and week totals
+        reset as the walk crosses payroll day and week boundaries.
+        :param punches: Punches or any iterable of Punch
+        :rtype: Punches
+        """
+        by_employee = defaultdict(list)
+        for punch in punches:
+            by_employee[punch.visible_id].append(punch)
+
+        recalculated = Punches()
+        for employee_punches in by_employee.values():
+            employee_punches.sort(key=lambda p: p.in_time)
+            current_day = current_week = None
+            day_hours = week_hours = 0.0
+            days_worked = set()
+            for punch in employee_punches:
+                day = self.payroll_day(punch.in_time)
+                week = self.payroll_week_start(day)
+                if week != current_week:
+                    current_week = week
+                    week_hours = 0.0
+                    days_worked = set()
+                if day != current_day:
+                    current_day = day
+                    day_hours = 0.0
+
+                hours = punch.total_hours
+                if punch.in_punch_type in LEAVE_PUNCH_TYPES:
+                    recalculated.add_punch(punch.copy(update={"std": hours, "ot1": 0.0, "ot2": 0.0}))
+                    continue
+
+                days_worked.add(day)
+                seventh_day = self._consecutive_day_ot and len(days_worked) == 7
+                std, ot1, ot2 = self._split(hours, day_hours, week_hours, seventh_day)
+                day_hours += hours
+                week_hours += hours
+                recalculated.add_punch(punch.copy(update={"std": std, "ot1": ot1, "ot2": ot2}))
+        return recalculated
+
+    def _split(self, hours: float, day_hours: float, week_hours: float, seventh_day: bool = False):
+        """
+        Split hours worked on top of day_hours/week_hours into (std, ot1, ot2).
+        Walks from threshold to threshold so a punch that crosses several is split exactly.
+        """
+        prefs = self.overtime_preferences
+        day_ot1, day_ot2 = prefs.day_ot1_after_hours, prefs.day_ot2_after_hours
+        week_ot1, week_ot2 = prefs.week_ot1_after_hours, prefs.week_ot2_after_hours
+        if seventh_day:
+            day_ot1, day_ot2 = 0.0, min(day_ot1, day_ot2)
+
+        split = [0.0, 0.0, 0.0]
+        remaining = hours
+        while remaining > _EPSILON:
+            day = day_hours + hours - remaining
+            week = week_hours + hours - remaining
+            if day >= day_ot2 or week >= week_ot2:
+                split[2] += remaining
+                break
+            if day >= day_ot1 or week >= week_ot1:
+                level = 1
+                edges = (day_ot2 - day, week_ot2 - week)
+            else:
+                level = 0
+                edges = (day_ot1 - day, week_ot1 - week, day_ot2 - day, week_ot2 - week)
+            step = min(remaining, *edges)
+            split[level] += step
+            remaining -= step
+        return tuple(split)
+
+    def labor(self, punch: Punch) -> float:
+        """
+        Labor dollars for a punch using the clock's OT1/OT2 multipliers
+        """
+        prefs = self.overtime_preferences
+        return punch.wage * (punch.std + punch.ot1 * prefs.ot1_multiplier + punch.ot2 * prefs.ot2_multiplier)
+
+    def total_labor(self, punches: Iterable[Punch]) -> float:
+        return sum(self.labor(punch) for punch in punches)
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import calendar
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from .util import weekday_index
+
+if TYPE_CHECKING:
+    from .timeclock_preferences import PayrollPreferences
+
+PERIOD_LENGTH_DAYS = {
+    "Weekly": 7,
+    "Bi-Weekly": 14,
+}
+DEFAULT_SEMI_MONTHLY_DAYS = (1, 16)
+EPOCH = date(1970, 1, 1)
+
+
+@dataclass(frozen=True)
+class PayPeriodCalendar:
+    """
+    Pay period boundaries derived from the clock's payroll preferences.
+    Weekly and bi-weekly periods repeat every 7/14 days from anchor. Monthly periods start on the
+    anchor's day of the month, and semi-monthly periods on each of semi_monthly_days.
+    Days past the end of a short month are clamped to its last day.
+
+    Periods are numbered relative to the anchor's period, so any date maps to its period id, and
+    back to the period's bounds, arithmetically. Punch times are assigned to payroll days starting
+    at day_start and to payroll weeks starting on week_start.
+    """
+
+    pay_period_type: str
+    anchor: date  # the start of any pay period
+    semi_monthly_days: tuple[int, int] = field(default=DEFAULT_SEMI_MONTHLY_DAYS)
+    day_start: time = field(default=time())
+    week_start: str = field(default="Sun")
+
+    @classmethod
+    def from_preferences(cls, payroll_preferences: PayrollPreferences) -> PayPeriodCalendar:
+        """
+        Calendars are immutable, so one is built per distinct set of payroll settings and shared
+        """
+        starts = (payroll_preferences.last_pay_start, payroll_preferences.this_pay_start,
+                  payroll_preferences.next_pay_start)
+        return _calendar_from_preferences(cls, payroll_preferences.pay_period_type, starts,
+                                          payroll_preferences.day_start, payroll_preferences.week_start)
+
+    def period_id(self, day: date) -> int:
+        """
+        Number of pay periods between the anchor's period and the one containing day, e.g. 0 for the
+        anchor's period and -1 for the one before it. Constant time for every period type.
+        """
+        return self._period_number(day) - self._period_number(self.anchor)
+
+    def period_bounds(self, period_id: int) -> tuple[date, date]:
+        """
+        First and last day of a period returned by period_id
+        """
+        return self._period_start_for_id(period_id), self._period_start_for_id(period_id + 1) - timedelta(days=1)
+
+    def period_start(self, day: date) -> date:
+        """
+        First day of the pay period containing day
+        """
+        return self._period_start_for_id(self.period_id(day))
+
+    def next_period_start(self, day: date) -> date:
+        """
+        First day of the pay period after the one containing day
+        """
+        return self._period_start_for_id(self.period_id(day) + 1)
+
+    def period_end(self, day: date) -> date:
+        """
+        Last day of the pay period containing day
+        """
+        return self.next_period_start(day) - timedelta(days=1)
+
+    def payroll_date(self, moment: datetime) -> date:
+        """
+        The payroll day a punch time counts toward. Times before day_start belong to the previous day
+        """
+        return (moment - _since_midnight(self.day_start)).date()
+
+    def week_start_date(self, day: date) -> date:
+        """
+        First day of the payroll week containing day
+        """
+        return day - timedelta(days=(day.weekday() - weekday_index(self.week_start)) % 7)
+
+    def bucket(self, times) -> tuple:
+        """
+        Vectorized period_id and week_start_date for many punch times at once, after shifting each time
+        to its payroll day. Requires numpy.
+        :param times: numpy datetime64 array or a sequence of datetimes
+        :return: (int64 period ids, datetime64[D] payroll week starts)
+        """
+        import numpy as np
+
+        moments = np.asarray(times, dtype="datetime64[us]")
+        days = (moments - np.timedelta64(_since_midnight(self.day_start))).astype("datetime64[D]")
+        day_numbers = days.astype(np.int64)
+        # 1970-01-01, day 0, was a thursday
+        weekdays = (day_numbers + 3) % 7
+        week_starts = days - ((weekdays - weekday_index(self.week_start)) % 7).astype("timedelta64[D]")
+
+        length = PERIOD_LENGTH_DAYS.get(self.pay_period_type)
+        if length:
+            return (day_numbers - _epoch_days(self.anchor)) // length, week_starts
+        months = days.astype("datetime64[M]")
+        month_starts = months.astype("datetime64[D]")
+        day_of_month = (days - month_starts).astype(np.int64) + 1
+        month_length = ((months + 1).astype("datetime64[D]") - month_starts).astype(np.int64)
+        month_numbers = months.astype(np.int64)
+        if self.pay_period_type == "Monthly":
+            numbers = month_numbers - (day_of_month < np.minimum(self.anchor.day, month_length))
+        elif self.pay_period_type == "Semi-Monthly":
+            first, second = self.semi_monthly_days
+            numbers = 2 * month_numbers + np.where(day_of_month >= np.minimum(second, month_length), 1,
+                                                   np.where(day_of_month >= np.minimum(first, month_length), 0, -1))
+        else:
+            raise ValueError(f"{self.pay_period_type} is not a valid pay period type")
+        return numbers - self._period_number(self.anchor), week_starts
+
+    def _period_number(self, day: date) -> int:
+        # periods counted from an arbitrary origin; period_id makes them relative to the anchor
+        length = PERIOD_LENGTH_DAYS.get(self.pay_period_type)
+        if length:
+            return (_epoch_days(day) - _epoch_days(self.anchor)) // length
+        month_number = _month_number(day.year, day.month)
+        if self.pay_period_type == "Monthly":
+            return month_number - (day < _clamped_date(day.year, day.month, self.anchor.day))
+        if self.pay_period_type == "Semi-Monthly":
+            first, second = self.semi_monthly_days
+            if day >= _clamped_date(day.year, day.month, second):
+                return 2 * month_number + 1
+            if day >= _clamped_date(day.year, day.month, first):
+                return 2 * month_number
+            return 2 * month_number - 1
+        raise ValueError(f"{self.pay_period_type} is not a valid pay period type")
+
+    def _period_start_for_id(self, period_id: int) -> date:
+        length = PERIOD_LENGTH_DAYS.get(self.pay_period_type)
+        if length:
+            return self.anchor + timedelta(days=period_id * length)
+        number = period_id + self._period_number(self.anchor)
+        if self.pay_period_type == "Monthly":
+            year, month = divmod(number, 12)
+            return _clamped_date(EPOCH.year + year, month + 1, self.anchor.day)
+        if self.pay_period_type == "Semi-Monthly":
+            month_number, half = divmod(number, 2)
+            year, month = divmod(month_number, 12)
+            return _clamped_date(EPOCH.year + year, month + 1, self.semi_monthly_days[half])
+        raise ValueError(f"{self.pay_period_type} is not a valid pay period type")
+
+
+@lru_cache(maxsize=64)
+def _calendar_from_preferences(cls: type, pay_period_type: str, starts: tuple[date, date, date], day_start: time,
+                               week_start: str) -> PayPeriodCalendar:
+    start_days = _configured_days(starts)
+    semi_monthly_days = start_days if len(start_days) == 2 else DEFAULT_SEMI_MONTHLY_DAYS
+    anchor = starts[1]  # this pay start
+    if pay_period_type == "Monthly":
+        # a start in a short month may be clamped; another start keeps the configured day
+        anchor = max(starts, key=lambda start: start.day)
+    return cls(pay_period_type=pay_period_type, anchor=anchor, semi_monthly_days=semi_monthly_days,
+               day_start=day_start, week_start=week_start)
+
+
+def _configured_days(starts: tuple[date, ...]) -> tuple[int, ...]:
+    """
+    the configured days of the month behind pay period starts that may be clamped to a month's end.
+    a start on its month's last day stands for a later configured day unless another start shows it,
+    e.g. 1/15, 1/31, 2/15 -> (15, 31) and 1/30, 2/14, 2/28 -> (14, 30)
+    """
+    days = {start.day for start in starts if start.day < calendar.monthrange(start.year, start.month)[1]}
+    for start in starts:
+        if start.day == calendar.monthrange(start.year, start.month)[1] and not any(d >= start.day for d in days):
+            days.add(31)
+    return tuple(sorted(days))
+
+
+def _clamped_date(year: int, month: int, day: int) -> date:
+    return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+def _month_number(year: int, month: int) -> int:
+    return (year - EPOCH.year) * 12 + month - 1
+
+
+def _epoch_days(day: date) -> int:
+    return (day - EPOCH).days
+
+
+def _since_midnight(moment: time) -> timedelta:
+    return timedelta(hours=moment.hour, minutes=moment.minute, seconds=moment.second)
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Union
+
+from .api import TimeClockApi
+from .timeclock_preferences import PreferenceUpdate
+
+# a connected client, or (address, user, password) to log in with
+Clock = Union[TimeClockApi, tuple]
+
+
+def update_preferences(clocks: Iterable[Clock], changes: dict, max_workers: int = 8) -> list[PreferenceUpdate]:
+    """
+    Write the same preference changes to many clocks concurrently.
+
+    Each clock is handled in its own worker: logging in when given credentials, diffing changes
+    against its current preferences and posting only what differs. A failure on one clock is
+    recorded in its PreferenceUpdate and does not stop the others.
+
+    update_preferences([("10.0.0.5", "admin", "pw"), ("10.0.0.6", "admin", "pw")],
+                       {"overtime_preferences": {"week_ot1_after_hours": 40}})
+    :param clocks: TimeClockApi clients or (address, user, password) tuples
+    :param changes: section name -> {field: value}, see Preferences.changed_fields
+    :param max_workers: clocks updated at once
+    :return: one PreferenceUpdate per clock, in the order given
+    """
+    clocks = list(clocks)
+    if not clocks:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(clocks))) as executor:
+        return list(executor.map(lambda clock: _update_clock(clock, changes), clocks))
+
+
+def _update_clock(clock: Clock, changes: dict) -> PreferenceUpdate:
+    created = not isinstance(clock, TimeClockApi)
+    address = clock[0] if created else clock.address
+    api = None
+    try:
+        # only log in: update_preferences fetches the preferences it diffs against
+        api = TimeClockApi(*clock, load_data=False) if created else clock
+        return api.update_preferences(changes)
+    except Exception as error:
+        return PreferenceUpdate(address, error=error)
+    finally:
+        if created and api is not None:
+            api.session.close()
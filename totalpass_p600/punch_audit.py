@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Iterable, TYPE_CHECKING
+
+from .punches import Punch, PUNCH_TYPES, LEAVE_PUNCH_TYPES
+
+if TYPE_CHECKING:
+    from .timeclock_preferences import PunchPreferences, AlertPreferences
+
+DUPLICATE = "duplicate"
+OVERLAP = "overlap"
+MISSING_OUT = "missing out"
+LONG_SHIFT = "long shift"
+
+EXCEPTION_TABLE_HEADER = ["visible_id", "exception", "in_time", "out_time", "department", "other_in_time",
+                          "other_out_time", "detail"]
+
+
+@dataclass
+class PunchException:
+    """A problem found with one punch, optionally relative to another punch of the same employee"""
+
+    kind: str
+    punch: Punch
+    other: Punch = field(default=None)
+    detail: str = field(default="")
+
+    @property
+    def visible_id(self) -> str:
+        return self.punch.visible_id
+
+    def as_row(self) -> list:
+        other_in = self.other.in_time if self.other else None
+        other_out = self.other.out_time if self.other else None
+        return [self.visible_id, self.kind, self.punch.in_time, self.punch.out_time, self.punch.department,
+                other_in, other_out, self.detail]
+
+
+def find_punch_exceptions(punches: Iterable[Punch], like_punch_minutes: int = None, max_shift_hours: float = None,
+                          punch_preferences: PunchPreferences = None,
+                          alert_preferences: AlertPreferences = None) -> list[PunchException]:
+    """
+    Find duplicate, overlapping, unterminated and overly long punches.
+
+    Each employee's punches are sorted once and swept in time order, keeping the punch with the
+    latest out time seen so far, so the whole check is O(n log n) instead of pairwise.
+    :param punches: Punches or any iterable of Punch, e.g. several merged exports
+    :param like_punch_minutes: in punches this close together are reported as duplicates.
+                               defaults to the clock's reject like punches range, or 0
+    :param max_shift_hours: punches longer than this are reported as long shifts.
+                            defaults to the clock's maximum punch time, or 24
+    :param punch_preferences: source for like_punch_minutes
+    :param alert_preferences: source for max_shift_hours
+    :rtype: list of PunchException ordered by employee and in time
+    """
+    if like_punch_minutes is None:
+        like_punch_minutes = punch_preferences.reject_like_punches_range if punch_preferences else 0
+    if max_shift_hours is None:
+        max_shift_hours = alert_preferences.maximum_punch_time_threshold if alert_preferences else 24
+    like_window = timedelta(minutes=like_punch_minutes)
+    max_shift = timedelta(hours=max_shift_hours)
+
+    by_employee = defaultdict(list)
+    for punch in punches:
+        by_employee[punch.visible_id].append(punch)
+
+    exceptions = []
+    for visible_id in sorted(by_employee):
+        employee_punches = sorted(by_employee[visible_id], key=lambda p: p.in_time)
+        previous = None  # previous worked punch, for like punch checks
+        latest = None  # worked punch with the latest out time so far, for overlap checks
+        for punch in employee_punches:
+            if punch.in_punch_type in LEAVE_PUNCH_TYPES:
+                continue
+
+            if previous and (_same_punch_ids(previous, punch) or punch.in_time - previous.in_time <= like_window):
+                exceptions.append(PunchException(DUPLICATE, punch, previous,
+                                                 f"{PUNCH_TYPES.get(punch.in_punch_type, 'In')} punch within "
+                                                 f"{like_punch_minutes} minutes of another"))
+            elif latest and punch.in_time < latest.out_time:
+                exceptions.append(PunchException(OVERLAP, punch, latest,
+                                                 f"starts {latest.out_time - punch.in_time} before the other ends"))
+            previous = punch
+
+            if not punch.out_time or not punch.out_punch_id:
+                exceptions.append(PunchException(MISSING_OUT, punch, detail="no out punch"))
+                continue
+            if punch.out_time - punch.in_time > max_shift:
+                exceptions.append(PunchException(LONG_SHIFT, punch,
+                                                 detail=f"{punch.out_time - punch.in_time} is longer than "
+                                                        f"{max_shift_hours} hours"))
+            if not latest or punch.out_time > latest.out_time:
+                latest = punch
+    return exceptions
+
+
+def exceptions_table(exceptions: Iterable[PunchException]) -> list[list]:
+    """
+    Tabulate exceptions with EXCEPTION_TABLE_HEADER as the first row
+    """
+    return [EXCEPTION_TABLE_HEADER] + [exception.as_row() for exception in exceptions]
+
+
+def _same_punch_ids(a: Punch, b: Punch) -> bool:
+    return bool(a.in_punch_id) and a.in_punch_id == b.in_punch_id and a.out_punch_id == b.out_punch_id
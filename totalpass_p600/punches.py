@@ -1,13 +1,14 @@
 from __future__ import annotations
 
-import re
+import hashlib
+from collections import Counter
 from datetime import datetime, date, timedelta
-from typing import Union, List
+from typing import Union, List, Optional
 
-import dateutil.parser
 from pydantic import BaseModel, Field, root_validator, validator
 
-from .util import strings_to_numbers, date_to_datetime
+from .conversions import parse_date, parse_time, parse_number
+from .util import date_to_datetime, BloomFilter
 
 PUNCH_TYPES = {
     0: "In",
@@ -15,18 +16,48 @@ PUNCH_TYPES = {
     54: "Vacation",
     55: "Sick"
 }
+# vacation and sick hours are paid as std, never count toward overtime and are not worked time
+LEAVE_PUNCH_TYPES = (54, 55)
+
+
+def punch_key(punch: Punch) -> tuple:
+    """
+    Identity of a punch across exports: the same in/out pair for the same employee
+    """
+    return punch.employee_id, punch.in_punch_id, punch.out_punch_id
 
 
 class Punches:
     """
     Collection of employee punches
     Punches[employee_id] to retrieve all punches for an employee
+
+    Punches are keyed on punch_key, so adding a punch that is already present does nothing and adding
+    an edited copy (same key, different values) replaces the stored one in place. This makes merging
+    overlapping exports safe. Punches without in or out punch ids cannot be keyed and are always appended.
+
+    Edits are last writer wins: exports carry no edit time, so whichever copy is added last is kept.
+    Merge exports oldest first; adding an older export after a newer one reverts its edits.
+
+    For very large append-only streams pass bloom_capacity to track keys in a fixed size bloom filter
+    instead of a dict. Membership is then probabilistic: edits are not replaced, and about
+    bloom_error_rate of genuinely new punches will be dropped as false duplicates. Removed punches are
+    remembered exactly, so they can be added back.
     """
 
-    def __init__(self):
+    HOUR_CATEGORIES = ("std", "ot1", "ot2", "adj")
+
+    def __init__(self, bloom_capacity: int = None, bloom_error_rate: float = 0.001):
         self.punches = []
-        self._days = set()
-        pass
+        self._by_key: dict[tuple, Punch] = {}
+        self._positions: dict[tuple, int] = {}  # punch_key -> index in self.punches, for keyed punches
+        self._seen_keys = BloomFilter(bloom_capacity, bloom_error_rate) if bloom_capacity else None
+        self._removed_keys: set[tuple] = set()  # keys removed since they went into the bloom filter
+        # running aggregates, kept in step with self.punches so reads are O(1)
+        self._days = Counter()
+        self._employee_punch_counts = Counter()
+        self._hours = dict.fromkeys(self.HOUR_CATEGORIES, 0.0)
+        self._labor = 0.0
 
     def add_punch(self, punch_record):
         """
@@ -36,20 +67,115 @@ class Punches:
         :return:
         """
         if isinstance(punch_record, Punch):
-            self.punches.append(punch_record)
-            self._days.add(punch_record.in_date)
+            self._upsert(punch_record)
             return
 
-        punch = Punch()
-        if punch_record["FirstName"] == ' ':
+        if punch_record["FirstName"] == ' ' or not punch_record.get("InDate"):
             return
-        for field, value in punch_record.items():
-            subfield = re.sub(r"((?<=[a-z])[A-Z]|[A-Z](?=[a-z]))", r" \1", field)
-            subfield = subfield.strip().replace(" ", "_").lower()
-            setattr(punch, subfield, strings_to_numbers(value))
+        punch = Punch(**punch_record)
         if punch.in_date:
-            self.punches.append(punch)
-            self._days.add(punch.in_date)
+            self._upsert(punch)
+
+    def remove_punch(self, punch: Punch) -> None:
+        """
+        Remove a punch from the collection and back it out of the running totals.
+        :raises ValueError: if the punch is not in the collection
+        """
+        index = self._index_of(punch)
+        punch = self.punches.pop(index)  # the stored punch, which may be an equal copy of the one given
+        self._accumulate(punch, -1)
+        key = punch_key(punch)
+        if self._by_key.get(key) is punch:
+            del self._by_key[key]
+            del self._positions[key]
+        if self._seen_keys is not None and self._is_keyed(punch):
+            self._removed_keys.add(key)
+        # later punches shifted down one place
+        for position in range(index, len(self.punches)):
+            later_key = punch_key(self.punches[position])
+            if self._by_key.get(later_key) is self.punches[position]:
+                self._positions[later_key] = position
+
+    def replace_punch(self, old: Punch, new: Punch) -> None:
+        """
+        Swap a punch for an edited version of it, keeping its position in the collection.
+        :raises ValueError: if the old punch is not in the collection
+        """
+        index = self._index_of(old)
+        old = self.punches[index]
+        self.punches[index] = new
+        self._accumulate(old, -1)
+        self._accumulate(new, 1)
+        if self._by_key.get(punch_key(old)) is old:
+            del self._by_key[punch_key(old)]
+            del self._positions[punch_key(old)]
+        if self._is_keyed(new):
+            self._by_key[punch_key(new)] = new
+            self._positions[punch_key(new)] = index
+
+    def _index_of(self, punch: Punch) -> int:
+        key = punch_key(punch)
+        if self._by_key.get(key) is punch:
+            return self._positions[key]
+        return self.punches.index(punch)
+
+    def get(self, key: tuple, default=None):
+        """
+        Look up a punch by its punch_key
+        """
+        return self._by_key.get(key, default)
+
+    def __contains__(self, punch: Punch) -> bool:
+        key = punch_key(punch)
+        if self._seen_keys is not None:
+            return key in self._seen_keys and key not in self._removed_keys
+        return key in self._by_key
+
+    @staticmethod
+    def _is_keyed(punch: Punch) -> bool:
+        return bool(punch.in_punch_id or punch.out_punch_id)
+
+    def _upsert(self, punch: Punch) -> None:
+        if not self._is_keyed(punch):
+            self._append(punch)
+            return
+        key = punch_key(punch)
+        if self._seen_keys is not None:
+            if key in self._removed_keys:
+                self._removed_keys.discard(key)
+                self._append(punch)
+            elif key not in self._seen_keys:
+                self._seen_keys.add(key)
+                self._append(punch)
+            return
+        existing = self._by_key.get(key)
+        if existing is None:
+            self._by_key[key] = punch
+            self._positions[key] = len(self.punches)
+            self._append(punch)
+        elif existing is not punch and existing != punch:
+            self.replace_punch(existing, punch)
+
+    def _append(self, punch: Punch) -> None:
+        self.punches.append(punch)
+        self._accumulate(punch, 1)
+
+    def _accumulate(self, punch: Punch, sign: int) -> None:
+        """
+        Add (sign=1) or subtract (sign=-1) a punch from the running aggregates.
+        Counters drop keys that reach zero so days() and total_employees stay accurate.
+        """
+        for counter, key in ((self._days, punch.in_date), (self._employee_punch_counts, punch.visible_id)):
+            counter[key] += sign
+            if counter[key] <= 0:
+                del counter[key]
+        for category in self.HOUR_CATEGORIES:
+            self._hours[category] += sign * (getattr(punch, category) or 0)
+        self._labor += sign * punch.labor
+        if not self.punches:
+            # snap back to exact zero so float error can't accumulate across refills
+            self._hours = dict.fromkeys(self.HOUR_CATEGORIES, 0.0)
+            self._labor = 0.0
 
     def add_punches(self, report: Union[Punches, List[Punch]]):
         if isinstance(report, Punches):
@@ -76,6 +202,18 @@ class Punches:
             department.add_punch(punch)
         return departments
 
+    def by_employee(self) -> dict[str, Punches]:
+        """
+        Bucket punches by visible id in a single pass
+        """
+        employees = {}
+        for punch in self.punches:
+            employee = employees.get(punch.visible_id)
+            if employee is None:
+                employee = employees[punch.visible_id] = Punches()
+            employee.add_punch(punch)
+        return employees
+
     def punches_by_field(self, field, value):
         punches = Punches()
         for punch in self.punches:
@@ -88,18 +226,12 @@ class Punches:
 
     def punches_by_date(self, day):
         # punches = Punches()
-        if isinstance(day, datetime):
-            day = day.date()
-        elif not isinstance(day, (date, datetime)):
-            day = dateutil.parser.parse(day).date()
-        return self.punches_by_field("in_date", day)
+        return self.punches_by_field("in_date", parse_date(day))
 
     def punches_by_date_range(self, start, stop):
         range_punches = Punches()
-        if not isinstance(start, (date, datetime)):
-            start = dateutil.parser.parse(start).date()
-        if not isinstance(stop, (date, datetime)):
-            stop = dateutil.parser.parse(stop).date()
+        start = parse_date(start)
+        stop = parse_date(stop)
         days = (stop - start).days
         day_list = [start + timedelta(days=x) for x in range(days + 1)]
         for day in day_list:
@@ -109,7 +241,7 @@ class Punches:
     def punches_by_hour(self, hour, day=None):
         """
         given an hour return all standard punches for that hour.
-        if day is specified only return that days punches
+        if day is specified only return that days punches. open punches (no out time yet) are skipped
         """
         # hours = {}
         hourly_punches = Punches()
@@ -119,7 +251,7 @@ class Punches:
             punches = self.punches
 
         for punch in punches:
-            if punch.in_punch_type in (55, 54):
+            if punch.in_punch_type in LEAVE_PUNCH_TYPES or punch.out_time is None:
                 continue
             punch_hours = int((punch.out_time - punch.in_time).seconds / 60 / 60)
             punch_range = [punch.in_time + timedelta(hours=x) for x in range(punch_hours + 1)]
@@ -130,23 +262,41 @@ class Punches:
     def __iter__(self):
         return iter(self.punches)
 
+    def __len__(self):
+        return len(self.punches)
+
     @property
-    def total_labor(self):
-        labor = 0
-        for punch in self.punches:
-            labor += punch.labor
-        return labor
+    def total_labor(self) -> float:
+        return self._labor
 
     @property
-    def total_employees(self):
-        ids = set()
-        for punch in self.punches:
-            ids.add(punch.visible_id)
-        return len(ids)
+    def total_employees(self) -> int:
+        return len(self._employee_punch_counts)
+
+    @property
+    def total_hours(self) -> float:
+        """
+        Worked hours (std + ot1 + ot2), matching Punch.total_hours
+        """
+        return self._hours["std"] + self._hours["ot1"] + self._hours["ot2"]
+
+    @property
+    def hours_by_category(self) -> dict[str, float]:
+        """
+        Running hour totals keyed by std, ot1, ot2 and adj
+        """
+        return dict(self._hours)
+
+    @property
+    def employee_punch_counts(self) -> dict[str, int]:
+        """
+        Number of punches held for each visible id
+        """
+        return dict(self._employee_punch_counts)
 
     def days(self):
         days = {}
-        for day in sorted(list(self._days)):
+        for day in sorted(self._days):
             days[day] = self.punches_by_date(day)
         return days
 
@@ -214,9 +364,9 @@ class Punch(BaseModel):
     in_note: str = Field(..., alias='InNote')
     out_punch_id: int = Field(..., alias='OutPunchID')
     int_out_date: int = Field(..., alias='intOutDate')
-    out_date: date = Field(..., alias='OutDate')  # MM/DD/YYYY
+    out_date: Optional[date] = Field(..., alias='OutDate')  # MM/DD/YYYY, blank without an out punch
     out_dow: str = Field(..., alias='OutDow')  # Mon, Tue, Wed, Thu, Fri, Sat, Sun
-    out_time: datetime = Field(..., alias='OutTime')  # HH:MM(a/p)
+    out_time: Optional[datetime] = Field(..., alias='OutTime')  # HH:MM(a/p)
     out_flags: str = Field(..., alias='OutFlags')
     out_punch_type: int = Field(..., alias='OutPunchType')
     out_note: str = Field(..., alias='OutNote')
@@ -227,7 +377,7 @@ class Punch(BaseModel):
     adj: float = Field(..., alias='ADJ')
     ot1: float = Field(..., alias='OT1')
     ot2: float = Field(..., alias='OT2')
-    wage: int = Field(..., alias='Wage')
+    wage: float = Field(..., alias='Wage')
     int_calc_flags: int = Field(..., alias='intCalcFlags')
     mot1: int = Field(..., alias='MOT1')
     mot2: int = Field(..., alias='MOT2')
@@ -235,17 +385,27 @@ class Punch(BaseModel):
     inp: str = Field(..., alias='Input')
 
     @root_validator(pre=True)
-    def punch_times_and_dates(cls, v):
-        in_time = v.data['in_time']
-        out_time = v.data['out_time']
-        in_date = v.data['in_date']
-        out_date = v.data['out_date']
-        # convert dates to date object
-        v.data['in_date'] = datetime.strptime(in_date, '%m/%d/%Y').date()
-        v.data['out_date'] = datetime.strptime(out_date, '%m/%d/%Y').date()
-        # convert times to datetime object on their respective dates
-        v.data['in_time'] = datetime.combine(v.data['in_date'], in_time)
-        v.data['out_time'] = datetime.combine(v.data['out_date'], out_time)
+    def punch_times_and_dates(cls, values):
+        """
+        convert the export's MM/DD/YYYY dates to dates and its HH:MM(a/p) times to datetimes on those dates.
+        out date and time are blank for punches without an out punch.
+        """
+        for date_field, time_field in (('InDate', 'InTime'), ('OutDate', 'OutTime')):
+            day = values.get(date_field)
+            if isinstance(day, str):
+                day = values[date_field] = parse_date(day) if day.strip() else None
+            moment = values.get(time_field)
+            if isinstance(moment, str):
+                moment = moment.strip()
+                values[time_field] = datetime.combine(day, parse_time(moment)) if moment and day else None
+        return values
+
+    @validator('sort_date', 'in_punch_id', 'int_in_date', 'in_punch_type', 'out_punch_id', 'int_out_date',
+               'out_punch_type', 'std', 'adj', 'ot1', 'ot2', 'wage', 'int_calc_flags', 'mot1', 'mot2', 'pin_number',
+               pre=True)
+    def clock_numbers(cls, v):
+        if isinstance(v, str):
+            return parse_number(v.strip() or 0)
         return v
 
     # convert punch durations to hours from minutes
@@ -258,7 +418,10 @@ class Punch(BaseModel):
     def __repr__(self):
         # times in HH:MM(a/p) format with date in MM/DD/YYYY format
         in_str = f'{self.in_time.strftime("%m/%d/%Y")} {self.in_time.strftime("%I:%M%p")}'
-        out_str = f'{self.out_time.strftime("%m/%d/%Y")} {self.out_time.strftime("%I:%M%p")}'
+        if self.out_time is None:  # still clocked in
+            out_str = "--"
+        else:
+            out_str = f'{self.out_time.strftime("%m/%d/%Y")} {self.out_time.strftime("%I:%M%p")}'
         if self.in_punch_type in (55, 54):  # punch is vacation or sick leave
             return f"<Punch {self.first_name}, {self.last_name}, Date: {self.in_date} " \
                    f"{PUNCH_TYPES[self.in_punch_type]}, Total Hours: {self.total_hours:.2f}>"
@@ -286,12 +449,22 @@ class Punch(BaseModel):
         """
         return self.ot1 + self.ot2 + self.std
 
+    @property
+    def fingerprint(self) -> str:
+        """
+        Stable digest of every field, for spotting edits between exports of the same punch.
+        """
+        values = tuple(getattr(self, name, None) for name in self.__fields__)
+        return hashlib.blake2b(repr(values).encode("utf-8"), digest_size=16).hexdigest()
+
     def labor_by_hour(self, hour: int):
         """
-        Calculate the labor hours for this punch record for a given hour.
+        Calculate the labor hours for this punch record for a given hour. 0 for open punches
         :param hour: hour in range 0-23 (0 is midnight)
         :return:
         """
+        if self.out_time is None:
+            return 0
         hour_start = date_to_datetime(self.in_date, hour=hour)
         hour_end = date_to_datetime(self.in_date, hour=hour + 1)
         punch_seconds = min((self.out_time, hour_end)).timestamp() - max((self.in_time, hour_start)).timestamp()
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import List, TYPE_CHECKING
 
-from .punches import Punches, Punch
+from .punches import Punches
 
 if TYPE_CHECKING:
     from .api import TimeClockApi
@@ -14,25 +14,29 @@ class TimeClockReport:
         self.api = api
         self.raw_report = raw_report
         self._punches = Punches()
-        self.punches.add_punches()
+        self.read_punches()
         self._assign_punches_to_employees()
-        pass
 
     def read_punches(self):
-        for record in self.raw_report:
-            if not any(v for v in record.values()):
-                continue
-            punch = Punch(**record)
-            self.punches.add_punch(punch)
+        # add_punches skips the blank rows the clock appends to its exports
+        self.punches.add_punches(self.raw_report)
 
     def _assign_punches_to_employees(self):
-        for num, employee in self.api.employee_list.items():
-            try:
-                employee_punches = self.punches.punches_by_employee_id(num).punches
-                if employee_punches:
-                    employee.add_punches(employee_punches)
-            except KeyError:
-                pass
+        """
+        Bucket the report's punches by visible id once and hand each employee its bucket.
+        The buckets hold the same Punch objects as the report, nothing is copied.
+        """
+        if self.api is None or not self.api.employee_list:
+            return
+        punches_by_employee = self.punches.by_employee()
+        for employee in self.api.employee_list:
+            employee_punches = punches_by_employee.get(employee.display_id)
+            if not employee_punches:
+                continue
+            if employee.punches:
+                employee.add_punches(employee_punches)
+            else:
+                employee.punches = employee_punches
 
     @property
     def punches(self):
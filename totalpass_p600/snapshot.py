@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import struct
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from .accrual import Accrual, Accruals
+from .employees import Employee, Employees, EmployeeRefresh
+from .punches import Punches
+from .web_punch import WebPunchSettings
+
+SNAPSHOT_MAGIC = b"TPES"
+SNAPSHOT_VERSION = 2
+# magic, version, header length
+_PREAMBLE = struct.Struct(">4sHI")
+# what a corrupt, truncated or outdated body can raise while unpickling
+_LOAD_ERRORS = (zlib.error, pickle.UnpicklingError, EOFError, AttributeError, ImportError, IndexError,
+                KeyError, TypeError, ValueError)
+
+
+def employee_layout() -> str:
+    """
+    Digest of the fields of the pickled employee classes. Snapshots written with a different layout
+    are rejected, since unpickling them would build employees with missing or stale attributes.
+    """
+    layout = [(cls.__qualname__, [(f.name, str(f.type)) for f in dataclasses.fields(cls)])
+              for cls in (Employee, Accrual, WebPunchSettings)]
+    layout.append((Accruals.__qualname__, list(inspect.signature(Accruals.__init__).parameters)))
+    return hashlib.blake2b(repr(layout).encode("utf-8"), digest_size=8).hexdigest()
+
+
+EMPLOYEE_LAYOUT = employee_layout()
+
+
+@dataclass
+class EmployeeSnapshot:
+    """
+    Fully loaded Employees for one clock, stored as a small json header followed by a zlib
+    compressed pickle of the employees and their refresh fingerprints.
+
+    The header can be read without touching the body, so freshness checks are cheap. The header
+    also records the employee class layout, and snapshots from another layout, like corrupt ones,
+    fail to load with ValueError. Snapshots are pickles: only load files your own services wrote.
+
+    snapshot = EmployeeSnapshot.from_refresh(api.address, api.refresh_employees())
+    snapshot.save("employees.snap")
+    EmployeeSnapshot.load("employees.snap").employees
+    """
+
+    clock: str
+    created: datetime
+    employees: Employees
+    row_fingerprints: dict[int, str] = field(default_factory=dict)
+    page_fingerprints: dict[int, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_refresh(cls, clock: str, refresh: EmployeeRefresh, created: datetime = None) -> EmployeeSnapshot:
+        return cls(clock=clock, created=created or datetime.now(), employees=refresh.employees,
+                   row_fingerprints=dict(refresh.row_fingerprints),
+                   page_fingerprints=dict(refresh.page_fingerprints))
+
+    def as_refresh(self) -> EmployeeRefresh:
+        """
+        the snapshot as the previous state for TimeClockApi.refresh_employees
+        """
+        return EmployeeRefresh(employees=self.employees, row_fingerprints=dict(self.row_fingerprints),
+                               page_fingerprints=dict(self.page_fingerprints))
+
+    def is_fresh(self, max_age: timedelta, now: datetime = None) -> bool:
+        return (now or datetime.now()) - self.created <= max_age
+
+    def to_bytes(self) -> bytes:
+        # punches come from timecard exports, not the employee pages, so they are not snapshotted
+        employees = [dataclasses.replace(employee, punches=None) for employee in self.employees]
+        body = zlib.compress(pickle.dumps((employees, self.row_fingerprints, self.page_fingerprints),
+                                          protocol=pickle.HIGHEST_PROTOCOL))
+        header = json.dumps({"clock": self.clock, "created": self.created.isoformat(),
+                             "employees": len(employees), "layout": EMPLOYEE_LAYOUT}).encode("utf-8")
+        return _PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header)) + header + body
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> EmployeeSnapshot:
+        """
+        :raises ValueError: if data is not a snapshot, is corrupt or was written for another employee layout
+        """
+        header, body_offset = _read_header(data)
+        if header.get("layout") != EMPLOYEE_LAYOUT:
+            raise ValueError("Snapshot was written for a different Employee layout")
+        try:
+            employees, row_fingerprints, page_fingerprints = pickle.loads(zlib.decompress(data[body_offset:]))
+            for employee in employees:
+                employee.punches = Punches()
+        except _LOAD_ERRORS as error:
+            raise ValueError(f"Corrupt employee snapshot: {error!r}") from error
+        loaded = Employees()
+        loaded.add_employees(employees)
+        return cls(clock=header["clock"], created=datetime.fromisoformat(header["created"]), employees=loaded,
+                   row_fingerprints=row_fingerprints, page_fingerprints=page_fingerprints)
+
+    def save(self, path: str) -> None:
+        """
+        write the snapshot, replacing any previous one atomically
+        """
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(self.to_bytes())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> EmployeeSnapshot:
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def read_snapshot_header(path: str) -> dict:
+    """
+    the clock, created timestamp and employee count of a snapshot file, without loading its body
+    """
+    with open(path, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        header_length = _check_preamble(preamble)
+        return json.loads(f.read(header_length))
+
+
+def _check_preamble(preamble: bytes) -> int:
+    if len(preamble) < _PREAMBLE.size:
+        raise ValueError("Not an employee snapshot")
+    magic, version, header_length = _PREAMBLE.unpack(preamble)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("Not an employee snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {version}")
+    return header_length
+
+
+def _read_header(data: bytes) -> tuple[dict, int]:
+    header_length = _check_preamble(data[:_PREAMBLE.size])
+    body_offset = _PREAMBLE.size + header_length
+    # json errors, including bad utf-8, are ValueErrors
+    header = json.loads(data[_PREAMBLE.size:body_offset])
+    if not isinstance(header, dict):
+        raise ValueError("Corrupt employee snapshot header")
+    return header, body_offset
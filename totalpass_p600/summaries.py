@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Iterable, TYPE_CHECKING
+
+from .aggregate import PunchTotals
+from .pay_periods import PayPeriodCalendar
+from .punches import Punch, Punches, punch_key
+
+if TYPE_CHECKING:
+    from .timeclock_preferences import PayrollPreferences
+
+
+@dataclass
+class PayPeriodSummary:
+    """Hour and labor totals for one pay period"""
+
+    period_start: date
+    period_end: date
+    employees: dict[str, PunchTotals] = field(default_factory=dict)  # keyed by visible id
+    departments: dict[str, PunchTotals] = field(default_factory=dict)
+    total: PunchTotals = field(default_factory=PunchTotals)
+
+
+class PayPeriodSummaries:
+    """
+    Materialized per-employee and per-department summaries for each pay period.
+
+    Punches are fed in with sync() as they are pulled from the clock. Each pay period keeps its own
+    keyed Punches, so re-synced punches are ignored and edited ones replace the old copy, even when the
+    edit moves them into another period. A period is only marked stale when its punches actually
+    change, and its summary is rebuilt on the next read.
+    """
+
+    def __init__(self, calendar: PayPeriodCalendar):
+        self.calendar = calendar
+        self._periods: dict[date, Punches] = {}
+        self._summaries: dict[date, PayPeriodSummary] = {}
+        self._stale: set[date] = set()
+        self._period_of: dict[tuple, date] = {}  # punch_key -> start of the period holding the punch
+
+    @classmethod
+    def from_preferences(cls, payroll_preferences: PayrollPreferences) -> PayPeriodSummaries:
+        return cls(PayPeriodCalendar.from_preferences(payroll_preferences))
+
+    def sync(self, punches: Iterable[Punch]) -> set[date]:
+        """
+        Merge newly pulled punches.
+        :return: start dates of the pay periods whose punches changed
+        """
+        changed = set()
+        for punch in punches:
+            key = punch_key(punch)
+            period_start = self.calendar.period_start(punch.in_date)
+            previous_start = self._period_of.get(key)
+            if previous_start is not None and previous_start != period_start:
+                # the punch was edited into another period: take the old copy out of its period
+                previous = self._periods[previous_start]
+                previous.remove_punch(previous.get(key))
+                if not previous:
+                    del self._periods[previous_start]
+                changed.add(previous_start)
+            self._period_of[key] = period_start
+            period = self._periods.get(period_start)
+            if period is None:
+                period = self._periods[period_start] = Punches()
+            existing = period.get(key)
+            if existing is not None and (existing is punch or existing == punch):
+                continue
+            period.add_punch(punch)
+            changed.add(period_start)
+        self._stale |= changed
+        return changed
+
+    def invalidate(self, day: date = None) -> None:
+        """
+        Force the period containing day, or every period, to be rebuilt on its next read
+        """
+        if day is None:
+            self._stale |= set(self._periods)
+        else:
+            self._stale.add(self.calendar.period_start(day))
+
+    def summary(self, day: date) -> PayPeriodSummary:
+        """
+        Summary of the pay period containing day. Periods with no punches give an empty summary.
+        """
+        period_start = self.calendar.period_start(day)
+        summary = self._summaries.get(period_start)
+        if summary is None or period_start in self._stale:
+            summary = self._summaries[period_start] = self._summarize(period_start)
+            self._stale.discard(period_start)
+        return summary
+
+    def periods(self) -> list[date]:
+        return sorted(self._periods)
+
+    def punches(self, day: date) -> Punches:
+        return self._periods.get(self.calendar.period_start(day), Punches())
+
+    def _summarize(self, period_start: date) -> PayPeriodSummary:
+        summary = PayPeriodSummary(period_start=period_start, period_end=self.calendar.period_end(period_start))
+        for punch in self._periods.get(period_start, ()):
+            employee = summary.employees.get(punch.visible_id)
+            if employee is None:
+                employee = summary.employees[punch.visible_id] = PunchTotals()
+            department = summary.departments.get(punch.department)
+            if department is None:
+                department = summary.departments[punch.department] = PunchTotals()
+            employee.add_punch(punch)
+            department.add_punch(punch)
+            summary.total.add_punch(punch)
+        return summary
@@ -1,13 +1,19 @@
 from __future__ import annotations
 
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, date, time
-from typing import Union
+from typing import Union, TYPE_CHECKING
 
-from bs4 import Tag, BeautifulSoup
+import lxml.html
+from lxml import etree
 from pydantic import BaseModel, validator
 
+from .conversions import parse_date, parse_time
+
+if TYPE_CHECKING:
+    from bs4 import Tag, BeautifulSoup
+
 # valid ip address regex from https://stackoverflow.com/a/166589
 IP_ADDRESS_REGEX = re.compile(
     r'^(([0-9]|[1-9][0-9]|1[0-9]{2}|2[0-4][0-9]|25[0-5])\.){3}([0-9]|[1-9][0-9]|1[0-9]{2}|2[0-4][0-9]|25[0-5])$')
@@ -21,24 +27,148 @@ def str_to_time(v: str) -> time:
     """
 
     if isinstance(v, str):
-        time_re = re.compile(r'^([0-1][0-9]|2[0-3]):([0-5][0-9])([pam]+)$')
-        time_match = time_re.match(v)
-        if time_re.match(v):
-            am_pm = time_re.search(v).group(3)
-            h = int(time_re.search(v).group(1))
-            m = int(time_re.search(v).group(2))
-
-            if am_pm.lower() in ['pm', 'p']:
-                if h != 12:
-                    h += 12
-            elif am_pm.lower() in ['a', 'am'] and h == 12:
-                h = 0
-            return time(h, m)
-        else:
-            raise ValueError(f"{v} is not a valid time")
+        return parse_time(v)
     return v
 
 
+@dataclass
+class PreferenceField:
+    """
+    The parsed state of one element on the preferences form
+    """
+    tag: str
+    value: str = None  # input value, or the value of a select's selected option
+    text: str = None  # text of a select's selected option, or of a div's .prefsVal child
+    checked: bool = False
+    name: str = None  # form control name, used when posting changes
+    type: str = None  # input type
+    options: dict[str, str] = None  # select option text -> value
+
+
+@dataclass
+class PreferencesIndex:
+    """
+    id -> PreferenceField for every element of the preferences form, plus its hidden inputs and
+    form attributes, collected in a single traversal. Sections read from the index instead of
+    searching the tree once per field, and no reference to the tree is kept.
+    """
+    fields: dict[str, PreferenceField] = field(default_factory=dict)
+    hidden_inputs: dict[str, str] = field(default_factory=dict)
+    attributes: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def of(cls, form: Union[Tag, PreferencesIndex]) -> PreferencesIndex:
+        """
+        an index for form, building one if form is a soup Tag
+        """
+        if isinstance(form, PreferencesIndex):
+            return form
+        return cls.from_soup(form)
+
+    @classmethod
+    def from_html(cls, html: Union[str, bytes]) -> PreferencesIndex:
+        """
+        parse the preferences page with lxml and index the formMain form
+        """
+        root = lxml.html.fromstring(html)
+        form = next((element for element in root.iter("form") if element.get("id") == "formMain"), root)
+        index = cls(attributes=dict(form.attrib))
+        for element in form.iterdescendants(etree.Element):
+            tag = element.tag
+            if tag == "input" and element.get("type") == "hidden":
+                index.hidden_inputs[element.get("name")] = element.get("value")
+            element_id = element.get("id")
+            if element_id is None:
+                continue
+            if tag == "select":
+                options = list(element.iter("option"))
+                selected = _selected_option(options, lambda option: option.get("selected"))
+                index.fields[element_id] = PreferenceField(
+                    tag, value=selected.get("value") if selected is not None else None,
+                    text=selected.text_content() if selected is not None else None, name=element.get("name"),
+                    options={option.text_content(): option.get("value") for option in options})
+            elif tag == "div":
+                value = next((child for child in element.iterdescendants()
+                              if "prefsVal" in (child.get("class") or "").split()), None)
+                index.fields[element_id] = PreferenceField(
+                    tag, text=value.text_content() if value is not None else None)
+            else:
+                index.fields[element_id] = PreferenceField(tag, value=element.get("value"),
+                                                           checked=element.get("checked") is not None,
+                                                           name=element.get("name"), type=element.get("type"))
+        return index
+
+    @classmethod
+    def from_soup(cls, soup: Tag) -> PreferencesIndex:
+        """
+        index an already parsed soup. soup may be the form or the whole page
+        """
+        index = cls(attributes=dict(soup.attrs) if soup.name == "form" else {})
+        for element in soup.find_all(True):
+            tag = element.name
+            if tag == "input" and element.get("type") == "hidden":
+                index.hidden_inputs[element["name"]] = element["value"]
+            element_id = element.get("id")
+            if element_id is None:
+                continue
+            if tag == "select":
+                options = element.find_all("option")
+                selected = _selected_option(options, lambda option: option.get("selected"))
+                index.fields[element_id] = PreferenceField(
+                    tag, value=selected.get("value") if selected is not None else None,
+                    text=selected.text if selected is not None else None, name=element.get("name"),
+                    options={option.text: option.get("value") for option in options})
+            elif tag == "div":
+                value = element.select_one(".prefsVal")
+                index.fields[element_id] = PreferenceField(tag, text=value.text if value is not None else None)
+            else:
+                index.fields[element_id] = PreferenceField(tag, value=element.get("value"),
+                                                           checked=element.get("checked") is not None,
+                                                           name=element.get("name"), type=element.get("type"))
+        return index
+
+    def value(self, element_id: str) -> str:
+        value = self.fields[element_id].value
+        if value is None:
+            raise KeyError(f"#{element_id} has no value")
+        return value
+
+    def checked(self, element_id: str) -> bool:
+        return self.fields[element_id].checked
+
+    def selected(self, element_id: str) -> str:
+        """
+        text of the selected option of a select
+        """
+        text = self.fields[element_id].text
+        if text is None:
+            raise KeyError(f"#{element_id} has no selected option")
+        return text
+
+    def selected_value(self, element_id: str) -> str:
+        return self.fields[element_id].value
+
+    def text(self, element_id: str) -> str:
+        """
+        text of a div's .prefsVal element
+        """
+        return self.fields[element_id].text
+
+
+def _selected_option(options, selected_attribute):
+    """
+    the first option marked selected="selected", falling back to one with a bare selected attribute
+    """
+    fallback = None
+    for option in options:
+        selected = selected_attribute(option)
+        if selected == "selected":
+            return option
+        if selected is not None and fallback is None:
+            fallback = option
+    return fallback
+
+
 @dataclass
 class CompanyInformation:
     """
@@ -49,12 +179,13 @@ class CompanyInformation:
     company_payroll_id: str
 
     @classmethod
-    def from_soup(cls, form: Tag) -> CompanyInformation:
+    def from_soup(cls, form: Union[Tag, PreferencesIndex]) -> CompanyInformation:
+        index = PreferencesIndex.of(form)
         # Company Information
         # Company Name selector #prefs2
-        company_name = form.find("input", {"id": "prefs2"})["value"]
+        company_name = index.value("prefs2")
         # Company Payroll ID selector #prefs3
-        company_payroll_id = form.find("input", {"id": "prefs3"})["value"]
+        company_payroll_id = index.value("prefs3")
         return cls(company_name, company_payroll_id)
 
 
@@ -90,7 +221,7 @@ class PayrollPreferences(BaseModel):
         :return:
         """
         if isinstance(v, str):
-            return datetime.strptime(v, '%m/%d/%y').date()
+            return parse_date(v)
         return v
 
     @validator('pay_period_type')
@@ -105,20 +236,20 @@ class PayrollPreferences(BaseModel):
         return v.title()
 
     @classmethod
-    def from_soup(cls, form: Tag) -> PayrollPreferences:
+    def from_soup(cls, form: Union[Tag, PreferencesIndex]) -> PayrollPreferences:
+        index = PreferencesIndex.of(form)
         # Payroll Preferences
         # last pay start date selector #prefs9
-        last_pay_start_date = form.find("input", {"id": "prefs9"})["value"]
+        last_pay_start_date = index.value("prefs9")
         # this pay start date selector #prefs10
-        this_pay_start_date = form.find("input", {"id": "prefs10"})["value"]
+        this_pay_start_date = index.value("prefs10")
         # next pay start date selector #prefs11
-        next_pay_start_date = form.find("input", {"id": "prefs11"})["value"]
+        next_pay_start_date = index.value("prefs11")
         # pay period type dropdown selector #prefs5
-        pay_period_type_dropdown = form.find("select", {"id": "prefs5"})
-        pay_period_type = pay_period_type_dropdown.find("option", {"selected": "selected"}).text
+        pay_period_type = index.selected("prefs5")
         # Pay Period Start Date selector #prefs10 MM/DD/YY
         # Day Start selector #prefs13
-        day_start = form.find("input", {"id": "prefs13"})["value"]
+        day_start = index.value("prefs13")
         # hour = int(day_start.split(':')[0])
         # minute = int(day_start.split(':')[1][:-1])
         # am_pm = day_start[-1]
@@ -126,8 +257,7 @@ class PayrollPreferences(BaseModel):
         #     hour += 12
         # day_start = time(hour, minute)
         # Week Start dropdown selector #prefs14
-        week_start_dropdown = form.find("select", {"id": "prefs14"})
-        week_start = week_start_dropdown.find("option", {"selected": "selected"}).text
+        week_start = index.selected("prefs14")
         return cls(last_pay_start=last_pay_start_date, this_pay_start=this_pay_start_date,
                    next_pay_start=next_pay_start_date, pay_period_type=pay_period_type, day_start=day_start,
                    week_start=week_start)
@@ -161,23 +291,23 @@ class OvertimePreferences(BaseModel):
             return 'Yes' if v else 'No'
 
     @classmethod
-    def from_soup(cls, form: Tag) -> OvertimePreferences:
+    def from_soup(cls, form: Union[Tag, PreferencesIndex]) -> OvertimePreferences:
+        index = PreferencesIndex.of(form)
         # Overtime Preferences
         # Day Overtime 1 selector #prefs17
-        day_overtime_1 = form.find("input", {"id": "prefs17"})["value"]
+        day_overtime_1 = index.value("prefs17")
         # Day Overtime 2 selector #prefs18
-        day_overtime_2 = form.find("input", {"id": "prefs18"})["value"]
+        day_overtime_2 = index.value("prefs18")
         # Week Overtime 1 selector #prefs19
-        week_overtime_1 = form.find("input", {"id": "prefs19"})["value"]
+        week_overtime_1 = index.value("prefs19")
         # Week Overtime 2 selector #prefs20
-        week_overtime_2 = form.find("input", {"id": "prefs20"})["value"]
+        week_overtime_2 = index.value("prefs20")
         # Consecutive Day Overtime dropdown selector #prefs21 Yes/No
-        consecutive_day_overtime_dropdown = form.find("select", {"id": "prefs21"})
-        consecutive_day_overtime = consecutive_day_overtime_dropdown.find("option", {"selected": "selected"}).text
+        consecutive_day_overtime = index.selected("prefs21")
         # OT1 Multiplier selector #prefs25
-        ot1_multiplier = form.find("input", {"id": "prefs25"})["value"]
+        ot1_multiplier = index.value("prefs25")
         # OT2 Multiplier selector #prefs26
-        ot2_multiplier = form.find("input", {"id": "prefs26"})["value"]
+        ot2_multiplier = index.value("prefs26")
         return cls(day_ot1_after_hours=day_overtime_1, day_ot2_after_hours=day_overtime_2,
                    week_ot1_after_hours=week_overtime_1, week_ot2_after_hours=week_overtime_2,
                    consecutive_day_ot=consecutive_day_overtime, ot1_multiplier=ot1_multiplier,
@@ -219,19 +349,19 @@ class PunchPreferences(BaseModel):
         return ip_addresses
 
     @classmethod
-    def from_soup(cls, form: Tag) -> PunchPreferences:
+    def from_soup(cls, form: Union[Tag, PreferencesIndex]) -> PunchPreferences:
+        index = PreferencesIndex.of(form)
         # Punch Preferences
         # rounding type dropdown selector #prefs30
-        rounding_type_dropdown = form.find("select", {"id": "prefs30"})
-        rounding_type = rounding_type_dropdown.find("option", {"selected": "selected"}).text
+        rounding_type = index.selected("prefs30")
         # Automatic Punches become IN at x.xx hours selector #prefs31
-        auto_punch_in_after_hours = form.find("input", {"id": "prefs31"})["value"]
+        auto_punch_in_after_hours = index.value("prefs31")
         # Flag edits on reports selector #prefs32
-        flag_edits_on_reports = form.find("input", {"id": "prefs32"}).get("checked") is not None
+        flag_edits_on_reports = index.checked("prefs32")
         # Reject Like Punches within x minutes of each other selector #prefs33
-        reject_like_punches_range = form.find("input", {"id": "prefs33"})["value"]
+        reject_like_punches_range = index.value("prefs33")
         # Global Authorized Web Punch  Address(es) comma separated selector #prefs70
-        global_authorized_web_punch_addresses = form.find("input", {"id": "prefs70"})["value"]
+        global_authorized_web_punch_addresses = index.value("prefs70")
         return cls(rounding_type=rounding_type, auto_punch_in_after_hours=auto_punch_in_after_hours,
                    flag_edits_on_reports=flag_edits_on_reports, reject_like_punches_range=reject_like_punches_range,
                    global_authorized_web_punch_addresses=global_authorized_web_punch_addresses)
@@ -239,13 +369,9 @@ class PunchPreferences(BaseModel):
 
 @dataclass
 class HiddenInputs:
-    def __init__(self, form: Tag):
-        self.form = form
-        self.hidden_inputs_tags = self.form.find_all('input', {'type': 'hidden'})
-        self.hidden_inputs = self.__get_hidden_inputs()
-
-    def __get_hidden_inputs(self):
-        return {tag['name']: tag['value'] for tag in self.hidden_inputs_tags}
+    def __init__(self, form: Union[Tag, PreferencesIndex]):
+        # only the name -> value pairs are kept, never the form itself
+        self.hidden_inputs = dict(PreferencesIndex.of(form).hidden_inputs)
 
     def __get_hidden_input(self, name: str):
         return self.hidden_inputs[name]
@@ -284,21 +410,19 @@ class EmployeeInputPreferences:
         return v.upper()
 
     @classmethod
-    def from_soup(cls, form: Tag) -> EmployeeInputPreferences:
+    def from_soup(cls, form: Union[Tag, PreferencesIndex]) -> EmployeeInputPreferences:
+        index = PreferencesIndex.of(form)
         # Employee Input Preferences
         # enabled drown down selector #prefs36
-        enabled_dropdown = form.find("select", {"id": "prefs36"})
-        enabled = enabled_dropdown.find("option", {"selected": "selected"})["value"] == "selected"
+        enabled = index.selected_value("prefs36") == "selected"
         # Input Name selector #prefs37
-        input_name = form.find("input", {"id": "prefs37"})["value"]
+        input_name = index.value("prefs37")
         # Collection Type dropdown selector #prefs38
-        collection_type_dropdown = form.find("select", {"id": "prefs38"})
-        collection_type = collection_type_dropdown.find("option", {"selected": "selected"}).text
+        collection_type = index.selected("prefs38")
         # Collect On dropdown selector #prefs39
-        collect_on_dropdown = form.find("select", {"id": "prefs39"})
-        collect_on = collect_on_dropdown.find("option", {"selected": "selected"}).text
+        collect_on = index.selected("prefs39")
         # Show Totals checkbox #prefs40
-        show_totals = form.find("input", {"id": "prefs40"}).get("checked") is not None
+        show_totals = index.checked("prefs40")
         return cls(enabled=enabled, input_name=input_name, collection_type=collection_type, collect_on=collect_on,
                    show_totals=show_totals)
 
@@ -316,17 +440,15 @@ class DeviceInformation:
     serial_number: str
 
     @classmethod
-    def from_soup(cls, form: Tag) -> DeviceInformation:
+    def from_soup(cls, form: Union[Tag, PreferencesIndex]) -> DeviceInformation:
+        index = PreferencesIndex.of(form)
         # Device Information
         # Database Version div #prefsDiv42
-        database_version_div = form.find("div", {"id": "prefsDiv42"})
-        database_version = database_version_div.select_one(".prefsVal").text.strip()
+        database_version = index.text("prefsDiv42").strip()
         # Software Version div #prefsDiv43
-        software_version_div = form.find("div", {"id": "prefsDiv43"})
-        software_version = software_version_div.select_one(".prefsVal").text.strip()
+        software_version = index.text("prefsDiv43").strip()
         # Serial Number div #prefsDiv44
-        serial_number_div = form.find("div", {"id": "prefsDiv44"})
-        serial_number = serial_number_div.select_one(".prefsVal").text.strip()
+        serial_number = index.text("prefsDiv44").strip()
         return cls(database_version=database_version, software_version=software_version, serial_number=serial_number)
 
 
@@ -385,47 +507,41 @@ class DevicePreferences:
         return v.title()
 
     @classmethod
-    def from_soup(cls, form: Tag) -> DevicePreferences:
+    def from_soup(cls, form: Union[Tag, PreferencesIndex]) -> DevicePreferences:
+        index = PreferencesIndex.of(form)
         # Device Preferences
         # Calculated Time Format dropdown selector #prefs47
-        calculated_time_format_dropdown = form.find("select", {"id": "prefs47"})
-        calculated_time_format = calculated_time_format_dropdown.find("option", {"selected": "selected"}).text
+        calculated_time_format = index.selected("prefs47")
         # PIN Number Length dropdown #prefs48
-        pin_number_length_dropdown = form.find("select", {"id": "prefs48"})
-        pin_number_length = int(pin_number_length_dropdown.find("option", {"selected": "selected"}).text)
+        pin_number_length = int(index.selected("prefs48"))
 
         # Hide Employee PIN checkbox #prefs49
-        hide_employee_pin_checkbox = form.find("input", {"id": "prefs49"})
-        hide_employee_pin = hide_employee_pin_checkbox.get("checked") is not None
+        hide_employee_pin = index.checked("prefs49")
         # System Prompt 1 input #prefs50
-        system_prompt_1 = form.find("input", {"id": "prefs50"})["value"]
+        system_prompt_1 = index.value("prefs50")
         # System Prompt 2 input #prefs51
-        system_prompt_2 = form.find("input", {"id": "prefs51"})["value"]
+        system_prompt_2 = index.value("prefs51")
         # System Prompt 3 input #prefs52
-        system_prompt_3 = form.find("input", {"id": "prefs52"})["value"]
+        system_prompt_3 = index.value("prefs52")
         # Supervisor Code input #prefs53
-        supervisor_code = form.find("input", {"id": "prefs53"})["value"]
+        supervisor_code = index.value("prefs53")
         # Lock Keypad checkbox #prefs54
-        lock_keypad = form.find("input", {"id": "prefs54"}).get("checked") is not None
+        lock_keypad = index.checked("prefs54")
         # Use Daylight Savings checkbox #prefs55
-        use_daylight_savings = form.find("input", {"id": "prefs55"}).get("checked") is not None
+        use_daylight_savings = index.checked("prefs55")
         # Default Attendance Report To dropdown selector #prefs56
-        default_attendance_report_to_dropdown = form.find("select", {"id": "prefs56"})
-        default_attendance_report_to = default_attendance_report_to_dropdown.find(
-            "option", {"selected": "selected"}).text
+        default_attendance_report_to = index.selected("prefs56")
         # Default Timecard Report To dropdown selector #prefs57
-        default_timecard_report_to_dropdown = form.find("select", {"id": "prefs57"})
-        default_timecard_report_to = default_timecard_report_to_dropdown.find("option", {"selected": "selected"}).text
+        default_timecard_report_to = index.selected("prefs57")
         # Refresh Home Page Every x Minutes input #prefs58
-        refresh_home_page_every_x_minutes = int(form.find("input", {"id": "prefs58"})["value"])
+        refresh_home_page_every_x_minutes = int(index.value("prefs58"))
         # Use SSL Server checkbox #prefs59
-        use_ssl_server = form.find("input", {"id": "prefs59"}).get("checked") is not None
+        use_ssl_server = index.checked("prefs59")
         # Use Popup Windows for Edits dropdown #prefs60
-        use_popup_windows_for_edits_dropdown = form.find("select", {"id": "prefs60"})
-        use_popup_windows_for_edits = use_popup_windows_for_edits_dropdown.find("option", {"selected": "selected"}).text
+        use_popup_windows_for_edits = index.selected("prefs60")
 
         # Show total hours at the clock checkbox #prefs61
-        show_total_hours_at_the_clock = form.find("input", {"id": "prefs61"}).get("checked") is not None
+        show_total_hours_at_the_clock = index.checked("prefs61")
 
         return cls(
             calculated_time_format=calculated_time_format,
@@ -461,15 +577,16 @@ class MultiClockPreferences:
     child_offline_sync_delay_seconds: int
 
     @classmethod
-    def from_soup(cls, form: Tag) -> MultiClockPreferences:
+    def from_soup(cls, form: Union[Tag, PreferencesIndex]) -> MultiClockPreferences:
+        index = PreferencesIndex.of(form)
         # Child realtime Time/Date sync checkbox #prefs64
-        child_realtime_time_date_sync = form.find("input", {"id": "prefs64"}).get("checked") is not None
+        child_realtime_time_date_sync = index.checked("prefs64")
         # Child realtime data sync checkbox #prefs65
-        child_realtime_data_sync = form.find("input", {"id": "prefs65"}).get("checked") is not None
+        child_realtime_data_sync = index.checked("prefs65")
         # Child Online sync delay x seconds input #prefs66
-        child_online_sync_delay_x_seconds = int(form.find("input", {"id": "prefs66"})["value"])
+        child_online_sync_delay_x_seconds = int(index.value("prefs66"))
         # Child Offline sync delay x seconds input #prefs67
-        child_offline_sync_delay_x_seconds = int(form.find("input", {"id": "prefs67"})["value"])
+        child_offline_sync_delay_x_seconds = int(index.value("prefs67"))
 
         return cls(child_realtime_data_sync=child_realtime_data_sync,
                    child_realtime_time_date_sync=child_realtime_time_date_sync,
@@ -510,28 +627,28 @@ class EmailPreferences(BaseModel):
         return send_backups.title()
 
     @classmethod
-    def from_soup(cls, form: Tag) -> EmailPreferences:
+    def from_soup(cls, form: Union[Tag, PreferencesIndex]) -> EmailPreferences:
+        index = PreferencesIndex.of(form)
         # SMTP Server Address input #prefs73
-        smtp_server_address = form.find("input", {"id": "prefs73"})["value"]
+        smtp_server_address = index.value("prefs73")
         # Use SSL checkbox #prefs74
-        use_ssl = form.find("input", {"id": "prefs74"}).get("checked") is not None
+        use_ssl = index.checked("prefs74")
         # Use STARTTLS checkbox #prefs75
-        use_starttls = form.find("input", {"id": "prefs75"}).get("checked") is not None
+        use_starttls = index.checked("prefs75")
         # Use Authentication checkbox #prefs76
-        use_authentication = form.find("input", {"id": "prefs76"}).get("checked") is not None
+        use_authentication = index.checked("prefs76")
         # Username/Email Address input #prefs77
-        username_email_address = form.find("input", {"id": "prefs77"})["value"]
+        username_email_address = index.value("prefs77")
         # Password input #prefs78
-        password = form.find("input", {"id": "prefs78"})["value"]
+        password = index.value("prefs78")
         # From Email Address input #prefs79
-        from_email_address = form.find("input", {"id": "prefs79"})["value"]
+        from_email_address = index.value("prefs79")
         # Email Domain Name input #prefs80
-        email_domain_name = form.find("input", {"id": "prefs80"})["value"]
+        email_domain_name = index.value("prefs80")
         # Email Backups To input #prefs81
-        email_backups_to = form.find("input", {"id": "prefs81"})["value"]
+        email_backups_to = index.value("prefs81")
         # Send Backups dropdown #prefs82
-        send_backups_dropdown = form.find("select", {"id": "prefs82"})
-        send_backups = send_backups_dropdown.find("option", {"selected": "selected"}).text
+        send_backups = index.selected("prefs82")
 
         return cls(smtp_server_address=smtp_server_address, use_ssl=use_ssl, use_starttls=use_starttls,
                    use_authentication=use_authentication, username_email_address=username_email_address,
@@ -566,25 +683,26 @@ class AlertPreferences(BaseModel):
     _validate_time = validator('email_daily_alerts_time', allow_reuse=True)(str_to_time)
 
     @classmethod
-    def from_soup(cls, form: Tag) -> AlertPreferences:
+    def from_soup(cls, form: Union[Tag, PreferencesIndex]) -> AlertPreferences:
+        index = PreferencesIndex.of(form)
         # Alert Low Hours at x.xx Hours per punch #prefs86
-        alert_low_hours_threshold = float(form.find("input", {"id": "prefs86"})["value"])
+        alert_low_hours_threshold = float(index.value("prefs86"))
         # Alert High Hours at x.xx Hours per punch #prefs87
-        alert_high_hours_threshold = float(form.find("input", {"id": "prefs87"})["value"])
+        alert_high_hours_threshold = float(index.value("prefs87"))
         # Maximum Punch Time at x.xx Hours per punch #prefs88
-        maximum_punch_time_threshold = float(form.find("input", {"id": "prefs88"})["value"])
+        maximum_punch_time_threshold = float(index.value("prefs88"))
         # Alert Day Overtime OT at x.xx Hours remaining #prefs89
-        alert_day_overtime_ot_threshold = float(form.find("input", {"id": "prefs89"})["value"])
+        alert_day_overtime_ot_threshold = float(index.value("prefs89"))
         # Alert Week Overtime OT at x.xx Hours remaining #prefs90
-        alert_week_overtime_ot_threshold = float(form.find("input", {"id": "prefs90"})["value"])
+        alert_week_overtime_ot_threshold = float(index.value("prefs90"))
         # Check Alerts Every x Minutes #prefs92
-        check_alerts_interval = int(form.find("input", {"id": "prefs92"})["value"])
+        check_alerts_interval = int(index.value("prefs92"))
         # Email Alerts Every x Minutes #prefs93
-        email_alerts_interval = int(form.find("input", {"id": "prefs93"})["value"])
+        email_alerts_interval = int(index.value("prefs93"))
         # Update Employee Hours Every x Minutes #prefs94
-        update_employee_hours_interval = int(form.find("input", {"id": "prefs94"})["value"])
+        update_employee_hours_interval = int(index.value("prefs94"))
         # Email Daily Alerts at mm:hh(a/p) #prefs95
-        email_daily_alerts_time = form.find("input", {"id": "prefs95"})["value"]
+        email_daily_alerts_time = index.value("prefs95")
 
         return cls(alert_low_hours_threshold=alert_low_hours_threshold,
                    alert_high_hours_threshold=alert_high_hours_threshold,
@@ -633,65 +751,56 @@ class CustomFieldPreferences(BaseModel):
         use_arbitrary_types = True
 
     @classmethod
-    def from_soup(cls, form: Tag) -> CustomFieldPreferences:
+    def from_soup(cls, form: Union[Tag, PreferencesIndex]) -> CustomFieldPreferences:
+        index = PreferencesIndex.of(form)
         # field 1 name #prefs100
         # field 1 assign dropdown #prefs101
-        field_1_dropdown = form.find("select", {"id": "prefs101"})
-        field_1_assign_to = field_1_dropdown.find("option", {"selected": "selected"}).text
-        custom_field_1 = CustomField(name=form.find("input", {"id": "prefs100"})["value"], assign=field_1_assign_to)
+        field_1_assign_to = index.selected("prefs101")
+        custom_field_1 = CustomField(name=index.value("prefs100"), assign=field_1_assign_to)
 
         # field 2 name #prefs103
         # field 2 assign dropdown #prefs104
-        field_2_dropdown = form.find("select", {"id": "prefs104"})
-        field_2_assign_to = field_2_dropdown.find("option", {"selected": "selected"}).text
-        custom_field_2 = CustomField(name=form.find("input", {"id": "prefs103"})["value"], assign=field_2_assign_to)
+        field_2_assign_to = index.selected("prefs104")
+        custom_field_2 = CustomField(name=index.value("prefs103"), assign=field_2_assign_to)
 
         # field 3 name #prefs106
         # field 3 assign dropdown #prefs107
-        field_3_dropdown = form.find("select", {"id": "prefs107"})
-        field_3_assign_to = field_3_dropdown.find("option", {"selected": "selected"}).text
-        custom_field_3 = CustomField(name=form.find("input", {"id": "prefs106"})["value"], assign=field_3_assign_to)
+        field_3_assign_to = index.selected("prefs107")
+        custom_field_3 = CustomField(name=index.value("prefs106"), assign=field_3_assign_to)
 
         # field 4 name #prefs109
         # field 4 assign dropdown #prefs110
-        field_4_dropdown = form.find("select", {"id": "prefs110"})
-        field_4_assign_to = field_4_dropdown.find("option", {"selected": "selected"}).text
-        custom_field_4 = CustomField(name=form.find("input", {"id": "prefs109"})["value"], assign=field_4_assign_to)
+        field_4_assign_to = index.selected("prefs110")
+        custom_field_4 = CustomField(name=index.value("prefs109"), assign=field_4_assign_to)
 
         # field 5 name #prefs112
         # field 5 assign dropdown #prefs113
-        field_5_dropdown = form.find("select", {"id": "prefs113"})
-        field_5_assign_to = field_5_dropdown.find("option", {"selected": "selected"}).text
-        custom_field_5 = CustomField(name=form.find("input", {"id": "prefs112"})["value"], assign=field_5_assign_to)
+        field_5_assign_to = index.selected("prefs113")
+        custom_field_5 = CustomField(name=index.value("prefs112"), assign=field_5_assign_to)
 
         # field 6 name #prefs115
         # field 6 assign dropdown #prefs116
-        field_6_dropdown = form.find("select", {"id": "prefs116"})
-        field_6_assign_to = field_6_dropdown.find("option", {"selected": "selected"}).text
-        custom_field_6 = CustomField(name=form.find("input", {"id": "prefs115"})["value"], assign=field_6_assign_to)
+        field_6_assign_to = index.selected("prefs116")
+        custom_field_6 = CustomField(name=index.value("prefs115"), assign=field_6_assign_to)
 
         # field 7 name #prefs118
         # field 7 assign dropdown #prefs119
-        field_7_dropdown = form.find("select", {"id": "prefs119"})
-        field_7_assign_to = field_7_dropdown.find("option", {"selected": "selected"}).text
-        custom_field_7 = CustomField(name=form.find("input", {"id": "prefs118"})["value"], assign=field_7_assign_to)
+        field_7_assign_to = index.selected("prefs119")
+        custom_field_7 = CustomField(name=index.value("prefs118"), assign=field_7_assign_to)
 
         # field 8 name #prefs121
         # field 8 assign dropdown #prefs122
-        field_8_dropdown = form.find("select", {"id": "prefs122"})
-        field_8_assign_to = field_8_dropdown.find("option", {"selected": "selected"}).text
-        custom_field_8 = CustomField(name=form.find("input", {"id": "prefs121"})["value"], assign=field_8_assign_to)
+        field_8_assign_to = index.selected("prefs122")
+        custom_field_8 = CustomField(name=index.value("prefs121"), assign=field_8_assign_to)
         # field 9 name #prefs124
         # field 9 assign dropdown #prefs125
-        field_9_dropdown = form.find("select", {"id": "prefs125"})
-        field_9_assign_to = field_9_dropdown.find("option", {"selected": "selected"}).text
-        custom_field_9 = CustomField(name=form.find("input", {"id": "prefs124"})["value"], assign=field_9_assign_to)
+        field_9_assign_to = index.selected("prefs125")
+        custom_field_9 = CustomField(name=index.value("prefs124"), assign=field_9_assign_to)
 
         # field 10 name #prefs127
         # field 10 assign dropdown #prefs128
-        field_10_dropdown = form.find("select", {"id": "prefs128"})
-        field_10_assign_to = field_10_dropdown.find("option", {"selected": "selected"}).text
-        custom_field_10 = CustomField(name=form.find("input", {"id": "prefs127"})["value"], assign=field_10_assign_to)
+        field_10_assign_to = index.selected("prefs128")
+        custom_field_10 = CustomField(name=index.value("prefs127"), assign=field_10_assign_to)
 
         return cls(field_1=custom_field_1, field_2=custom_field_2, field_3=custom_field_3, field_4=custom_field_4,
                    field_5=custom_field_5, field_6=custom_field_6, field_7=custom_field_7, field_8=custom_field_8,
@@ -699,35 +808,138 @@ class CustomFieldPreferences(BaseModel):
 
 
 class PreferenceForm:
-    def __init__(self, form: Tag):
-        self.id = form['id']
-        self.form = form  # form tag
-        self.name = form.get('name')
-        self.action = form.get('action')
-        self.method = form.get('method')
-        self.hidden_inputs = HiddenInputs(form)
+    def __init__(self, form: Union[Tag, PreferencesIndex]):
+        index = PreferencesIndex.of(form)
+        self.id = index.attributes['id']
+        self.name = index.attributes.get('name')
+        self.action = index.attributes.get('action')
+        self.method = index.attributes.get('method')
+        self.hidden_inputs = HiddenInputs(index)
+        # id -> state of every named control, for serializing changes
+        self.fields = {element_id: control for element_id, control in index.fields.items() if control.name}
+
+    def payload(self, changed: dict[str, str]) -> dict[str, str]:
+        """
+        the form POST for already serialized changes: hidden inputs, the submit button and changed
+        """
+        payload = dict(self.hidden_inputs.hidden_inputs)
+        payload["buttonClicked"] = "Submit"
+        payload.update(changed)
+        return payload
 
-        self.hidden_inputs = HiddenInputs(form)
+    def __eq__(self, other):
+        if not isinstance(other, PreferenceForm):
+            return NotImplemented
+        return ((self.id, self.name, self.action, self.method, self.hidden_inputs.hidden_inputs) ==
+                (other.id, other.name, other.action, other.method, other.hidden_inputs.hidden_inputs))
+
+
+class _LazySection:
+    """
+    A Preferences section that is built from the preferences index the first time it is read.
+    The built section is stored on the instance, so later reads never reach the descriptor.
+    """
+
+    def __init__(self, build):
+        self.build = build
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        index = instance._index
+        if index is None:
+            raise AttributeError(f"{self.name} was not loaded before the preferences page was released")
+        value = instance.__dict__[self.name] = self.build(index)
+        if all(name in instance.__dict__ for name in PREFERENCE_SECTIONS):
+            instance.release()
+        return value
 
 
-@dataclass
 class Preferences:
     """
     Preferences:
     collection of preference objects
+
+    Sections parsed from the clock are built on first access from a PreferencesIndex of the page;
+    the index is dropped once every section has been built, or when release() is called.
     """
-    company_information: CompanyInformation
-    payroll_preferences: PayrollPreferences
-    overtime_preferences: OvertimePreferences
-    punch_preferences: PunchPreferences
-    employee_input_preferences: EmployeeInputPreferences
-    device_information: DeviceInformation
-    device_preferences: DevicePreferences
-    multi_clock_preferences: MultiClockPreferences
-    custom_field_preferences: CustomFieldPreferences
-    email_preferences: EmailPreferences
-    preferences_form: PreferenceForm
-    alert_preferences: AlertPreferences
+    company_information: CompanyInformation = _LazySection(CompanyInformation.from_soup)
+    payroll_preferences: PayrollPreferences = _LazySection(PayrollPreferences.from_soup)
+    overtime_preferences: OvertimePreferences = _LazySection(OvertimePreferences.from_soup)
+    punch_preferences: PunchPreferences = _LazySection(PunchPreferences.from_soup)
+    employee_input_preferences: EmployeeInputPreferences = _LazySection(EmployeeInputPreferences.from_soup)
+    device_information: DeviceInformation = _LazySection(DeviceInformation.from_soup)
+    device_preferences: DevicePreferences = _LazySection(DevicePreferences.from_soup)
+    multi_clock_preferences: MultiClockPreferences = _LazySection(MultiClockPreferences.from_soup)
+    custom_field_preferences: CustomFieldPreferences = _LazySection(CustomFieldPreferences.from_soup)
+    email_preferences: EmailPreferences = _LazySection(EmailPreferences.from_soup)
+    preferences_form: PreferenceForm = _LazySection(PreferenceForm)
+    alert_preferences: AlertPreferences = _LazySection(AlertPreferences.from_soup)
+
+    def __init__(self, index: PreferencesIndex = None, **sections):
+        """
+        :param index: index of the preferences page to build sections from as they are read
+        :param sections: already built sections, by attribute name. all sections are required without an index
+        """
+        for name, value in sections.items():
+            if name not in PREFERENCE_SECTIONS:
+                raise TypeError(f"Unknown preferences section: {name}")
+            setattr(self, name, value)
+        missing = [name for name in PREFERENCE_SECTIONS if name not in sections]
+        if index is None and missing:
+            raise TypeError(f"Missing preferences sections: {', '.join(missing)}")
+        self._index = index if missing else None
+
+    @property
+    def loaded_sections(self) -> list[str]:
+        return [name for name in PREFERENCE_SECTIONS if name in self.__dict__]
+
+    def release(self) -> None:
+        """
+        drop the parsed page. sections that have not been read yet can no longer be loaded
+        """
+        self._index = None
+
+    def __eq__(self, other):
+        if not isinstance(other, Preferences):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in PREFERENCE_SECTIONS)
+
+    def __repr__(self):
+        return f"Preferences(loaded_sections={self.loaded_sections})"
+
+    def changed_fields(self, changes: dict) -> dict[str, str]:
+        """
+        form values for the changes that differ from these preferences
+        :param changes: section name -> {field: value} or a whole section object, e.g.
+                        {"overtime_preferences": {"week_ot1_after_hours": 45}}.
+                        custom fields may be given as CustomField objects or "field_1.name" keys
+        :return: form control name -> serialized value, only for fields that would change
+        """
+        controls = self.preferences_form.fields
+        changed = {}
+        for section_name, values in changes.items():
+            if section_name not in PREFERENCE_FIELDS:
+                raise ValueError(f"{section_name} cannot be changed")
+            section = getattr(self, section_name)
+            for field_name, value in _flatten_changes(section_name, values):
+                control = controls[PREFERENCE_FIELDS[section_name][field_name]]
+                current = section
+                for attribute in field_name.split("."):
+                    current = getattr(current, attribute)
+                if not _same_value(control, current, value):
+                    changed[control.name] = serialize_preference(control, value)
+        return changed
+
+    def form_payload(self, changes: dict) -> dict[str, str]:
+        """
+        the form POST for changes: hidden inputs plus only the changed fields, or {} if nothing changes
+        """
+        changed = self.changed_fields(changes)
+        return self.preferences_form.payload(changed) if changed else {}
 
     @classmethod
     def from_soup(cls, soup: BeautifulSoup) -> Preferences:
@@ -736,41 +948,143 @@ class Preferences:
         :return:
         """
         form = soup.find("form", {"id": "formMain"})
-        company_information = CompanyInformation.from_soup(form)
-        payroll_preferences = PayrollPreferences.from_soup(form)
-        overtime_preferences = OvertimePreferences.from_soup(form)
-        punch_preferences = PunchPreferences.from_soup(form)
-        employee_input_preferences = EmployeeInputPreferences.from_soup(form)
-        device_information = DeviceInformation.from_soup(form)
-        device_preferences = DevicePreferences.from_soup(form)
-        multi_clock_preferences = MultiClockPreferences.from_soup(form)
-        custom_field_preferences = CustomFieldPreferences.from_soup(form)
-        email_preferences = EmailPreferences.from_soup(soup)
-        alert_preferences = AlertPreferences.from_soup(soup)
-        preferences_form = PreferenceForm(form)
-        return cls(
-            company_information=company_information,
-            payroll_preferences=payroll_preferences,
-            overtime_preferences=overtime_preferences,
-            punch_preferences=punch_preferences,
-            employee_input_preferences=employee_input_preferences,
-            device_information=device_information,
-            device_preferences=device_preferences,
-            multi_clock_preferences=multi_clock_preferences,
-            email_preferences=email_preferences,
-            alert_preferences=alert_preferences,
-            custom_field_preferences=custom_field_preferences,
-            preferences_form=preferences_form,
-        )
+        return cls.from_index(PreferencesIndex.from_soup(form))
+
+    @classmethod
+    def from_index(cls, index: PreferencesIndex) -> Preferences:
+        """
+        preferences whose sections are built from index as they are read
+        :param index:
+        :return:
+        """
+        return cls(index)
 
     @classmethod
-    def from_html(cls, html: str) -> Preferences:
+    def from_html(cls, html: Union[str, bytes]) -> Preferences:
         """
+        parse the preferences page with lxml in a single pass
         :param html:
         :return:
         """
-        soup = BeautifulSoup(html, 'html.parser')
-        return cls.from_soup(soup)
+        return cls.from_index(PreferencesIndex.from_html(html))
+
+
+PREFERENCE_SECTIONS = tuple(name for name, value in vars(Preferences).items() if isinstance(value, _LazySection))
+
+# writable section fields -> id of the form control they are read from
+PREFERENCE_FIELDS = {
+    "company_information": {"company_name": "prefs2", "company_payroll_id": "prefs3"},
+    "payroll_preferences": {"pay_period_type": "prefs5", "last_pay_start": "prefs9", "this_pay_start": "prefs10",
+                            "next_pay_start": "prefs11", "day_start": "prefs13", "week_start": "prefs14"},
+    "overtime_preferences": {"day_ot1_after_hours": "prefs17", "day_ot2_after_hours": "prefs18",
+                             "week_ot1_after_hours": "prefs19", "week_ot2_after_hours": "prefs20",
+                             "consecutive_day_ot": "prefs21", "ot1_multiplier": "prefs25", "ot2_multiplier": "prefs26"},
+    "punch_preferences": {"rounding_type": "prefs30", "auto_punch_in_after_hours": "prefs31",
+                          "flag_edits_on_reports": "prefs32", "reject_like_punches_range": "prefs33",
+                          "global_authorized_web_punch_addresses": "prefs70"},
+    "employee_input_preferences": {"enabled": "prefs36", "input_name": "prefs37", "collection_type": "prefs38",
+                                   "collect_on": "prefs39", "show_totals": "prefs40"},
+    "device_preferences": {"calculated_time_format": "prefs47", "pin_number_length": "prefs48",
+                           "hide_employee_pin": "prefs49", "system_prompt_1": "prefs50", "system_prompt_2": "prefs51",
+                           "system_prompt_3": "prefs52", "supervisor_code": "prefs53", "lock_keypad": "prefs54",
+                           "use_daylight_savings": "prefs55", "default_attendance_report_to": "prefs56",
+                           "default_timecard_report_to": "prefs57", "refresh_home_page_every_x_minutes": "prefs58",
+                           "use_ssl_server": "prefs59", "use_popup_windows_for_edits": "prefs60",
+                           "show_total_hours_at_the_clock": "prefs61"},
+    "multi_clock_preferences": {"child_realtime_time_date_sync": "prefs64", "child_realtime_data_sync": "prefs65",
+                                "child_online_sync_delay_seconds": "prefs66",
+                                "child_offline_sync_delay_seconds": "prefs67"},
+    "email_preferences": {"smtp_server_address": "prefs73", "use_ssl": "prefs74", "use_starttls": "prefs75",
+                          "use_authentication": "prefs76", "username_email_address": "prefs77", "password": "prefs78",
+                          "from_email_address": "prefs79", "email_domain_name": "prefs80",
+                          "email_backups_to": "prefs81", "send_backups": "prefs82"},
+    "alert_preferences": {"alert_low_hours_threshold": "prefs86", "alert_high_hours_threshold": "prefs87",
+                          "maximum_punch_time_threshold": "prefs88", "day_overtime_threshold": "prefs89",
+                          "week_overtime_threshold": "prefs90", "check_alerts_interval": "prefs92",
+                          "email_alerts_interval": "prefs93", "update_employee_hours_interval": "prefs94",
+                          "email_daily_alerts_time": "prefs95"},
+    "custom_field_preferences": {f"field_{number}.{attribute}": f"prefs{97 + 3 * number + offset}"
+                                 for number in range(1, 11) for offset, attribute in enumerate(("name", "assign"))},
+}
+
+
+def serialize_preference(control: PreferenceField, value) -> str:
+    """
+    the form value that sets control to value. selects accept option text (any case) or option values,
+    dates are posted as MM/DD/YY and times as HH:MMa/p
+    """
+    if control.tag == "select":
+        return _option_value(control, value)
+    if control.type == "checkbox":
+        return (control.value or "on") if value else ""
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.strftime("%m/%d/%y")
+    if isinstance(value, time):
+        return f"{(value.hour - 1) % 12 + 1:02d}:{value.minute:02d}{'a' if value.hour < 12 else 'p'}"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    if isinstance(value, (list, tuple)):
+        return ",".join(str(item) for item in value)
+    return str(value)
+
+
+def _option_value(control: PreferenceField, value) -> str:
+    values = list(control.options.values())
+    if isinstance(value, bool):
+        if "selected" in values:  # the employee input enabled dropdown marks "on" with the value "selected"
+            return "selected" if value else next(option for option in values if option != "selected")
+        value = "Yes" if value else "No"
+    value = str(value)
+    for text, option_value in control.options.items():
+        if text.strip().lower() == value.lower():
+            return option_value
+    if value in values:
+        return value
+    raise ValueError(f"{value} is not an option for {control.name}")
+
+
+def _same_value(control: PreferenceField, current, desired) -> bool:
+    numbers = (int, float)
+    if isinstance(current, numbers) and isinstance(desired, numbers) and not isinstance(desired, bool):
+        return float(current) == float(desired)
+    return serialize_preference(control, current) == serialize_preference(control, desired)
+
+
+def _flatten_changes(section_name: str, values):
+    """
+    (field, value) pairs for a section's changes, expanding section objects and custom fields
+    """
+    if isinstance(values, BaseModel):
+        values = values.dict()
+    elif not isinstance(values, dict):
+        values = vars(values)
+    fields = PREFERENCE_FIELDS[section_name]
+    for field_name, value in values.items():
+        if field_name in fields:
+            yield field_name, value
+            continue
+        if isinstance(value, BaseModel):
+            value = value.dict()
+        if not isinstance(value, dict) or not all(f"{field_name}.{key}" in fields for key in value):
+            raise ValueError(f"{section_name}.{field_name} cannot be changed")
+        for key, item in value.items():
+            yield f"{field_name}.{key}", item
+
+
+@dataclass
+class PreferenceUpdate:
+    """
+    Result of writing preference changes to one clock
+    """
+    address: str
+    changed: dict[str, str] = field(default_factory=dict)  # form control name -> value posted
+    error: Exception = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
 
 
 ###############################################################################
@@ -787,12 +1101,12 @@ preference_div_names = {
 preference_div_ids = {v: k for k, v in preference_div_names.items()}
 
 
-def read_preferences_page(soup: BeautifulSoup) -> PreferenceForm:
+def read_preferences_page(soup: BeautifulSoup) -> Preferences:
     """
     :param soup:
     :return:
     """
-    form = soup.find("form", {"name": "formMain"})
+    form = PreferencesIndex.from_soup(soup.find("form", {"name": "formMain"}))
     preference_form = PreferenceForm(form)
     company_information = CompanyInformation.from_soup(form)
     payroll_preferences = PayrollPreferences.from_soup(form)
@@ -806,7 +1120,7 @@ def read_preferences_page(soup: BeautifulSoup) -> PreferenceForm:
     device_information = DeviceInformation.from_soup(form)
     employee_input_preferences = EmployeeInputPreferences.from_soup(form)
 
-    return Preferences(preference_form=preference_form, company_information=company_information,
+    return Preferences(preferences_form=preference_form, company_information=company_information,
                        payroll_preferences=payroll_preferences, overtime_preferences=overtime_preferences,
                        device_preferences=device_preferences, punch_preferences=punch_preferences,
                        alert_preferences=alert_preferences, multi_clock_preferences=multi_clock_preferences,
@@ -1,6 +1,12 @@
 import calendar
+import hashlib
+import math
+import re
 from datetime import timedelta, datetime, date
-from typing import Union
+from functools import lru_cache
+from typing import Iterator, Union
+
+from .conversions import parse_number
 
 
 def strings_to_numbers(l, fmt='float'):
@@ -21,13 +27,7 @@ def strings_to_numbers(l, fmt='float'):
     def _convert(s):
         if not s:
             return s
-        try:
-            if float(s).is_integer():
-                return int(float(s))
-            else:
-                return float(s)
-        except (ValueError, TypeError):
-            return s
+        return parse_number(s)
 
     if not l:
         return l
@@ -58,6 +58,17 @@ def date_to_datetime(date_obj, datetime_obj=None, hour=0, minute=0, second=0):
     return datetime(date_obj.year, date_obj.month, date_obj.day, hour, minute, second)
 
 
+SPAN_UNITS = ('seconds', 'minutes', 'hours', 'days', 'weeks', 'months', 'years')
+FIXED_SPANS = {
+    'seconds': timedelta(seconds=1),
+    'minutes': timedelta(minutes=1),
+    'hours': timedelta(hours=1),
+    'days': timedelta(days=1),
+    'weeks': timedelta(weeks=1),
+}
+MONTHS_PER_SPAN = {'months': 1, 'years': 12}
+
+
 def get_time_range(start: Union[date, datetime],
                    stop: Union[date, datetime] = None,
                    span_unit: str = 'days') -> list[datetime]:
@@ -66,179 +77,178 @@ def get_time_range(start: Union[date, datetime],
     :param: span_unit: days, weeks, months, years, hours, minutes, seconds. Default is days
     :rtype list of datetime
     """
-    valid_span_units = ['seconds', 'minutes', 'hours', 'days', 'weeks', 'months', 'years']
-    if span_unit not in valid_span_units:
+    return list(iter_time_range(start, stop, span_unit))
+
+
+def iter_time_range(start: Union[date, datetime],
+                    stop: Union[date, datetime] = None,
+                    span_unit: str = 'days') -> Iterator[datetime]:
+    """
+    lazily yield the times from start to stop (inclusive) one span_unit apart.
+    months and years follow the calendar, keeping start's day of the month where it exists and
+    clamping to the end of shorter months, e.g. jan 31, feb 28, mar 31.
+    without a stop, days yields only start and other units yield start and one span later.
+    :param: span_unit: days, weeks, months, years, hours, minutes, seconds. Default is days
+    :rtype iterator of datetime
+    """
+    start, stop = _time_range_bounds(start, stop, span_unit)
+    if stop is None:
+        yield start
+        return
+    if span_unit in MONTHS_PER_SPAN:
+        months = MONTHS_PER_SPAN[span_unit]
+        step = 0
+        current = start
+        while current <= stop:
+            yield current
+            step += 1
+            current = add_months(start, step * months)
+        return
+    span = FIXED_SPANS[span_unit]
+    current = start
+    while current <= stop:
+        yield current
+        current += span
+
+
+def time_range_array(start: Union[date, datetime],
+                     stop: Union[date, datetime] = None,
+                     span_unit: str = 'days'):
+    """
+    the same times as iter_time_range as a numpy datetime64[us] array, for vectorized bucketing
+    (e.g. numpy.searchsorted of punch times into the range). requires numpy.
+    :rtype numpy.ndarray
+    """
+    import numpy as np
+
+    if span_unit in MONTHS_PER_SPAN:
+        return np.array(list(iter_time_range(start, stop, span_unit)), dtype='datetime64[us]')
+    start, stop = _time_range_bounds(start, stop, span_unit)
+    first = np.datetime64(start, 'us')
+    if stop is None:
+        return np.array([first])
+    return np.arange(first, np.datetime64(stop, 'us') + np.timedelta64(1, 'us'),
+                     np.timedelta64(FIXED_SPANS[span_unit]))
+
+
+def add_months(moment: Union[date, datetime], months: int) -> Union[date, datetime]:
+    """
+    moment shifted by a number of calendar months, clamping the day to the end of the target month
+    """
+    month_index = moment.month - 1 + months
+    year, month = moment.year + month_index // 12, month_index % 12 + 1
+    return moment.replace(year=year, month=month, day=min(moment.day, calendar.monthrange(year, month)[1]))
+
+
+def _time_range_bounds(start, stop, span_unit):
+    """
+    validate span_unit and return (start, stop) as ordered datetimes. stop is None for a single day
+    """
+    if span_unit not in SPAN_UNITS:
         raise ValueError('Invalid span unit: {}'.format(span_unit))
-    # if start or stop is are dates, convert to datetime
-    if isinstance(start, date):
+    # dates become midnight. datetimes are dates too, so check for them first to keep their time
+    if not isinstance(start, datetime):
         start = date_to_datetime(start)
-    if isinstance(stop, date):
+    if stop is not None and not isinstance(stop, datetime):
         stop = date_to_datetime(stop)
 
-    # if start is after stop, swap them
-
-    # if span_unit is days, convert to timedelta
-    if span_unit == 'days':
-        span = timedelta(days=1)
-    elif span_unit == 'weeks':
-        span = timedelta(weeks=1)
-    elif span_unit == 'months':
-        span = timedelta(days=30)
-    elif span_unit == 'years':
-        span = timedelta(days=365)
-    elif span_unit == 'hours':
-        span = timedelta(seconds=60 * 60)
-    else:
-        span = timedelta(seconds=60)
-
-    if not stop and span_unit == 'days':
-        return [start]
-    elif not stop:
-        stop = start + span
+    if not stop:
+        if span_unit == 'days':
+            return start, None
+        if span_unit in MONTHS_PER_SPAN:
+            stop = add_months(start, MONTHS_PER_SPAN[span_unit])
+        else:
+            stop = start + FIXED_SPANS[span_unit]
 
     if start > stop:
         start, stop = stop, start
-    # get the list of times
-    times = []
-    current = start
-    while current <= stop:
-        times.append(current)
-        current += span
-    return times
+    return start, stop
+
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
 
 
 def get_date_time_frame_span(time_span: str, start_date: Union[date, datetime] = None,
-                             week_start_day: str = "sunday") -> tuple[datetime, datetime]:
+                             week_start_day: str = "sunday") -> tuple[date, date]:
     """
     Get the time frame for a given name using calendar for accurate month days
     :param time_span: Today, Yesterday, Tomorrow, Last Week, This Week, Next Week, Last Month,
                 This Month, Next Month, Last Year, This Year, Next Year, Year to date,
                 Month to date, Week to date, Year, Week, Month
     :param start_date: The start day for the time frame. If not provided, the current day is used
-    :param week_start_day: Can be sunday or monday. Default is sunday
+    :param week_start_day: any day of the week, e.g. sunday, monday or the clock's sun, mon. Default is sunday
     :return:
     """
-    time_span_presets = ['today', 'yesterday', 'tomorrow', 'last_week', 'this_week', 'next_week',
-                         'last_month', 'this_month', 'next_month', 'last_year', 'this_year',
-                         'next_year', 'year_to_date', 'month_to_date', 'week_to_date', 'year',
-                         'week', 'month']
     time_span = to_snake_case(time_span)
-    if time_span not in time_span_presets:
+    if time_span not in TIME_SPANS:
         raise ValueError('Invalid time span: {}'.format(time_span))
-
     if not start_date:
         start_date = date.today()
+    elif isinstance(start_date, datetime):
+        start_date = start_date.date()
+    return _date_time_frame_span(time_span, start_date, weekday_index(week_start_day))
 
-    this_month_length = calendar.monthrange(start_date.year, start_date.month)[1]
-    today_month = start_date.month
-    today_day = start_date.day
-    today_year = start_date.year
 
-    if week_start_day == 'sunday':
-        start_date_weekday = start_date.isoweekday()
-        # if today is not sunday, then the first day of the week is the previous sunday
-        if start_date_weekday != 7:
-            week_start = start_date - timedelta(days=start_date_weekday)
-        else:
-            week_start = start_date
-    elif week_start_day == 'monday':
-        # if today is not monday then the first day of the week is the previous monday
-        start_date_weekday = start_date.weekday()
-        if start_date_weekday != 0:
-            week_start = start_date - timedelta(days=start_date_weekday)
-        else:
-            week_start = start_date
-    else:
-        raise ValueError('Invalid week start day: {}'.format(week_start_day))
-
-    week_end = week_start + timedelta(days=6)
-    start_of_week = week_start
-    end_of_week = week_end
-
-    # last week
-    start_of_last_week = start_of_week - timedelta(days=7)
-    end_of_last_week = end_of_week - timedelta(days=7)
-    # next week
-    start_of_next_week = start_of_week + timedelta(days=7)
-    end_of_next_week = end_of_week + timedelta(days=7)
-    # this month
-    start_of_month = date(today_year, today_month, 1)
-    end_of_month = date(today_year, today_month, this_month_length)
-    # last month might be in the previous year
-    if today_month == 1:
-        last_month_length = calendar.monthrange(today_year - 1, 12)[1]
-        last_month = 12
-        last_year = today_year - 1
-    else:
-        last_month_length = calendar.monthrange(today_year, today_month - 1)[1]
-        last_month = today_month - 1
-        last_year = today_year
-    start_of_last_month = date(last_year, last_month, 1)
-    end_of_last_month = date(last_year, last_month, last_month_length)
-    # next month might be in the next year
-    if today_month == 12:
-        next_month_length = calendar.monthrange(today_year + 1, 1)[1]
-        next_month = 1
-        next_year = today_year + 1
-    else:
-        next_month_length = calendar.monthrange(today_year, today_month + 1)[1]
-        next_month = today_month + 1
-        next_year = today_year
-    start_of_next_month = date(next_year, next_month, 1)
-    end_of_next_month = date(next_year, next_month, next_month_length)
-
-    # this year
-    start_of_year = date(today_year, 1, 1)
-    end_of_year = date(today_year, 12, 31)
-    # last year
-    start_of_last_year = date(today_year - 1, 1, 1)
-    end_of_last_year = date(today_year - 1, 12, 31)
-    # next year
-    start_of_next_year = date(today_year + 1, 1, 1)
-    end_of_next_year = date(today_year + 1, 12, 31)
-
-    # year to date
-    start_of_year_to_date = date(today_year, 1, 1)
-    end_of_year_to_date = start_date
-    # month to date
-    start_of_month_to_date = date(today_year, today_month, 1)
-    end_of_month_to_date = start_date
-    # week to date
-    start_of_week_to_date = start_of_week
-    end_of_week_to_date = start_date
-
-    year_span_start = start_date.replace(year=start_date.year - 1)
-    year_span_end = start_date
-    # month span start may be in the previous year
-    if today_month == 1:
-        month_span_start = date(today_year - 1, 12, start_date.day)
-    else:
-        month_span_start = date(today_year, today_month - 1, start_date.day)
-    month_span_end = start_date
-    # week span start may be in the previous year
-    week_span_start = start_date - timedelta(days=7)
-    week_span_end = start_date
-
-    time_spans = {
-        'today': (start_date, start_date),
-        'yesterday': (start_date - timedelta(days=1), start_date - timedelta(days=1)),
-        'this_week': (start_of_week, end_of_week),
-        'last_week': (start_of_last_week, end_of_last_week),
-        'next_week': (start_of_next_week, end_of_next_week),
-        'this_month': (start_of_month, end_of_month),
-        'last_month': (start_of_last_month, end_of_last_month),
-        'next_month': (start_of_next_month, end_of_next_month),
-        'this_year': (start_of_year, end_of_year),
-        'last_year': (start_of_last_year, end_of_last_year),
-        'next_year': (start_of_next_year, end_of_next_year),
-        'year_to_date': (start_of_year_to_date, end_of_year_to_date),
-        'month_to_date': (start_of_month_to_date, end_of_month_to_date),
-        'week_to_date': (start_of_week_to_date, end_of_week_to_date),
-        'year': (year_span_start, year_span_end),
-        'month': (month_span_start, month_span_end),
-        'week': (week_span_start, week_span_end),
-    }
-    return time_spans[time_span]
+@lru_cache(maxsize=4096)
+def _date_time_frame_span(time_span: str, start_date: date, week_start: int) -> tuple[date, date]:
+    # only the requested span is computed; dashboards ask for the same few spans over and over
+    return TIME_SPANS[time_span](start_date, week_start)
+
+
+def weekday_index(day_name: str) -> int:
+    """
+    0 for monday through 6 for sunday. full names and three letter abbreviations are accepted
+    """
+    name = day_name.strip().lower()
+    for index, weekday in enumerate(WEEKDAYS):
+        if len(name) >= 3 and weekday.startswith(name):
+            return index
+    raise ValueError('Invalid week start day: {}'.format(day_name))
+
+
+def _start_of_week(day: date, week_start: int) -> date:
+    return day - timedelta(days=(day.weekday() - week_start) % 7)
+
+
+def _week(day: date, week_start: int, weeks: int = 0) -> tuple[date, date]:
+    start = _start_of_week(day, week_start) + timedelta(weeks=weeks)
+    return start, start + timedelta(days=6)
+
+
+def _month(day: date, months: int = 0) -> tuple[date, date]:
+    start = add_months(day.replace(day=1), months)
+    return start, start.replace(day=calendar.monthrange(start.year, start.month)[1])
+
+
+def _year(day: date, years: int = 0) -> tuple[date, date]:
+    return date(day.year + years, 1, 1), date(day.year + years, 12, 31)
+
+
+def _single_day(day: date) -> tuple[date, date]:
+    return day, day
+
+
+TIME_SPANS = {
+    'today': lambda day, week_start: _single_day(day),
+    'yesterday': lambda day, week_start: _single_day(day - timedelta(days=1)),
+    'tomorrow': lambda day, week_start: _single_day(day + timedelta(days=1)),
+    'this_week': lambda day, week_start: _week(day, week_start),
+    'last_week': lambda day, week_start: _week(day, week_start, -1),
+    'next_week': lambda day, week_start: _week(day, week_start, 1),
+    'this_month': lambda day, week_start: _month(day),
+    'last_month': lambda day, week_start: _month(day, -1),
+    'next_month': lambda day, week_start: _month(day, 1),
+    'this_year': lambda day, week_start: _year(day),
+    'last_year': lambda day, week_start: _year(day, -1),
+    'next_year': lambda day, week_start: _year(day, 1),
+    'year_to_date': lambda day, week_start: (date(day.year, 1, 1), day),
+    'month_to_date': lambda day, week_start: (day.replace(day=1), day),
+    'week_to_date': lambda day, week_start: (_start_of_week(day, week_start), day),
+    # rolling spans ending on the day. a day missing from the earlier month (e.g. feb 29) is clamped
+    'year': lambda day, week_start: (add_months(day, -12), day),
+    'month': lambda day, week_start: (add_months(day, -1), day),
+    'week': lambda day, week_start: (day - timedelta(days=7), day),
+}
 
 
 def to_snake_case(s):
@@ -250,6 +260,14 @@ def to_snake_case(s):
     return s.replace(' ', '_').lower()
 
 
+def clock_slug(address: str) -> str:
+    """
+    a clock address as a file or folder name, e.g. http://10.0.0.5:8080 -> 10.0.0.5_8080
+    :rtype: str
+    """
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", address.split("://")[-1]).strip("_")
+
+
 def normalize_dict(d, prefix='', sep='_'):
     """
     Flatten a nested dictionary into a single level dictionary
@@ -268,3 +286,33 @@ def normalize_dict(d, prefix='', sep='_'):
         else:
             o[prefix + k] = v
     return o
+
+
+class BloomFilter:
+    """
+    Fixed size set membership test. May report a key that was never added (at roughly error_rate
+    once capacity keys are stored) but never misses one that was.
+    Keys are hashed through their repr, so tuples of str/int work.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError('capacity must be positive and error_rate between 0 and 1')
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(repr(key).encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))